@@ -0,0 +1,297 @@
+"""
+Answer Cache Module
+Question frequency log and precomputed answers for the most asked questions
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import CACHE_HITS, CACHE_MISSES
+
+load_dotenv()
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case, punctuation and spacing insensitive form of a question"""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", question.lower())).strip()
+
+
+class WarmAnswer:
+    """A precomputed answer and the collection version it was computed against"""
+
+    def __init__(self, question: str, version, result: Dict):
+        self.question = question
+        self.version = version
+        self.result = result            # answer, results, tokens_used, model, fast_path
+        self.computed_at = time.time()
+        self.hits = 0
+
+
+class _TenantLog:
+    """Question counts and warm answers of one restaurant"""
+
+    def __init__(self):
+        self.counts = {}                # normalized question -> times asked
+        self.samples = {}               # normalized question -> original wording
+        self.answers = {}               # normalized question -> WarmAnswer
+
+
+class AnswerCache:
+    """
+    Serve the most frequent guest questions from precomputed answers
+
+    Every standalone question is logged in normalized form with its count.
+    A background job takes each restaurant's top-N questions and computes
+    their answers ahead of time (embedding, retrieval and the LLM call),
+    yielding to live queries between questions. It runs on an interval and
+    right after an upload or delete. Answers are tied to the collection
+    version they were computed against, so a write in any worker stops
+    them being served until they are refreshed.
+
+    Each process keeps its own log and table (like SessionStore).
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[Optional[str], str], Optional[Tuple[object, Dict]]] = None,
+        version: Callable[[Optional[str]], object] = None,
+        top_n: int = None,
+        min_count: int = None,
+        interval_seconds: float = None,
+        max_questions: int = None,
+        between_questions: Callable[[], None] = None,
+        enabled: bool = None,
+        auto: bool = True
+    ):
+        """
+        Initialize answer cache (the warming thread starts on first use)
+
+        Args:
+            compute: Callable (restaurant_id, question) -> (collection version,
+                     result) computing an answer like /api/chat, or None if
+                     there is nothing to answer from
+            version: Callable restaurant_id -> current collection version (None
+                     if the collection does not exist); fresh answers are skipped
+            top_n: Questions per restaurant kept warm
+            min_count: Times a question must be asked before it is warmed
+            interval_seconds: Time between periodic warming runs
+            max_questions: Distinct questions logged per restaurant; the
+                           least frequent half is dropped past this
+            between_questions: Called between answers, e.g. to yield to
+                               interactive queries
+            enabled: Serve and warm answers (defaults to ANSWER_WARM_ENABLED)
+            auto: Warm in a background thread; when False only warm() does
+                  (for scripts and tests)
+        """
+        self.compute = compute
+        self.version = version
+        self.top_n = top_n or int(os.getenv("ANSWER_WARM_TOP_N", 50))
+        self.min_count = min_count or int(os.getenv("ANSWER_WARM_MIN_COUNT", 3))
+        self.interval_seconds = interval_seconds or float(os.getenv("ANSWER_WARM_INTERVAL_SECONDS", 300))
+        self.max_questions = max_questions or int(os.getenv("ANSWER_LOG_MAX_QUESTIONS", 5000))
+        self.between_questions = between_questions
+        self.enabled = enabled if enabled is not None else (
+            os.getenv("ANSWER_WARM_ENABLED", "true").lower() == "true"
+        )
+        self.auto = auto
+
+        self._lock = threading.Lock()
+        self._tenants = {}                # restaurant id ("" for default) -> _TenantLog
+        self._dirty = set()               # restaurants to re-warm on the next run
+        self._wake = threading.Event()
+        self._worker_pid = None
+
+        self.hits = 0
+        self.misses = 0
+        self.warmed = 0
+        self.failures = 0
+        self.last_run_seconds = None
+
+    def _tenant_locked(self, restaurant_id: Optional[str]) -> _TenantLog:
+        return self._tenants.setdefault(restaurant_id or "", _TenantLog())
+
+    def record(self, restaurant_id: Optional[str], question: str):
+        """Count one occurrence of a standalone question"""
+        key = normalize_question(question)
+        if not key:
+            return
+
+        with self._lock:
+            tenant = self._tenant_locked(restaurant_id)
+            tenant.counts[key] = tenant.counts.get(key, 0) + 1
+            tenant.samples.setdefault(key, question.strip())
+
+            if len(tenant.counts) > self.max_questions:
+                # Keep the heavy hitters; one-off questions come and go
+                keep = sorted(tenant.counts, key=tenant.counts.get, reverse=True)[:self.max_questions // 2]
+                tenant.counts = {k: tenant.counts[k] for k in keep}
+                tenant.samples = {k: tenant.samples[k] for k in keep}
+                tenant.answers = {k: v for k, v in tenant.answers.items() if k in tenant.counts}
+
+            newly_frequent = tenant.counts[key] == self.min_count and key not in tenant.answers
+
+        if newly_frequent and self.enabled:
+            self.refresh(restaurant_id)
+
+    def lookup(self, restaurant_id: Optional[str], question: str, version) -> Optional[Dict]:
+        """
+        Precomputed result for a question, if warm for this collection version
+
+        Args:
+            restaurant_id: Tenant identifier
+            question: The guest's question as asked
+            version: Current collection version, as returned by the version callable
+
+        Returns:
+            Result dict (answer, results, tokens_used, model, fast_path) or None
+        """
+        if not self.enabled:
+            return None
+
+        key = normalize_question(question)
+        with self._lock:
+            tenant = self._tenants.get(restaurant_id or "")
+            entry = tenant.answers.get(key) if tenant else None
+            fresh = entry is not None and entry.version == version
+            if fresh:
+                entry.hits += 1
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if fresh:
+            CACHE_HITS.inc(cache="answer")
+            return entry.result
+
+        CACHE_MISSES.inc(cache="answer")
+        if entry is not None:
+            # Written by another worker since warming: refresh in the background
+            self.refresh(restaurant_id)
+        return None
+
+    def top_questions(self, restaurant_id: Optional[str], n: int = None) -> List[Tuple[str, int]]:
+        """Most asked questions (original wording, count), most frequent first"""
+        with self._lock:
+            tenant = self._tenants.get(restaurant_id or "")
+            if tenant is None:
+                return []
+            ranked = sorted(tenant.counts.items(), key=lambda item: item[1], reverse=True)
+            return [(tenant.samples[key], count) for key, count in ranked[:n or self.top_n]]
+
+    def refresh(self, restaurant_id: Optional[str] = None):
+        """Re-warm a restaurant's answers soon (called after uploads and deletes)"""
+        if not self.enabled or self.compute is None:
+            return
+        with self._lock:
+            self._dirty.add(restaurant_id or "")
+        if self.auto:
+            self._ensure_worker()
+            self._wake.set()
+
+    def _ensure_worker(self):
+        """Start the warming thread (again after a fork, e.g. gunicorn preload)"""
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                threading.Thread(target=self._worker_loop, name="answer-warming", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _worker_loop(self):
+        while True:
+            # Woken early: only restaurants that changed; on the interval: all of them
+            woken = self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            with self._lock:
+                tenants = list(self._dirty) if woken else list(self._tenants)
+                self._dirty.clear()
+            for tenant in tenants:
+                try:
+                    self.warm(tenant or None)
+                except Exception as e:
+                    self.failures += 1
+                    print(f"[WARN] Answer warming failed for restaurant '{tenant or 'default'}': {str(e)}")
+
+    def warm(self, restaurant_id: Optional[str] = None) -> int:
+        """
+        Compute answers for a restaurant's top questions that are missing or stale
+
+        Returns:
+            Number of answers computed
+        """
+        start = time.perf_counter()
+        version = self.version(restaurant_id) if self.version is not None else None
+        with self._lock:
+            tenant = self._tenants.get(restaurant_id or "")
+            if tenant is None:
+                return 0
+            ranked = sorted(tenant.counts.items(), key=lambda item: item[1], reverse=True)
+            candidates = [
+                (key, tenant.samples[key]) for key, count in ranked[:self.top_n]
+                if count >= self.min_count
+            ]
+            pending = [
+                (key, question) for key, question in candidates
+                if key not in tenant.answers or version is None or tenant.answers[key].version != version
+            ]
+
+        computed = 0
+        for key, question in pending:
+            if self.between_questions is not None:
+                self.between_questions()
+            try:
+                answer = self.compute(restaurant_id, question)
+            except Exception as e:
+                self.failures += 1
+                print(f"[WARN] Could not warm answer for '{question}': {str(e)}")
+                continue
+
+            with self._lock:
+                if answer is None:
+                    tenant.answers.pop(key, None)
+                    continue
+                answer_version, result = answer
+                current = tenant.answers.get(key)
+                if current is not None and current.version == answer_version:
+                    continue
+                tenant.answers[key] = WarmAnswer(question, answer_version, result)
+                self.warmed += 1
+                computed += 1
+
+        # Questions that fell out of the top N are not kept warm
+        top_keys = {key for key, _ in candidates}
+        with self._lock:
+            tenant.answers = {k: v for k, v in tenant.answers.items() if k in top_keys}
+            self.last_run_seconds = round(time.perf_counter() - start, 3)
+
+        if computed:
+            print(f"[OK] Warmed {computed} answers for restaurant '{restaurant_id or 'default'}'")
+        return computed
+
+    def get_stats(self) -> Dict:
+        """
+        Get answer cache statistics
+
+        Returns:
+            Dictionary with hit/miss counters, warm answer count and settings
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "top_n": self.top_n,
+                "min_count": self.min_count,
+                "restaurants": len(self._tenants),
+                "logged_questions": sum(len(t.counts) for t in self._tenants.values()),
+                "warm_answers": sum(len(t.answers) for t in self._tenants.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "warmed": self.warmed,
+                "failures": self.failures,
+                "last_run_seconds": self.last_run_seconds
+            }
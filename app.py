@@ -4,17 +4,34 @@ Provides endpoints for document upload, chat queries, and system management
 """
 
 import os
-from flask import Flask, request, jsonify
+import hmac
+import time
+import base64
+import threading
+from functools import wraps
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 import traceback
 
 # Import custom modules
+from answer_cache import AnswerCache
 from document_processor import DocumentProcessor
 from embedding_service import EmbeddingService
-from vector_store import VectorStore
-from groq_client import GroqClient
+from tenant_store import TenantStoreRegistry
+from llm_client import LLMRouter, create_llm_client
+from model_migration import MigrationManager
+from metrics import (
+    REGISTRY, REQUESTS, REQUEST_SECONDS, IN_FLIGHT, CACHE_HITS, CACHE_MISSES, RERANK_FALLBACKS,
+    stage, start_request_timing, request_timings, server_timing_header
+)
+from profiler import SamplingProfiler, profile_call
+from lazy_service import LazyService, Warmup
+from reranker import RERANK_CANDIDATES, Reranker
+from scheduler import BATCH, INTERACTIVE, Overloaded, WorkloadScheduler
+from session_store import SUMMARY_PROMPT, SessionStore
+from similarity import set_blas_threads
 
 # Load environment variables
 load_dotenv()
@@ -26,24 +43,206 @@ app = Flask(__name__)
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
 CORS(app, origins=allowed_origins.split(","))
 
+# Compact JSON: no indentation, no key sorting, UTF-8 instead of \u escapes
+app.json.compact = True
+app.json.sort_keys = False
+app.json.ensure_ascii = False
+
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB default
 app.config['UPLOAD_FOLDER'] = './data/documents'
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc'}
+# Default MMR diversity for /api/chat and /api/search (0 = plain similarity ranking)
+DEFAULT_DIVERSITY = float(os.getenv("RETRIEVAL_DIVERSITY", 0.0))
+# Questions this close to a stored FAQ question are answered without the LLM
+FAQ_FAST_PATH = os.getenv("FAQ_FAST_PATH", "True").lower() == "true"
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", 0.9))
+# Response shapes for sources: full text, shortened text or ids only
+SOURCE_FORMATS = ("full", "snippet", "ids")
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", 160))
+# /api/chat parameters when the request leaves them out (warm answers use these)
+CHAT_DEFAULTS = {
+    "top_k": 5,
+    "diversity": DEFAULT_DIVERSITY,
+    "rerank": True,
+    "temperature": 0.7,
+    "max_tokens": 500
+}
+EMBED_FORMATS = ("json", "base64", "binary")
+EMBED_MAX_TEXTS = int(os.getenv("EMBED_MAX_TEXTS", 256))
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# One BLAS thread pool per worker would oversubscribe the CPU (SIMILARITY_THREADS)
+set_blas_threads()
+
 # Initialize services (singleton pattern)
+# Heavy services are built lazily so the server accepts connections immediately
 doc_processor = DocumentProcessor(
     chunk_size=int(os.getenv("CHUNK_SIZE", 1000)),
     chunk_overlap=int(os.getenv("CHUNK_OVERLAP", 200))
 )
-embedding_service = EmbeddingService()
-vector_store = VectorStore()
-groq_client = GroqClient()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+embedding_service = LazyService("embedding_service", EmbeddingService)
+vector_stores = TenantStoreRegistry()
+# Groq by default; LLM_BACKENDS=groq,local adds a local failover backend
+llm_client = LazyService("llm_client", create_llm_client)
+# Cross-encoder reranking is opt-in (RERANK_ENABLED=true)
+reranker = LazyService("reranker", Reranker) if os.getenv("RERANK_ENABLED", "False").lower() == "true" else None
+sampling_profiler = SamplingProfiler()
+
+# Collections on an older embedding model keep using it until re-embedded
+_embedding_services = {EMBEDDING_MODEL: embedding_service}
+_embedding_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name=None):
+    """Embedding service for a model (the configured EMBEDDING_MODEL by default)"""
+    model_name = model_name or EMBEDDING_MODEL
+    with _embedding_services_lock:
+        service = _embedding_services.get(model_name)
+        if service is None:
+            service = LazyService(
+                f"embedding_service[{model_name}]",
+                lambda: EmbeddingService(model_name)
+            )
+            _embedding_services[model_name] = service
+        return service
+
+
+def embedder_for(vector_store):
+    """Embedding service matching the model a collection was built with"""
+    return get_embedding_service(vector_store.embedding_model)
+
+
+def warm_up_services():
+    """Load the model, run a dummy encode and a first query"""
+    embedding = embedding_service.generate_embedding("What are your opening hours?")
+    vector_store = vector_stores.get(None)
+    if vector_store.embedding_model not in (None, EMBEDDING_MODEL):
+        # Still on the previous model until its re-embedding finishes
+        embedding = embedder_for(vector_store).generate_embedding("What are your opening hours?")
+    if vector_store.dimension in (None, len(embedding)):
+        vector_store.query_similar(embedding, top_k=1)
+    llm_client.get()
+    if reranker is not None:
+        # Optional stage: queries keep vector order if it cannot load
+        try:
+            reranker.model.predict([("What are your opening hours?", "We are open daily.")])
+        except Exception as e:
+            print(f"[WARN] Reranker could not be loaded: {str(e)}")
+    print("[OK] All services initialized successfully!")
+
+
+# WARMUP_MODE: background (default), eager (load before serving, e.g. gunicorn
+# preload so forked workers share the model) or off (load on first request)
+warmup = Warmup(warm_up_services)
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background").lower()
+if WARMUP_MODE == "eager":
+    warmup.run()
+elif WARMUP_MODE == "background":
+    warmup.start()
+
+
+def summarize_conversation(summary, turns):
+    """Compress older turns into the rolling session summary with the LLM"""
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    if summary:
+        transcript = f"Summary so far:\n{summary}\n\nNew turns:\n{transcript}"
+    
+    response = llm_client.chat_with_history(
+        [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": transcript}
+        ],
+        temperature=0.2,
+        max_tokens=int(os.getenv("SESSION_SUMMARY_TOKENS", 150))
+    )
+    return response['response']
+
+
+sessions = SessionStore(summarizer=summarize_conversation)
+
+# Admission control: queries get priority, ingestion is capped
+scheduler = WorkloadScheduler()
+
+# Changing EMBEDDING_MODEL re-embeds collections in the background, then switches
+migrations = MigrationManager(
+    vector_stores,
+    get_embedding_service,
+    EMBEDDING_MODEL,
+    between_batches=scheduler.yield_to_interactive
+)
+
+
+def collection_version(restaurant_id):
+    """Versions of a restaurant's chunk and FAQ indexes (None if it has no data)"""
+    vector_store = vector_stores.get(restaurant_id, create=False)
+    if vector_store is None:
+        return None
+    faq_store = vector_stores.get(restaurant_id, index="faq", create=False)
+    return (vector_store.version, faq_store.version if faq_store is not None else None)
 
-print("[OK] All services initialized successfully!")
+
+def precompute_answer(restaurant_id, question):
+    """
+    Answer a standalone question like /api/chat with default parameters
+    
+    Used by the warming job for the most frequent questions.
+    
+    Returns:
+        Tuple of (collection version, result) or None if there are no documents
+    """
+    version = collection_version(restaurant_id)
+    if version is None:
+        return None
+    vector_store = vector_stores.get(restaurant_id, create=False)
+    if vector_store is None:
+        return None
+    
+    query_model = vector_store.embedding_model
+    query_embedding = get_embedding_service(query_model).generate_embedding(question)
+    
+    if FAQ_FAST_PATH:
+        faq_match = match_faq(restaurant_id, query_embedding, query_model)
+        if faq_match:
+            return version, {
+                "answer": faq_match["text"],
+                "results": [faq_match],
+                "tokens_used": None,
+                "model": None,
+                "fast_path": "faq"
+            }
+    
+    results = retrieve_chunks(
+        vector_store, question, query_embedding,
+        CHAT_DEFAULTS["top_k"], CHAT_DEFAULTS["diversity"], rerank=CHAT_DEFAULTS["rerank"]
+    )
+    if results['count'] == 0:
+        return None
+    
+    response = llm_client.chat_completion(
+        user_question=question,
+        context="\n\n".join([r["text"] for r in results['results']]),
+        temperature=CHAT_DEFAULTS["temperature"],
+        max_tokens=CHAT_DEFAULTS["max_tokens"]
+    )
+    return version, {
+        "answer": response['response'],
+        "results": results['results'],
+        "tokens_used": response['tokens_used'],
+        "model": response['model'],
+        "fast_path": None
+    }
+
+
+# Most asked questions are answered ahead of time and served from memory
+answers = AnswerCache(
+    compute=precompute_answer,
+    version=collection_version,
+    between_questions=scheduler.yield_to_interactive
+)
 
 
 def allowed_file(filename):
@@ -51,36 +250,344 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def get_vector_store(restaurant_id, create=False):
+    """
+    Resolve the vector store shard for a restaurant
+
+    Only uploads create a restaurant's collection; other requests for a
+    restaurant without data get a 404, so they never create files.
+
+    Returns:
+        Tuple of (store, error_response); error_response is set for invalid
+        ids and unknown restaurants
+    """
+    try:
+        # The default collection always exists (created on warm-up)
+        vector_store = vector_stores.get(restaurant_id, create=create or not restaurant_id)
+    except ValueError as e:
+        return None, (jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400)
+    if vector_store is None:
+        return None, (jsonify({
+            "success": False,
+            "error": f"No documents for restaurant: {restaurant_id}"
+        }), 404)
+    
+    # Opening a collection built with an older model queues its re-embedding
+    try:
+        migrations.ensure(restaurant_id)
+    except Exception as e:
+        print(f"[WARN] Could not check embedding model of '{vector_store.collection_name}': {str(e)}")
+    
+    return vector_store, None
+
+
+def parse_diversity(data):
+    """
+    Read the optional diversity field of a retrieval request
+    
+    Returns:
+        Tuple of (diversity, error_response); error_response is set for invalid values
+    """
+    try:
+        diversity = float(data.get('diversity', DEFAULT_DIVERSITY))
+    except (TypeError, ValueError):
+        diversity = -1.0
+    
+    if not 0.0 <= diversity <= 1.0:
+        return None, (jsonify({
+            "success": False,
+            "error": "diversity must be a number between 0 and 1"
+        }), 400)
+    return diversity, None
+
+
+def parse_source_format(data):
+    """
+    Read the optional source_format field of a retrieval request
+    
+    Returns:
+        Tuple of (source_format, error_response); error_response is set for invalid values
+    """
+    source_format = data.get('source_format', 'full')
+    if source_format not in SOURCE_FORMATS:
+        return None, (jsonify({
+            "success": False,
+            "error": f"source_format must be one of: {', '.join(SOURCE_FORMATS)}"
+        }), 400)
+    return source_format, None
+
+
+def format_source(result, source_format="full"):
+    """
+    Shape a retrieved chunk for the response
+    
+    full:    text and metadata, with page_start/page_end for PDF chunks
+    snippet: text cut to SNIPPET_CHARS at a word boundary
+    ids:     chunk/document ids and score only (client has the text cached)
+    """
+    metadata = result["metadata"]
+    if source_format == "ids":
+        return {
+            "id": result["id"],
+            "document_id": metadata.get("document_id", "unknown"),
+            "chunk_index": metadata.get("chunk_index", 0),
+            "similarity": round(result["similarity"], 3)
+        }
+    
+    text = result["text"]
+    if source_format == "snippet" and len(text) > SNIPPET_CHARS:
+        text = text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+    
+    source = {
+        "text": text,
+        "document_name": metadata.get("document_name", "unknown"),
+        "document_id": metadata.get("document_id", "unknown"),
+        "chunk_index": metadata.get("chunk_index", 0),
+        "similarity": round(result["similarity"], 3)
+    }
+    # Page citation for PDFs (older chunks and DOCX files have none)
+    if "page_start" in metadata:
+        source["page_start"] = metadata["page_start"]
+        source["page_end"] = metadata["page_end"]
+    return source
+
+
+def retrieve_chunks(vector_store, query, query_embedding, top_k, diversity, rerank=True):
+    """
+    Vector search followed by the optional cross-encoder rerank stage
+    
+    With reranking on, RERANK_CANDIDATES chunks are fetched and only the
+    best top_k by cross-encoder score are returned. If the reranker model
+    cannot be loaded, results keep the vector store order.
+    """
+    rerank_service = None
+    if rerank and reranker is not None:
+        # A failed load is not retried on every request (restart to retry)
+        if reranker.status()["status"] != "failed":
+            try:
+                rerank_service = reranker.get()
+            except Exception as e:
+                print(f"[WARN] Reranker unavailable, keeping vector order: {str(e)}")
+        if rerank_service is None:
+            RERANK_FALLBACKS.inc(reason="unavailable")
+    
+    with stage("retrieve"):
+        results = vector_store.query_similar(
+            query_embedding,
+            top_k=max(top_k, RERANK_CANDIDATES) if rerank_service is not None else top_k,
+            diversity=diversity
+        )
+    
+    if rerank_service is not None:
+        with stage("rerank"):
+            results = rerank_service.rerank(query, results, top_k)
+    
+    return results
+
+
+def match_faq(restaurant_id, query_embedding, query_model=None):
+    """
+    Look up the closest stored FAQ question
+    
+    Args:
+        restaurant_id: Tenant identifier
+        query_embedding: Embedding of the question
+        query_model: Model the question was embedded with; the FAQ index is
+            skipped while it is on a different model (mid-migration)
+    
+    Returns:
+        The FAQ entry (text is the stored answer) if its similarity reaches
+        FAQ_MATCH_THRESHOLD, otherwise None
+    """
+    faq_store = vector_stores.get(restaurant_id, index="faq", create=False)
+    if faq_store is None:
+        return None
+    if (faq_store.embedding_model or EMBEDDING_MODEL) != (query_model or EMBEDDING_MODEL):
+        return None
+    
+    matches = faq_store.query_similar(query_embedding, top_k=1)['results']
+    if matches and matches[0]["similarity"] >= FAQ_MATCH_THRESHOLD:
+        CACHE_HITS.inc(cache="faq")
+        return matches[0]
+    
+    CACHE_MISSES.inc(cache="faq")
+    return None
+
+
+def is_admin_request():
+    """Check the X-Admin-Token header against ADMIN_TOKEN (admin routes are off without it)"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(admin_token) and hmac.compare_digest(supplied, admin_token)
+
+
+def profile_if_requested(view):
+    """
+    Attach a cProfile summary to a JSON response when an admin asks for it
+    
+    Triggered by ?profile=1 (or "profile": true in the JSON body) together
+    with a valid X-Admin-Token header; otherwise the view runs untouched.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        body = request.get_json(silent=True) or {}
+        requested = request.args.get('profile') == '1' or body.get('profile') is True
+        
+        if not requested or not is_admin_request():
+            return view(*args, **kwargs)
+        
+        (response, status), summary = profile_call(view, *args, **kwargs)
+        data = response.get_json()
+        data["profile"] = summary
+        return jsonify(data), status
+    
+    return wrapper
+
+
+def scheduled(workload):
+    """
+    Run a view inside a scheduler slot for its workload class
+    
+    Requests shed by admission control get 429 with a Retry-After header.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                with scheduler.admit(workload):
+                    return view(*args, **kwargs)
+            except Overloaded as e:
+                response = jsonify({
+                    "success": False,
+                    "error": str(e),
+                    "retry_after": e.retry_after
+                })
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+        return wrapper
+    return decorator
+
+
+# ==================== INSTRUMENTATION ====================
+
+@app.before_request
+def start_request_metrics():
+    """Track in-flight requests and start collecting stage timings"""
+    g.request_start = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or "unknown"
+    IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+    start_request_timing()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency and expose stage timings via Server-Timing"""
+    elapsed = time.perf_counter() - g.request_start
+    REQUESTS.inc(endpoint=g.metrics_endpoint, status=response.status_code)
+    REQUEST_SECONDS.observe(elapsed, endpoint=g.metrics_endpoint)
+
+    if request_timings():
+        response.headers['Server-Timing'] = server_timing_header(elapsed)
+
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(error):
+    """Decrement in-flight gauge even when the request failed"""
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint:
+        IN_FLIGHT.dec(endpoint=endpoint)
+
+
 # ==================== API ENDPOINTS ====================
 
+def readiness():
+    """
+    Overall readiness: "ready", "warming_up" or "failed"
+
+    With WARMUP_MODE=off nothing is warmed up; services load on first use,
+    so the app is ready unless a service already failed to load.
+    """
+    if WARMUP_MODE == "off":
+        services = [embedding_service, llm_client] + ([reranker] if reranker is not None else [])
+        return "failed" if any(s.status()["status"] == "failed" for s in services) else "ready"
+    return "ready" if warmup.ready else ("failed" if warmup.error else "warming_up")
+
+
+def service_status():
+    """Readiness of each service"""
+    return {
+        "document_processor": "ready",
+        "embedding_service": embedding_service.status()["status"],
+        "vector_store": "ready" if warmup.ready or vector_stores.is_resident(None) else "not_loaded",
+        "llm_client": llm_client.status()["status"],
+        "reranker": reranker.status()["status"] if reranker is not None else "disabled"
+    }
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
         "message": "RAG Restaurant Assistant API is running",
+        "services": service_status()
+    }), 200
+
+
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness probe: the process is up and serving (never waits on models)"""
+    return jsonify({"status": "alive"}), 200
+
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """
+    Readiness probe: services are loaded and warmed up
+    
+    Response:
+        - 200 when ready (always with WARMUP_MODE=off unless a service failed
+          to load), 503 while warming up or after a failed warmup
+    """
+    status = readiness()
+    report = {
+        "status": status,
         "services": {
-            "document_processor": "ready",
-            "embedding_service": "ready",
-            "vector_store": "ready",
-            "groq_client": "ready"
+            "embedding_service": embedding_service.status(),
+            "llm_client": llm_client.status()
         }
-    }), 200
+    }
+    if reranker is not None:
+        report["services"]["reranker"] = reranker.status()
+    if warmup.seconds is not None:
+        report["warmup_seconds"] = round(warmup.seconds, 3)
+    if warmup.error:
+        report["error"] = warmup.error
+    
+    return jsonify(report), 200 if status == "ready" else 503
 
 
 @app.route('/api/upload', methods=['POST'])
+@scheduled(BATCH)
 def upload_document():
     """
     Upload and process a document
     
     Request:
         - file: Document file (PDF or DOCX)
+        - restaurant_id: string (optional form field, selects the tenant collection)
     
     Response:
         - success: boolean
         - message: string
         - document_id: string
         - chunks_created: int
+        - faq_entries: int (question/answer pairs indexed for the FAQ fast path)
     """
     try:
         # Check if file is present
@@ -106,6 +613,10 @@ def upload_document():
                 "error": f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
         
+        vector_store, error = get_vector_store(request.form.get('restaurant_id'), create=True)
+        if error:
+            return error
+        
         # Secure the filename
         filename = secure_filename(file.filename)
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -115,7 +626,8 @@ def upload_document():
         
         # Process document
         print(f"Processing document: {filename}")
-        chunks, doc_hash = doc_processor.process_document(file_path, filename)
+        with stage("process_document"):
+            chunks, doc_hash, qa_pairs = doc_processor.process_document_with_qa(file_path, filename)
         
         # Check if document already exists
         if vector_store.document_exists(doc_hash):
@@ -127,20 +639,39 @@ def upload_document():
                 "already_exists": True
             }), 200
         
-        # Generate embeddings
+        # Generate embeddings (with the collection's model until it is migrated)
         print(f"Generating embeddings for {len(chunks)} chunks...")
         chunk_texts = [chunk["text"] for chunk in chunks]
-        embeddings = embedding_service.generate_embeddings_batch(
-            chunk_texts,
-            batch_size=32,
-            show_progress=False
-        )
+        embedder = embedder_for(vector_store)
+        with stage("embed_batch"):
+            embeddings = embedder.generate_embeddings_batch(
+                chunk_texts,
+                show_progress=False,
+                between_batches=scheduler.yield_to_interactive
+            )
         
         # Store in vector database
         document_id = f"doc_{doc_hash[:8]}"
-        vector_store.add_documents(chunks, embeddings, document_id)
+        with stage("store"):
+            vector_store.add_documents(chunks, embeddings, document_id, model=embedder.model_name)
+        
+        # Index FAQ questions separately: the stored text is the answer
+        if qa_pairs:
+            faq_store = vector_stores.get(request.form.get('restaurant_id'), index="faq")
+            faq_embedder = embedder_for(faq_store)
+            with stage("embed_batch"):
+                question_embeddings = faq_embedder.generate_embeddings_batch(
+                    [pair["question"] for pair in qa_pairs],
+                    show_progress=False,
+                    between_batches=scheduler.yield_to_interactive
+                )
+            with stage("store"):
+                faq_store.add_documents(
+                    qa_pairs, question_embeddings, document_id, model=faq_embedder.model_name
+                )
         
         print(f"[OK] Document processed successfully: {filename}")
+        answers.refresh(request.form.get('restaurant_id'))
         
         return jsonify({
             "success": True,
@@ -148,6 +679,7 @@ def upload_document():
             "document_id": document_id,
             "document_name": filename,
             "chunks_created": len(chunks),
+            "faq_entries": len(qa_pairs),
             "already_exists": False
         }), 201
         
@@ -161,6 +693,8 @@ def upload_document():
 
 
 @app.route('/api/chat', methods=['POST'])
+@scheduled(INTERACTIVE)
+@profile_if_requested
 def chat():
     """
     Query the RAG system with a question
@@ -168,14 +702,24 @@ def chat():
     Request:
         - question: string (required)
         - top_k: int (optional, default: 5)
+        - diversity: float 0-1 (optional, default: RETRIEVAL_DIVERSITY; >0 removes
+          near-duplicate chunks and balances relevance against novelty)
+        - rerank: bool (optional, default: true; only applies with RERANK_ENABLED)
         - temperature: float (optional, default: 0.7)
         - max_tokens: int (optional, default: 500)
+        - restaurant_id: string (optional, selects the tenant collection)
+        - session_id: string (optional, e.g. the table id; keeps conversation
+          memory so follow-up questions work)
+        - source_format: "full" (default), "snippet" or "ids"
+        - profile: bool (optional, admin only: attach a cProfile summary)
     
     Response:
         - success: boolean
         - answer: string
         - sources: list of relevant chunks
-        - tokens_used: object
+        - tokens_used: object (null for FAQ fast-path answers)
+        - fast_path: "faq" when a stored FAQ answer was returned without the LLM,
+          "warm" when the answer was precomputed for a frequently asked question
     """
     try:
         # Get request data
@@ -188,9 +732,19 @@ def chat():
             }), 400
         
         question = data['question']
-        top_k = data.get('top_k', 5)
-        temperature = data.get('temperature', 0.7)
-        max_tokens = data.get('max_tokens', 500)
+        top_k = data.get('top_k', CHAT_DEFAULTS["top_k"])
+        diversity, error = parse_diversity(data)
+        if error:
+            return error
+        source_format, error = parse_source_format(data)
+        if error:
+            return error
+        temperature = data.get('temperature', CHAT_DEFAULTS["temperature"])
+        max_tokens = data.get('max_tokens', CHAT_DEFAULTS["max_tokens"])
+        
+        vector_store, error = get_vector_store(data.get('restaurant_id'))
+        if error:
+            return error
         
         # Validate question
         if not question.strip():
@@ -199,11 +753,80 @@ def chat():
                 "error": "Question cannot be empty"
             }), 400
         
+        session = None
+        if data.get('session_id') is not None:
+            try:
+                session = sessions.get(str(data['session_id']), data.get('restaurant_id'))
+            except ValueError as e:
+                return jsonify({
+                    "success": False,
+                    "error": str(e)
+                }), 400
+        
+        # Follow-ups ("is it spicy?") are retrieved together with the earlier question
+        retrieval_query = sessions.rewrite_query(session, question) if session else question
+        
+        # Fast path: a frequent standalone question answered ahead of time
+        if retrieval_query == question:
+            answers.record(data.get('restaurant_id'), question)
+            warm = None
+            if all(data.get(key, value) == value for key, value in CHAT_DEFAULTS.items()):
+                warm = answers.lookup(
+                    data.get('restaurant_id'), question, collection_version(data.get('restaurant_id'))
+                )
+            if warm:
+                if session:
+                    sessions.record(session, question, warm["answer"])
+                sources = [format_source(r, source_format) for r in warm["results"]]
+                if warm["fast_path"] == "faq":
+                    sources = [
+                        dict(source, question=r["metadata"].get("question"))
+                        for source, r in zip(sources, warm["results"])
+                    ]
+                result = {
+                    "success": True,
+                    "answer": warm["answer"],
+                    "sources": sources,
+                    "tokens_used": None,
+                    "model": warm["model"],
+                    "fast_path": "warm"
+                }
+                if session:
+                    result["session_id"] = str(data['session_id'])
+                return jsonify(result), 200
+        
         # Generate query embedding
-        query_embedding = embedding_service.generate_embedding(question)
+        query_model = vector_store.embedding_model
+        with stage("embed"):
+            query_embedding = get_embedding_service(query_model).generate_embedding(retrieval_query)
+        
+        # Fast path: a standalone question matching a stored FAQ question
+        if FAQ_FAST_PATH and retrieval_query == question:
+            with stage("faq"):
+                faq_match = match_faq(data.get('restaurant_id'), query_embedding, query_model)
+            if faq_match:
+                if session:
+                    sessions.record(session, question, faq_match["text"])
+                result = {
+                    "success": True,
+                    "answer": faq_match["text"],
+                    "sources": [dict(
+                        format_source(faq_match, source_format),
+                        question=faq_match["metadata"].get("question")
+                    )],
+                    "tokens_used": None,
+                    "model": None,
+                    "fast_path": "faq"
+                }
+                if session:
+                    result["session_id"] = str(data['session_id'])
+                return jsonify(result), 200
         
         # Retrieve similar chunks
-        results = vector_store.query_similar(query_embedding, top_k=top_k)
+        results = retrieve_chunks(
+            vector_store, retrieval_query, query_embedding, top_k, diversity,
+            rerank=data.get('rerank', True)
+        )
         
         # Check if any documents exist
         if results['count'] == 0:
@@ -218,31 +841,41 @@ def chat():
         context = "\n\n".join([r["text"] for r in results['results']])
         
         # Generate answer using LLM
-        response = groq_client.chat_completion(
-            user_question=question,
-            context=context,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+        with stage("llm"):
+            if session:
+                summary, history = sessions.history(session)
+                response = llm_client.chat_with_history(
+                    llm_client.build_messages(
+                        question, context, history=history, summary=summary
+                    ),
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            else:
+                response = llm_client.chat_completion(
+                    user_question=question,
+                    context=context,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+        
+        if session:
+            sessions.record(session, question, response['response'])
         
         # Format sources for frontend
-        sources = [
-            {
-                "text": r["text"],
-                "document_name": r["metadata"].get("document_name", "unknown"),
-                "chunk_index": r["metadata"].get("chunk_index", 0),
-                "similarity": round(r["similarity"], 3)
-            }
-            for r in results['results']
-        ]
+        sources = [format_source(r, source_format) for r in results['results']]
         
-        return jsonify({
+        result = {
             "success": True,
             "answer": response['response'],
             "sources": sources,
             "tokens_used": response['tokens_used'],
             "model": response['model']
-        }), 200
+        }
+        if session:
+            result["session_id"] = str(data['session_id'])
+        
+        return jsonify(result), 200
         
     except Exception as e:
         print(f"Error processing chat query: {str(e)}")
@@ -258,6 +891,9 @@ def list_documents():
     """
     Get list of all documents in the vector store
     
+    Query parameters:
+        - restaurant_id: string (optional, selects the tenant collection)
+    
     Response:
         - success: boolean
         - documents: list of document objects
@@ -265,14 +901,20 @@ def list_documents():
         - total_chunks: int
     """
     try:
-        documents = vector_store.get_all_documents()
-        stats = vector_store.get_stats()
+        try:
+            # SQL storage lists without loading the tenant's vectors
+            documents, total_chunks = vector_stores.list_documents(request.args.get('restaurant_id'))
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
         return jsonify({
             "success": True,
             "documents": documents,
-            "total_documents": stats['total_documents'],
-            "total_chunks": stats['total_chunks']
+            "total_documents": len(documents),
+            "total_chunks": total_chunks
         }), 200
         
     except Exception as e:
@@ -290,6 +932,7 @@ def delete_document(document_id):
     
     Parameters:
         - document_id: string (in URL path)
+        - restaurant_id: string (optional query parameter, selects the tenant collection)
     
     Response:
         - success: boolean
@@ -297,9 +940,18 @@ def delete_document(document_id):
         - chunks_deleted: int
     """
     try:
+        vector_store, error = get_vector_store(request.args.get('restaurant_id'))
+        if error:
+            return error
+        
         chunks_deleted = vector_store.delete_document(document_id)
         
+        faq_store = vector_stores.get(request.args.get('restaurant_id'), index="faq", create=False)
+        if chunks_deleted > 0 and faq_store is not None:
+            faq_store.delete_document(document_id)
+        
         if chunks_deleted > 0:
+            answers.refresh(request.args.get('restaurant_id'))
             return jsonify({
                 "success": True,
                 "message": f"Document deleted successfully",
@@ -320,16 +972,55 @@ def delete_document(document_id):
         }), 500
 
 
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def end_session(session_id):
+    """
+    Forget a conversation (e.g. when the table is cleared)
+    
+    Parameters:
+        - session_id: string (in URL path)
+        - restaurant_id: string (optional query parameter)
+    
+    Response:
+        - success: boolean
+        - message: string
+    """
+    try:
+        if not sessions.end(session_id, request.args.get('restaurant_id')):
+            return jsonify({
+                "success": False,
+                "error": f"Session not found: {session_id}"
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "message": f"Session {session_id} ended"
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """
     Get system statistics
     
+    Query parameters:
+        - restaurant_id: string (optional, selects the tenant collection)
+    
     Response:
         - success: boolean
         - stats: object with system information
     """
     try:
+        vector_store, error = get_vector_store(request.args.get('restaurant_id'))
+        if error:
+            return error
+        
         stats = vector_store.get_stats()
         
         return jsonify({
@@ -341,7 +1032,24 @@ def get_stats():
                 "embedding_model": os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
                 "llm_model": os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"),
                 "chunk_size": int(os.getenv("CHUNK_SIZE", 1000)),
-                "chunk_overlap": int(os.getenv("CHUNK_OVERLAP", 200))
+                "chunk_overlap": int(os.getenv("CHUNK_OVERLAP", 200)),
+                "tenants": vector_stores.get_stats(),
+                "sessions": sessions.get_stats(),
+                "llm_routing": (
+                    llm_client.get_stats()
+                    if llm_client.ready and isinstance(llm_client.get(), LLMRouter)
+                    else None
+                ),
+                "scheduler": scheduler.get_stats(),
+                "collection_embedding_model": stats['embedding_model'],
+                "embedding_dimension": stats['dimension'],
+                "migrations": migrations.get_stats(),
+                "answer_cache": answers.get_stats(),
+                "embedding_pool": (
+                    embedding_service.pool.get_stats()
+                    if embedding_service.ready and embedding_service.pool is not None
+                    else None
+                )
             }
         }), 200
         
@@ -354,6 +1062,7 @@ def get_stats():
 
 
 @app.route('/api/search', methods=['POST'])
+@scheduled(INTERACTIVE)
 def semantic_search():
     """
     Perform semantic search without LLM response
@@ -361,10 +1070,19 @@ def semantic_search():
     Request:
         - query: string (required)
         - top_k: int (optional, default: 5)
+        - diversity: float 0-1 (optional, default: RETRIEVAL_DIVERSITY)
+        - rerank: bool (optional, default: true; only applies with RERANK_ENABLED)
+        - source_format: "full" (default), "snippet" or "ids"
+        - restaurant_id: string (optional, selects the tenant collection)
+        - compare_models: bool (optional; during an embedding model migration
+          also search the shadow index for A/B comparison)
     
     Response:
         - success: boolean
         - results: list of matching chunks with similarity scores
+        - embedding_model: model the searched collection uses
+        - shadow: results from the shadow index with the new model and the
+          overlap with the live results (only with compare_models mid-migration)
     """
     try:
         data = request.get_json()
@@ -377,31 +1095,56 @@ def semantic_search():
         
         query = data['query']
         top_k = data.get('top_k', 5)
+        diversity, error = parse_diversity(data)
+        if error:
+            return error
+        source_format, error = parse_source_format(data)
+        if error:
+            return error
+        
+        vector_store, error = get_vector_store(data.get('restaurant_id'))
+        if error:
+            return error
         
         # Generate query embedding
-        query_embedding = embedding_service.generate_embedding(query)
+        with stage("embed"):
+            query_embedding = embedder_for(vector_store).generate_embedding(query)
         
         # Retrieve similar chunks
-        results = vector_store.query_similar(query_embedding, top_k=top_k)
+        results = retrieve_chunks(
+            vector_store, query, query_embedding, top_k, diversity,
+            rerank=data.get('rerank', True)
+        )
         
         # Format results
-        formatted_results = [
-            {
-                "text": r["text"],
-                "document_name": r["metadata"].get("document_name", "unknown"),
-                "document_id": r["metadata"].get("document_id", "unknown"),
-                "chunk_index": r["metadata"].get("chunk_index", 0),
-                "similarity": round(r["similarity"], 3)
-            }
-            for r in results['results']
-        ]
+        formatted_results = [format_source(r, source_format) for r in results['results']]
         
-        return jsonify({
+        response = {
             "success": True,
             "query": query,
             "results": formatted_results,
-            "count": results['count']
-        }), 200
+            "count": results['count'],
+            "embedding_model": vector_store.embedding_model or EMBEDDING_MODEL
+        }
+        
+        shadow_store = migrations.shadow_store(data.get('restaurant_id'))
+        if data.get('compare_models') and shadow_store is not None:
+            with stage("shadow"):
+                shadow_results = retrieve_chunks(
+                    shadow_store, query,
+                    get_embedding_service(migrations.target_model).generate_embedding(query),
+                    top_k, diversity, rerank=data.get('rerank', True)
+                )
+            live_ids = {r["id"] for r in results['results']}
+            shadow_ids = {r["id"] for r in shadow_results['results']}
+            response["shadow"] = {
+                "embedding_model": migrations.target_model,
+                "results": [format_source(r, source_format) for r in shadow_results['results']],
+                "count": shadow_results['count'],
+                "overlap": round(len(live_ids & shadow_ids) / max(len(live_ids | shadow_ids), 1), 3)
+            }
+        
+        return jsonify(response), 200
         
     except Exception as e:
         print(f"Error performing search: {str(e)}")
@@ -411,6 +1154,171 @@ def semantic_search():
         }), 500
 
 
+@app.route('/api/embed', methods=['POST'])
+@scheduled(INTERACTIVE)
+def embed_texts():
+    """
+    Embed texts with the service's model
+    
+    Request:
+        - texts: list of strings (or text: string), at most EMBED_MAX_TEXTS
+        - format: "json" (default), "base64" or "binary"
+    
+    Response:
+        - json:   success, dimension, count, embeddings (list of float lists)
+        - base64: success, dimension, count, dtype ("<f4"), embeddings
+                  (base64 of the row-major little-endian float32 matrix)
+        - binary: application/octet-stream body with the raw float32 matrix;
+                  shape in X-Embedding-Count / X-Embedding-Dimension headers
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        texts = data.get('texts')
+        if texts is None and 'text' in data:
+            texts = [data['text']]
+        output_format = data.get('format', 'json')
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({
+                "success": False,
+                "error": "texts (list of strings) or text is required"
+            }), 400
+        if len(texts) > EMBED_MAX_TEXTS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {EMBED_MAX_TEXTS} texts per request"
+            }), 400
+        if not all(isinstance(t, str) and t.strip() for t in texts):
+            return jsonify({
+                "success": False,
+                "error": "texts must be non-empty strings"
+            }), 400
+        if output_format not in EMBED_FORMATS:
+            return jsonify({
+                "success": False,
+                "error": f"format must be one of: {', '.join(EMBED_FORMATS)}"
+            }), 400
+        
+        with stage("embed"):
+            if len(texts) == 1:
+                # Single texts go through the query embedding cache
+                matrix = embedding_service.generate_embedding(texts[0]).reshape(1, -1)
+            else:
+                matrix = embedding_service.generate_embeddings_batch(texts, show_progress=False)
+        
+        count, dimension = matrix.shape
+        if output_format == "binary":
+            response = Response(matrix.astype('<f4', copy=False).tobytes(), mimetype='application/octet-stream')
+            response.headers['X-Embedding-Count'] = str(count)
+            response.headers['X-Embedding-Dimension'] = str(dimension)
+            return response, 200
+        
+        if output_format == "base64":
+            embeddings = base64.b64encode(matrix.astype('<f4', copy=False).tobytes()).decode('ascii')
+        else:
+            embeddings = matrix.tolist()
+        
+        result = {
+            "success": True,
+            "dimension": dimension,
+            "count": count,
+            "embeddings": embeddings
+        }
+        if output_format == "base64":
+            result["dtype"] = "<f4"
+        return jsonify(result), 200
+        
+    except Exception as e:
+        print(f"Error generating embeddings: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Expose metrics in Prometheus text format
+    
+    Includes per-stage latency histograms, request counts and latency,
+    in-flight requests, LLM token usage and cache hit/miss counters.
+    """
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/admin/migrations', methods=['POST'])
+def start_migrations():
+    """
+    Re-embed every collection still on an older embedding model (admin only)
+    
+    Collections are otherwise migrated when first opened after EMBEDDING_MODEL
+    changes; this also covers tenants that have not been used since.
+    
+    Response:
+        - success: boolean
+        - migrations: target model and progress of each migration
+    """
+    if not is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "Admin token required"
+        }), 403
+    
+    try:
+        migrations.ensure_all()
+        return jsonify({
+            "success": True,
+            "migrations": migrations.get_stats()
+        }), 202
+        
+    except Exception as e:
+        print(f"Error starting migrations: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """
+    Sample all request threads and return collapsed stacks (admin only)
+    
+    Query parameters:
+        - seconds: float (optional, default: 10, capped by PROFILE_MAX_SECONDS)
+    
+    Response:
+        - text/plain flamegraph-compatible collapsed stacks
+          (feed to flamegraph.pl or speedscope)
+    """
+    if not is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "Admin token required"
+        }), 403
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "seconds must be a number"
+        }), 400
+    
+    try:
+        collapsed, samples = sampling_profiler.profile(seconds)
+    except RuntimeError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 409
+    
+    response = Response(collapsed, mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(samples)
+    return response
+
+
 # Error handlers
 @app.errorhandler(413)
 def request_entity_too_large(error):
@@ -0,0 +1,308 @@
+"""
+RAG Latency Benchmark
+Drives the Flask app in-process against a synthetic corpus and a local fake
+Groq server, and reports p50/p95/p99 latency per stage of /api/chat
+
+Usage:
+    python benchmark_rag.py --corpus-sizes 1000,100000 --concurrency 1,8 --requests 200
+    python benchmark_rag.py --output run.json --compare baseline.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from fake_groq_server import start_fake_groq_server
+
+STAGES = ["embed", "retrieve", "prompt_build", "llm", "serialize", "other", "total"]
+
+QUESTIONS = [
+    "What are your opening hours?",
+    "Do you have vegetarian dishes?",
+    "Is the paneer tikka spicy?",
+    "Can I book a table for six people tonight?",
+    "Which desserts do you recommend?",
+    "Do you offer gluten free options?",
+    "How long does delivery take?",
+    "What is the price of the chef's special?",
+]
+
+_WORDS = (
+    "menu dish spicy sweet chef table order delivery vegan paneer curry rice "
+    "bread dessert drink price offer booking hours garden starter main sauce"
+).split()
+
+
+class StageTimer:
+    """Accumulate wall time per stage for the request running on this thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def start_request(self):
+        self._local.stages = defaultdict(float)
+
+    def stages(self):
+        return dict(self._local.stages)
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stages = getattr(self._local, "stages", None)
+                if stages is not None:
+                    stages[stage] += time.perf_counter() - start
+        return timed
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _import_app(persist_dir, groq_url):
+    """Import app.py wired to the fake LLM and a scratch data directory"""
+    os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY") or "benchmark"
+    os.environ["GROQ_BASE_URL"] = groq_url
+    os.environ["CHROMA_PERSIST_DIR"] = persist_dir
+    os.environ.setdefault("FLASK_DEBUG", "False")
+    # Load models before measuring anything
+    os.environ.setdefault("WARMUP_MODE", "eager")
+
+    import app as app_module
+    return app_module
+
+
+def _instrument(app_module, timer):
+    """Wrap the pipeline stages of /api/chat with per-thread timers"""
+    import vector_store
+
+    service = app_module.embedding_service
+    service.generate_embedding = timer.wrap("embed", service.generate_embedding)
+
+    vector_store.VectorStore.query_similar = timer.wrap(
+        "retrieve", vector_store.VectorStore.query_similar
+    )
+
+    llm = app_module.llm_client
+    completions = llm.client.chat.completions
+    completions.create = timer.wrap("llm", completions.create)
+    # Everything in chat_completion that is not the HTTP call is prompt building
+    llm.chat_completion = timer.wrap("llm_call", llm.chat_completion)
+
+    app_module.jsonify = timer.wrap("serialize", app_module.jsonify)
+
+
+def build_corpus(store, size, dimension, chunk_chars, seed=0, batch=100_000):
+    """Fill a store with ``size`` synthetic chunks (random unit vectors)"""
+    existing = store.count()
+    if existing >= size:
+        return
+
+    rng = np.random.default_rng(seed + existing)
+    print(f"Building synthetic corpus: {size:,} chunks (dim {dimension})...")
+
+    for batch_num, start in enumerate(range(existing, size, batch)):
+        n = min(batch, size - start)
+        embeddings = rng.standard_normal((n, dimension)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        words = rng.choice(_WORDS, size=(n, max(1, chunk_chars // 6)))
+        chunks = [
+            {
+                "text": " ".join(row)[:chunk_chars],
+                "document_name": f"synthetic_{start // batch}.pdf",
+                "document_hash": f"synthetic_{size}_{start}",
+                "chunk_index": i
+            }
+            for i, row in enumerate(words)
+        ]
+        store.add_documents(chunks, embeddings, f"synthetic_{start}")
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    arr = np.asarray(values) * 1000.0
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "mean": round(float(arr.mean()), 3)
+    }
+
+
+def run_load(app_module, timer, restaurant_id, concurrency, n_requests, top_k, max_tokens):
+    """Send ``n_requests`` chat requests with ``concurrency`` client threads"""
+    samples = defaultdict(list)
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one_request(i):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app_module.app.test_client()
+
+        timer.start_request()
+        start = time.perf_counter()
+        response = client.post("/api/chat", json={
+            "question": QUESTIONS[i % len(QUESTIONS)],
+            "top_k": top_k,
+            "max_tokens": max_tokens,
+            "restaurant_id": restaurant_id
+        })
+        total = time.perf_counter() - start
+        stages = timer.stages()
+
+        stages["prompt_build"] = max(0.0, stages.pop("llm_call", 0.0) - stages.get("llm", 0.0))
+        stages["other"] = max(0.0, total - sum(stages.get(s, 0.0) for s in STAGES[:5]))
+        stages["total"] = total
+
+        with lock:
+            if response.status_code != 200:
+                errors += 1
+                return
+            for stage in STAGES:
+                samples[stage].append(stages.get(stage, 0.0))
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(n_requests)))
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "throughput_rps": round((n_requests - errors) / wall, 2),
+        "stages_ms": {stage: _percentiles(samples[stage]) for stage in STAGES}
+    }
+
+
+def print_report(runs):
+    print("\n" + "=" * 78)
+    print("RAG LATENCY BENCHMARK (ms)")
+    print("=" * 78)
+    for run in runs:
+        print(f"\nCorpus {run['corpus_size']:,} chunks | concurrency {run['concurrency']} | "
+              f"{run['throughput_rps']} req/s | errors {run['errors']}")
+        print(f"  {'stage':<14}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}")
+        for stage, p in run["stages_ms"].items():
+            if p:
+                print(f"  {stage:<14}{p['p50']:>10.2f}{p['p95']:>10.2f}{p['p99']:>10.2f}{p['mean']:>10.2f}")
+
+
+def compare(runs, baseline_path):
+    """Print p95 changes against a previous JSON result"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    previous = {(r["corpus_size"], r["concurrency"]): r for r in baseline["runs"]}
+    print("\n" + "=" * 78)
+    print(f"P95 CHANGE vs {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print("=" * 78)
+    for run in runs:
+        old = previous.get((run["corpus_size"], run["concurrency"]))
+        if not old:
+            continue
+        print(f"\nCorpus {run['corpus_size']:,} | concurrency {run['concurrency']}")
+        for stage in STAGES:
+            new_p, old_p = run["stages_ms"].get(stage), old["stages_ms"].get(stage)
+            if new_p and old_p and old_p["p95"]:
+                delta = (new_p["p95"] - old_p["p95"]) / old_p["p95"] * 100
+                print(f"  {stage:<14}{old_p['p95']:>10.2f} -> {new_p['p95']:>10.2f}  ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end /api/chat latency benchmark")
+    parser.add_argument("--corpus-sizes", default="1000,10000", help="Comma-separated chunk counts (up to 1000000)")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per run")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each run")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--chunk-chars", type=int, default=300, help="Synthetic chunk length")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Fake LLM generation speed")
+    parser.add_argument("--completion-tokens", type=int, default=100)
+    parser.add_argument("--data-dir", help="Reuse synthetic corpora from this directory")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Previous JSON result to compare against")
+    args = parser.parse_args()
+
+    server = start_fake_groq_server(
+        latency_ms=args.llm_latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens
+    )
+    persist_dir = args.data_dir or tempfile.mkdtemp(prefix="rag_bench_")
+    app_module = _import_app(persist_dir, f"http://127.0.0.1:{server.server_port}")
+
+    timer = StageTimer()
+    _instrument(app_module, timer)
+    dimension = app_module.embedding_service.get_embedding_dimension()
+
+    runs = []
+    for size in [int(s) for s in args.corpus_sizes.split(",")]:
+        restaurant_id = f"bench{size}"
+        build_corpus(app_module.vector_stores.get(restaurant_id), size, dimension, args.chunk_chars)
+
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            if args.warmup:
+                run_load(app_module, timer, restaurant_id, concurrency, args.warmup, args.top_k, args.max_tokens)
+            result = run_load(
+                app_module, timer, restaurant_id, concurrency, args.requests, args.top_k, args.max_tokens
+            )
+            result["corpus_size"] = size
+            runs.append(result)
+
+    print_report(runs)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "args": vars(args)
+        },
+        "runs": runs
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[OK] Results written to {args.output}")
+
+    if args.compare:
+        compare(runs, args.compare)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Similarity Benchmark
+Compares the similarity kernels with the previous implementation: sklearn
+cosine_similarity plus a Python sort for search, per-call norms for pairs,
+and the import cost of each
+
+Usage:
+    python benchmark_similarity.py --sizes 1000,10000,100000 --threads 1
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from similarity import cosine, cosine_one_to_many, inverse_norms, set_blas_threads, top_k
+
+
+def old_compute_similarity(embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+    """EmbeddingService.compute_similarity before the similarity module"""
+    vec1 = np.asarray(embedding1, dtype=np.float32)
+    vec2 = np.asarray(embedding2, dtype=np.float32)
+    return float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+
+
+def old_search(cosine_similarity, query: np.ndarray, matrix: np.ndarray, k: int) -> list:
+    """VectorStore.query_similar ranking before the similarity module"""
+    similarities = cosine_similarity(query.reshape(1, -1), matrix)[0]
+    ranked = [(i, similarities[i]) for i in range(len(matrix))]
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    return [i for i, _ in ranked[:k]]
+
+
+def new_search(query: np.ndarray, matrix: np.ndarray, inv_norms: np.ndarray, k: int) -> list:
+    return top_k(cosine_one_to_many(query, matrix, inv_norms), k).tolist()
+
+
+def time_per_call(function, repeats: int) -> float:
+    """Median milliseconds per call"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return round(float(np.median(timings)) * 1000, 3)
+
+
+def import_seconds(module: str) -> float:
+    """Time to import a module in a fresh interpreter (numpy already loaded, as in the app)"""
+    code = (
+        "import time, numpy; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return round(float(output.stdout.strip().splitlines()[-1]), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similarity kernel benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated collection sizes")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--pairs", type=int, default=10000, help="Pairwise calls to time")
+    parser.add_argument("--threads", type=int, help="BLAS threads (default: library default)")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    set_blas_threads(args.threads)
+    rng = np.random.default_rng(0)
+
+    # Deferred: the baseline needs sklearn, which the app no longer imports
+    try:
+        from sklearn.metrics.pairwise import cosine_similarity
+    except ImportError:
+        cosine_similarity = None
+        print("[WARN] scikit-learn not installed, search baseline skipped")
+
+    results = {"search": [], "pairs": {}, "import_seconds": {}}
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        matrix = rng.standard_normal((size, args.dimension)).astype(np.float32)
+        query = rng.standard_normal(args.dimension).astype(np.float32)
+        inv_norms = inverse_norms(matrix)
+
+        row = {
+            "chunks": size,
+            "new_ms": time_per_call(lambda: new_search(query, matrix, inv_norms, args.top_k), args.repeats)
+        }
+        if cosine_similarity is not None:
+            row["old_ms"] = time_per_call(
+                lambda: old_search(cosine_similarity, query, matrix, args.top_k), args.repeats
+            )
+            row["speedup"] = round(row["old_ms"] / row["new_ms"], 1)
+            assert old_search(cosine_similarity, query, matrix, args.top_k) == \
+                new_search(query, matrix, inv_norms, args.top_k)
+        results["search"].append(row)
+
+    a = rng.standard_normal((args.pairs, args.dimension)).astype(np.float32)
+    b = rng.standard_normal((args.pairs, args.dimension)).astype(np.float32)
+    results["pairs"] = {
+        "old_us": round(time_per_call(lambda: [old_compute_similarity(x, y) for x, y in zip(a, b)], 3)
+                        * 1000 / args.pairs, 2),
+        "new_us": round(time_per_call(lambda: [cosine(x, y) for x, y in zip(a, b)], 3) * 1000 / args.pairs, 2)
+    }
+
+    results["import_seconds"]["similarity"] = import_seconds("similarity")
+    if cosine_similarity is not None:
+        results["import_seconds"]["sklearn.metrics.pairwise"] = import_seconds("sklearn.metrics.pairwise")
+
+    print(f"\n{'chunks':>8}{'old ms':>10}{'new ms':>10}{'speedup':>9}")
+    for r in results["search"]:
+        print(f"{r['chunks']:>8}{r.get('old_ms', '-'):>10}{r['new_ms']:>10}{r.get('speedup', '-'):>8}x")
+    print(f"\nPair similarity: {results['pairs']['old_us']} us -> {results['pairs']['new_us']} us per call")
+    for module, seconds in results["import_seconds"].items():
+        print(f"Import {module}: {seconds}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
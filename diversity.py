@@ -0,0 +1,101 @@
+"""
+Diversity Module
+Maximal Marginal Relevance (MMR) and near-duplicate suppression for retrieval results
+"""
+
+import hashlib
+import os
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from similarity import normalize, normalize_rows
+
+# Candidates fetched per requested result before diversifying
+DIVERSITY_CANDIDATE_FACTOR = int(os.getenv("DIVERSITY_CANDIDATE_FACTOR", 4))
+
+# Cosine similarity above which two chunks count as the same text
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", 0.95))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def chunk_hash(text: str) -> str:
+    """Hash of a chunk with case and whitespace normalized"""
+    normalized = _WHITESPACE.sub(" ", text).strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def dedupe_by_hash(texts: Sequence[str]) -> List[int]:
+    """
+    Positions of the first occurrence of each distinct chunk text
+
+    Args:
+        texts: Chunk texts, best match first
+
+    Returns:
+        Positions to keep, in their original order
+    """
+    seen = set()
+    keep = []
+    for position, text in enumerate(texts):
+        digest = chunk_hash(text)
+        if digest not in seen:
+            seen.add(digest)
+            keep.append(position)
+    return keep
+
+
+def mmr_select(
+    query_embedding: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    diversity: float,
+    relevance: Optional[np.ndarray] = None,
+    dedup_threshold: float = DEDUP_SIMILARITY_THRESHOLD
+) -> List[int]:
+    """
+    Select k candidates by Maximal Marginal Relevance
+
+    Each step picks the candidate maximizing
+    (1 - diversity) * relevance - diversity * max similarity to the picks so far,
+    using one pairwise similarity matrix over the candidates. Candidates at or
+    above dedup_threshold similarity to a pick are dropped.
+
+    Args:
+        query_embedding: Query vector
+        candidates: Candidate vectors (n, dim)
+        k: Number of results to select
+        diversity: 0.0 ranks by relevance only, 1.0 by novelty only
+        relevance: Optional precomputed query similarities (n,)
+        dedup_threshold: Similarity at which a candidate is a near-duplicate
+
+    Returns:
+        Selected row positions in selection order
+    """
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+
+    unit = normalize_rows(candidates)
+    if relevance is None:
+        relevance = unit @ normalize(query_embedding)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    pairwise = unit @ unit.T
+
+    selected = []
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+
+    while len(selected) < k and available.any():
+        scores = (1.0 - diversity) * relevance - diversity * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        redundancy = pairwise[best] if len(selected) == 1 else np.maximum(redundancy, pairwise[best])
+        available &= redundancy < dedup_threshold
+
+    return selected
@@ -4,14 +4,12 @@ Handles PDF/DOCX extraction, text chunking, and document hashing
 """
 
 import os
+import bisect
 import hashlib
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
-import PyPDF2
-from docx import Document
-
 # Try to import alternative PDF libraries
 try:
     import pdfplumber
@@ -27,6 +25,20 @@ except ImportError:
     OCR_AVAILABLE = False
 
 
+# A line that is a question, optionally numbered or prefixed "Q:" / "Question 3."
+_QUESTION_LINE = re.compile(
+    r'^(?:(?:Q(?:uestion)?\s*\d*|\d{1,3})\s*[:.)\-]\s*)?(?P<question>[^\n]{8,300}\?)$',
+    re.IGNORECASE
+)
+_ANSWER_PREFIX = re.compile(r'^A(?:nswer)?\s*\d*\s*[:.)\-]\s*', re.IGNORECASE)
+
+# Page markers inserted by _extract_from_pdf
+_PAGE_MARKER = re.compile(r'\[Page (\d+)\]')
+
+# Documents with fewer pairs are treated as prose
+QA_MIN_PAIRS = 2
+
+
 class DocumentProcessor:
     """Process and chunk documents for RAG system"""
     
@@ -76,6 +88,8 @@ class DocumentProcessor:
         2. pdfplumber (better for complex layouts)
         3. OCR with pytesseract (for scanned/image PDFs)
         """
+        import PyPDF2
+
         text = ""
 
         # Method 1: Try PyPDF2 first (fastest)
@@ -138,6 +152,8 @@ class DocumentProcessor:
     
     def _extract_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
+        from docx import Document
+
         try:
             doc = Document(file_path)
             text = "\n\n".join([paragraph.text for paragraph in doc.paragraphs])
@@ -158,48 +174,71 @@ class DocumentProcessor:
             metadata: Additional metadata to include with each chunk
             
         Returns:
-            List of chunk dictionaries with text and metadata
+            List of chunk dictionaries with text and metadata; char_start/char_end
+            locate each chunk in the cleaned text, page_start/page_end are set
+            for documents with page markers (PDFs)
         """
-        # Clean and normalize text
-        text = self._clean_text(text)
+        # Clean and normalize text, remembering where each page starts
+        text, page_starts = self._clean_pages(text)
         
         # Split into sentences for smarter chunking
         sentences = self._split_into_sentences(text)
         
+        # (chunk text, start, end) with offsets into the cleaned text, tracked
+        # as sentences are added so overlapping chunks are located exactly
         chunks = []
         current_chunk = ""
         current_length = 0
+        current_start = current_end = 0
+        cursor = 0
         
         for sentence in sentences:
             sentence_length = len(sentence)
+            # Sentences are stripped slices of the text, in order
+            sentence_start = text.find(sentence, cursor)
+            if sentence_start < 0:
+                sentence_start = cursor
+            cursor = sentence_start + sentence_length
             
             # If adding this sentence exceeds chunk size
             if current_length + sentence_length > self.chunk_size and current_chunk:
                 # Save current chunk
-                chunks.append(current_chunk.strip())
+                chunks.append((current_chunk.strip(), current_start, current_end))
                 
                 # Start new chunk with overlap
                 # Keep last few sentences for context
-                overlap_text = self._get_overlap_text(current_chunk)
+                overlap_text = self._get_overlap_text(current_chunk).strip()
+                if overlap_text:
+                    current_start = self._overlap_start(text, overlap_text, current_start, current_end)
+                else:
+                    current_start = sentence_start
                 current_chunk = overlap_text + " " + sentence
                 current_length = len(current_chunk)
             else:
+                if not current_chunk:
+                    current_start = sentence_start
                 current_chunk += " " + sentence
                 current_length += sentence_length
+            current_end = cursor
         
         # Add final chunk
         if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+            chunks.append((current_chunk.strip(), current_start, current_end))
         
         # Create chunk objects with metadata
         chunk_objects = []
-        for idx, chunk_text in enumerate(chunks):
+        for idx, (chunk_text, char_start, char_end) in enumerate(chunks):
             chunk_obj = {
                 "text": chunk_text,
                 "chunk_index": idx,
                 "total_chunks": len(chunks),
-                "char_count": len(chunk_text)
+                "char_count": len(chunk_text),
+                "char_start": char_start,
+                "char_end": char_end
             }
+            if page_starts:
+                chunk_obj["page_start"] = self._page_at(page_starts, char_start)
+                chunk_obj["page_end"] = self._page_at(page_starts, char_end - 1)
             
             # Add custom metadata if provided
             if metadata:
@@ -209,6 +248,51 @@ class DocumentProcessor:
         
         return chunk_objects
     
+    def _clean_pages(self, text: str) -> Tuple[str, List[Tuple[int, int]]]:
+        """
+        Remove page markers and clean each page's text
+
+        Returns:
+            Tuple of (cleaned text, [(offset in cleaned text, page number), ...]);
+            the list is empty when the text has no page markers
+        """
+        parts = _PAGE_MARKER.split(text)
+        if len(parts) == 1:
+            return self._clean_text(text), []
+
+        # parts = [text before the first marker, page, page text, page, page text, ...]
+        cleaned = []
+        page_starts = []
+        offset = 0
+        segments = [(None, parts[0])] + [(int(parts[i]), parts[i + 1]) for i in range(1, len(parts), 2)]
+        for page, segment in segments:
+            segment = self._clean_text(segment)
+            if not segment:
+                continue
+            if cleaned:
+                offset += 1             # joining space
+            if page is not None:
+                page_starts.append((offset, page))
+            cleaned.append(segment)
+            offset += len(segment)
+
+        return " ".join(cleaned), page_starts
+
+    @staticmethod
+    def _overlap_start(text: str, overlap_text: str, chunk_start: int, chunk_end: int) -> int:
+        """Offset where a chunk's overlap tail (carried into the next chunk) begins"""
+        start = chunk_end - len(overlap_text)
+        if start >= chunk_start and text.startswith(overlap_text, start):
+            return start
+        found = text.rfind(overlap_text, chunk_start, chunk_end)
+        return found if found >= 0 else max(start, chunk_start)
+
+    @staticmethod
+    def _page_at(page_starts: List[Tuple[int, int]], offset: int) -> Optional[int]:
+        """Page number containing a cleaned-text offset"""
+        index = bisect.bisect_right([start for start, _ in page_starts], offset) - 1
+        return page_starts[max(index, 0)][1]
+
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove excessive whitespace
@@ -236,6 +320,64 @@ class DocumentProcessor:
         
         return " ".join(sentences)
     
+    def extract_qa_pairs(self, text: str, metadata: Dict = None) -> List[Dict]:
+        """
+        Detect explicit question/answer structure (FAQ documents)
+        
+        A question is a line ending in "?", optionally numbered or prefixed
+        with "Q:"; its answer is everything up to the next question.
+        
+        Args:
+            text: Raw extracted text (line breaks intact)
+            metadata: Additional metadata to include with each pair
+            
+        Returns:
+            List of pair dictionaries with question, answer ("text") and metadata;
+            empty if the document does not look like a Q&A document
+        """
+        pairs = []
+        question, answer_lines = None, []
+        page = question_page = None
+        
+        def flush():
+            answer = self._clean_text(" ".join(answer_lines))
+            if question and answer:
+                pair = {"question": self._clean_text(question), "text": answer}
+                if question_page is not None:
+                    pair["page_start"], pair["page_end"] = question_page, page
+                pairs.append(pair)
+        
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            marker = _PAGE_MARKER.fullmatch(line)
+            if marker:
+                page = int(marker.group(1))
+                continue
+            match = _QUESTION_LINE.match(line)
+            if match:
+                flush()
+                question, answer_lines = match.group("question"), []
+                question_page = page
+            elif question:
+                answer_lines.append(_ANSWER_PREFIX.sub("", line) if not answer_lines else line)
+        flush()
+        
+        if len(pairs) < QA_MIN_PAIRS:
+            return []
+        
+        for idx, pair in enumerate(pairs):
+            pair.update({
+                "chunk_index": idx,
+                "total_chunks": len(pairs),
+                "char_count": len(pair["text"])
+            })
+            if metadata:
+                pair.update(metadata)
+        
+        return pairs
+    
     def generate_document_hash(self, file_path: str) -> str:
         """
         Generate MD5 hash of document for change detection
@@ -265,6 +407,20 @@ class DocumentProcessor:
         Returns:
             Tuple of (chunk_list, document_hash)
         """
+        chunks, doc_hash, _ = self.process_document_with_qa(file_path, document_name)
+        return chunks, doc_hash
+    
+    def process_document_with_qa(self, file_path: str, document_name: str = None) -> Tuple[List[Dict], str, List[Dict]]:
+        """
+        Document processing pipeline that also extracts Q&A pairs
+        
+        Args:
+            file_path: Path to document
+            document_name: Optional custom name (defaults to filename)
+            
+        Returns:
+            Tuple of (chunk_list, document_hash, qa_pairs)
+        """
         # Extract text
         print(f"Extracting text from {file_path}...")
         text = self.extract_text(file_path)
@@ -286,9 +442,13 @@ class DocumentProcessor:
         print(f"Chunking document into segments...")
         chunks = self.chunk_text(text, metadata)
         
+        qa_pairs = self.extract_qa_pairs(text, metadata)
+        
         print(f"✓ Processed {document_name}: {len(chunks)} chunks created")
+        if qa_pairs:
+            print(f"✓ Found {len(qa_pairs)} question/answer pairs")
         
-        return chunks, doc_hash
+        return chunks, doc_hash, qa_pairs
 
 
 # Example usage and testing
@@ -0,0 +1,263 @@
+"""
+Embedding Pool Module
+Worker processes for bulk embedding, pinned to cores with capped torch threads
+"""
+
+import itertools
+import os
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _worker_main(model_name: str, core: Optional[int], threads: int, nice: int, tasks, results):
+    """Load the model once, then embed batches from the task queue until told to stop"""
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    if nice:
+        os.nice(nice)
+    # Must be set before torch creates its thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+
+        # safetensors weights are memory-mapped, so workers share the page cache
+        model = SentenceTransformer(model_name, device="cpu")
+    except Exception as e:
+        results.put(("failed", os.getpid(), None, str(e)))
+        return
+
+    results.put(("ready", os.getpid(), None, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, batch_id, texts = task
+        try:
+            embeddings = model.encode(
+                texts,
+                batch_size=len(texts),
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            results.put((job_id, batch_id, np.asarray(embeddings, dtype=np.float32), None))
+        except Exception as e:
+            results.put((job_id, batch_id, None, str(e)))
+
+
+class EmbeddingPool:
+    """
+    Pool of embedding processes for large ingestion jobs
+
+    Batches are streamed to a shared task queue and idle workers pull the
+    next one, so throughput scales with the number of cores given to the
+    pool. Each worker is pinned to one core with a capped torch thread
+    count and a lower priority. The first reserved_cores cores are left to
+    the web process, which keeps embedding chat queries itself (the
+    priority lane), so ingestion never queues in front of a guest.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int = None,
+        threads_per_worker: int = None,
+        reserved_cores: int = None,
+        nice: int = None,
+        timeout: float = None
+    ):
+        """
+        Initialize embedding pool (processes start on first use)
+
+        Args:
+            model_name: Sentence-transformers model each worker loads
+            workers: Number of processes (defaults to one per non-reserved core)
+            threads_per_worker: torch intra-op threads per worker
+            reserved_cores: Cores kept free for the web process
+            nice: Niceness added to worker processes
+            timeout: Seconds to wait for a batch before giving up on the pool
+        """
+        self.model_name = model_name
+        self.threads_per_worker = threads_per_worker or int(os.getenv("EMBEDDING_POOL_THREADS", 1))
+        self.reserved_cores = reserved_cores if reserved_cores is not None else int(
+            os.getenv("EMBEDDING_POOL_RESERVED_CORES", 1)
+        )
+        self.nice = nice if nice is not None else int(os.getenv("EMBEDDING_POOL_NICE", 10))
+        self.timeout = timeout or float(os.getenv("EMBEDDING_POOL_TIMEOUT", 300))
+
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+        # On a machine too small to reserve anything, share all cores
+        self.cores = cores[self.reserved_cores:] or cores
+        self.workers = workers or len(self.cores)
+
+        self._lock = threading.Lock()
+        self._owner_pid = os.getpid()
+        self._processes = []
+        self._jobs = {}                   # job id -> queue of (batch id, embeddings, error)
+        self._job_ids = itertools.count()
+        self._tasks = None
+        self._results = None
+
+        self.batches_done = 0
+        self.jobs_done = 0
+
+    @property
+    def running(self) -> bool:
+        # Workers belong to the process that spawned them (not to forked gunicorn workers)
+        if self._owner_pid != os.getpid():
+            self._owner_pid = os.getpid()
+            self._processes = []
+        return bool(self._processes) and all(p.is_alive() for p in self._processes)
+
+    def start(self):
+        """Spawn the workers and wait until each has loaded the model"""
+        with self._lock:
+            if self.running:
+                return
+            self._shutdown_locked()
+
+            # spawn, not fork: forking a process that already ran torch can deadlock in OpenMP
+            import multiprocessing
+            context = multiprocessing.get_context("spawn")
+            self._tasks = context.Queue()
+            self._results = context.Queue()
+
+            for i in range(self.workers):
+                core = self.cores[i % len(self.cores)] if hasattr(os, "sched_setaffinity") else None
+                process = context.Process(
+                    target=_worker_main,
+                    args=(self.model_name, core, self.threads_per_worker, self.nice, self._tasks, self._results),
+                    name=f"embedding-worker-{i}",
+                    daemon=True
+                )
+                process.start()
+                self._processes.append(process)
+
+            for _ in range(self.workers):
+                try:
+                    status, pid, _, error = self._results.get(timeout=self.timeout)
+                except queue.Empty:
+                    self._shutdown_locked()
+                    raise RuntimeError("Embedding workers did not start in time")
+                if status != "ready":
+                    self._shutdown_locked()
+                    raise RuntimeError(f"Embedding worker {pid} failed to start: {error}")
+
+            threading.Thread(target=self._collect, args=(self._results,), name="embedding-pool", daemon=True).start()
+
+        print(f"[OK] Embedding pool started: {self.workers} workers on cores {self.cores}")
+
+    def _collect(self, results):
+        """Route worker results to the job waiting for them"""
+        while True:
+            try:
+                job_id, batch_id, embeddings, error = results.get()
+            except (EOFError, OSError, ValueError):
+                return
+            if job_id is None:
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is not None:
+                job.put((batch_id, embeddings, error))
+
+    def encode_batches(self, batches: List[List[str]], between_batches: Callable[[], None] = None) -> List[np.ndarray]:
+        """
+        Embed batches of texts across the workers
+
+        Batches are submitted as workers free up (one in flight per worker),
+        so between_batches can hold back the rest of a large job.
+
+        Args:
+            batches: Text batches (already sized by the caller)
+            between_batches: Called before each batch is submitted, e.g. to
+                             let queries run ahead of ingestion
+
+        Returns:
+            One float32 matrix per batch, in input order
+
+        Raises:
+            RuntimeError: If a worker fails or a batch times out
+        """
+        self.start()
+
+        job_id = next(self._job_ids)
+        job = queue.Queue()
+        with self._lock:
+            self._jobs[job_id] = job
+
+        try:
+            outputs = [None] * len(batches)
+            submitted = 0
+            for done in range(len(batches)):
+                while submitted < len(batches) and submitted - done < self.workers:
+                    if between_batches is not None:
+                        between_batches()
+                    self._tasks.put((job_id, submitted, batches[submitted]))
+                    submitted += 1
+
+                try:
+                    batch_id, embeddings, error = job.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise RuntimeError("Embedding pool timed out (worker stuck or died)")
+                if error:
+                    raise RuntimeError(f"Embedding worker error: {error}")
+                outputs[batch_id] = embeddings
+
+            self.batches_done += len(batches)
+            self.jobs_done += 1
+            return outputs
+        finally:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+
+    def _shutdown_locked(self):
+        for _ in self._processes:
+            try:
+                self._tasks.put(None)
+            except (OSError, ValueError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._results is not None:
+            try:
+                self._results.put((None, None, None, None))
+            except (OSError, ValueError):
+                pass
+        self._processes = []
+
+    def close(self):
+        """Stop all workers"""
+        with self._lock:
+            self._shutdown_locked()
+
+    def get_stats(self) -> Dict:
+        """
+        Get pool statistics
+
+        Returns:
+            Dictionary with worker layout and completed work
+        """
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "cores": self.cores,
+            "threads_per_worker": self.threads_per_worker,
+            "jobs_done": self.jobs_done,
+            "batches_done": self.batches_done
+        }
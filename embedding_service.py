@@ -4,29 +4,85 @@ Generates embeddings for text using local sentence-transformer models
 """
 
 import os
-from typing import List
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
 from dotenv import load_dotenv
 import numpy as np
 
+from metrics import CACHE_HITS, CACHE_MISSES
+from similarity import cosine
+
 load_dotenv()
 
+# Token budget when free memory cannot be determined
+DEFAULT_TOKEN_BUDGET = 2048
+# Share of free memory a batch's activations may use
+TOKEN_BUDGET_MEMORY_FRACTION = 0.1
+# On CPU, batches beyond ~2k padded tokens fall out of cache and get slower
+MAX_CPU_TOKEN_BUDGET = 2048
+MAX_GPU_TOKEN_BUDGET = 65536
+
+
+def _available_memory_bytes(device) -> Optional[int]:
+    """Free memory on the model's device (MemAvailable on Linux for CPU)"""
+    try:
+        if getattr(device, "type", "cpu") == "cuda":
+            import torch
+            return torch.cuda.mem_get_info(device)[0]
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, RuntimeError):
+        pass
+    return None
+
 
 class EmbeddingService:
     """Generate embeddings using local Sentence Transformers"""
 
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, cache_size: int = None):
         """
         Initialize Sentence Transformer embedding service
 
         Args:
             model_name: Model name (defaults to all-MiniLM-L6-v2)
+            cache_size: Query embeddings kept in the LRU cache (0 disables)
         """
         self.model_name = model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
+        # Guests ask the same questions over and over; cache their embeddings
+        self.cache_size = cache_size if cache_size is not None else int(
+            os.getenv("EMBEDDING_CACHE_SIZE", 1024)
+        )
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._token_budget = None
+
+        # Deferred: importing sentence-transformers pulls in torch (seconds)
+        from sentence_transformers import SentenceTransformer
+
+        # Cap torch threads in the web process so encoding does not starve request handling
+        threads = os.getenv("EMBEDDING_THREADS")
+        if threads:
+            import torch
+            torch.set_num_threads(int(threads))
+
         print(f"Loading embedding model: {self.model_name}...")
         self.model = SentenceTransformer(self.model_name)
 
+        # Bulk ingestion can run in worker processes (EMBEDDING_POOL_WORKERS=auto or N)
+        self.pool = None
+        self.pool_min_texts = int(os.getenv("EMBEDDING_POOL_MIN_TEXTS", 64))
+        pool_workers = os.getenv("EMBEDDING_POOL_WORKERS", "0").lower()
+        if pool_workers not in ("", "0"):
+            from embedding_pool import EmbeddingPool
+            self.pool = EmbeddingPool(
+                self.model_name,
+                workers=None if pool_workers == "auto" else int(pool_workers)
+            )
+
         # Get embedding dimension
         self.embedding_dimension = self.model.get_sentence_embedding_dimension()
 
@@ -34,7 +90,7 @@ class EmbeddingService:
         print(f"  Model: {self.model_name}")
         print(f"  Embedding dimension: {self.embedding_dimension}")
 
-    def generate_embedding(self, text: str) -> List[float]:
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text
 
@@ -42,35 +98,139 @@ class EmbeddingService:
             text: Input text
 
         Returns:
-            List of floats representing the embedding vector
+            Read-only float32 vector (shared with the cache, copy before mutating)
         """
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
 
+        if self.cache_size > 0:
+            with self._cache_lock:
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+            if cached is not None:
+                CACHE_HITS.inc(cache="embedding")
+                return cached
+            CACHE_MISSES.inc(cache="embedding")
+
         try:
             # Generate embedding
-            embedding = self.model.encode(text, convert_to_numpy=True)
-            return embedding.tolist()
-
+            embedding = np.asarray(
+                self.model.encode(text, convert_to_numpy=True), dtype=np.float32
+            )
         except Exception as e:
             raise Exception(f"Embedding generation error: {str(e)}")
 
+        embedding.setflags(write=False)
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[text] = embedding
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return embedding
+
+    @property
+    def token_budget(self) -> int:
+        """
+        Padded tokens (batch size x longest text) allowed per encode call
+
+        EMBEDDING_TOKEN_BUDGET overrides; otherwise sized so one batch's
+        activations stay within a fraction of free memory, capped at the
+        size where larger batches stop paying off on the device.
+        """
+        if self._token_budget is None:
+            configured = os.getenv("EMBEDDING_TOKEN_BUDGET")
+            if configured:
+                self._token_budget = int(configured)
+            else:
+                self._token_budget = self._auto_token_budget()
+            print(f"[OK] Embedding token budget: {self._token_budget}")
+        return self._token_budget
+
+    def _auto_token_budget(self) -> int:
+        max_length = self.model.max_seq_length or 512
+        available = _available_memory_bytes(self.model.device)
+        try:
+            config = self.model[0].auto_model.config
+            # Peak float32 activations per token in one layer: FFN, Q/K/V/out and attention scores
+            bytes_per_token = 4 * (
+                config.intermediate_size + 4 * config.hidden_size
+                + config.num_attention_heads * max_length
+            )
+        except (AttributeError, IndexError, KeyError, TypeError):
+            bytes_per_token = None
+
+        if available is None or not bytes_per_token:
+            return max(DEFAULT_TOKEN_BUDGET, max_length)
+
+        budget = int(available * TOKEN_BUDGET_MEMORY_FRACTION / bytes_per_token)
+        ceiling = MAX_GPU_TOKEN_BUDGET if self.model.device.type == "cuda" else MAX_CPU_TOKEN_BUDGET
+        return max(max_length, min(budget, ceiling))
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Token count per text, truncated like the model does"""
+        max_length = self.model.max_seq_length or 512
+        tokenizer = getattr(self.model, "tokenizer", None)
+
+        if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+            encoded = tokenizer(
+                texts,
+                truncation=True,
+                max_length=max_length,
+                return_attention_mask=False,
+                return_token_type_ids=False
+            )
+            return [len(ids) for ids in encoded["input_ids"]]
+
+        # Slow tokenizers cost as much as encoding; ~4 characters per token is enough to bucket
+        return [min(max_length, len(t) // 4 + 2) for t in texts]
+
+    def _length_buckets(self, lengths: List[int], max_batch: int) -> List[List[int]]:
+        """
+        Group text indices into batches under the token budget
+
+        Texts are sorted longest first, so each batch holds texts of similar
+        length and little padding; short texts end up in large batches.
+        """
+        budget = self.token_budget
+        batches = []
+        current = []
+
+        for index in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+            # The first (longest) text in a batch sets its padded length
+            longest = lengths[current[0]] if current else lengths[index]
+            if current and (len(current) >= max_batch or (len(current) + 1) * longest > budget):
+                batches.append(current)
+                current = []
+            current.append(index)
+
+        if current:
+            batches.append(current)
+        return batches
+
     def generate_embeddings_batch(
         self,
         texts: List[str],
-        batch_size: int = 32,
-        show_progress: bool = True
-    ) -> List[List[float]]:
+        batch_size: int = None,
+        show_progress: bool = True,
+        between_batches: Callable[[], None] = None
+    ) -> np.ndarray:
         """
         Generate embeddings for multiple texts (batch processing)
 
+        Texts are bucketed by token length and batches are sized by the token
+        budget instead of a fixed count; rows come back in input order.
+
         Args:
             texts: List of input texts
-            batch_size: Number of texts to process at once
+            batch_size: Optional cap on texts per batch (defaults to EMBEDDING_MAX_BATCH or 256)
             show_progress: Show progress information
+            between_batches: Called before each batch is encoded or submitted
+                             to the pool, e.g. to let queries run ahead of ingestion
 
         Returns:
-            List of embedding vectors
+            float32 matrix with one embedding per row
         """
         if not texts:
             raise ValueError("Text list cannot be empty")
@@ -84,17 +244,44 @@ class EmbeddingService:
         if show_progress:
             print(f"Generating embeddings for {len(valid_texts)} texts...")
 
-        try:
-            # Generate embeddings in batch (more efficient)
-            embeddings = self.model.encode(
-                valid_texts,
-                batch_size=batch_size,
-                show_progress_bar=show_progress,
-                convert_to_numpy=True
-            )
+        if not valid_texts:
+            return np.empty((0, self.embedding_dimension), dtype=np.float32)
 
-            # Convert to list of lists
-            return embeddings.tolist()
+        max_batch = batch_size or int(os.getenv("EMBEDDING_MAX_BATCH", 256))
+
+        try:
+            batches = self._length_buckets(self._token_lengths(valid_texts), max_batch)
+            outputs = None
+
+            if self.pool is not None and len(valid_texts) >= self.pool_min_texts:
+                try:
+                    outputs = self.pool.encode_batches(
+                        [[valid_texts[i] for i in indices] for indices in batches],
+                        between_batches=between_batches
+                    )
+                except Exception as e:
+                    print(f"[WARN] Embedding pool failed, encoding in process: {str(e)}")
+
+            if outputs is None:
+                outputs = []
+                for number, indices in enumerate(batches, 1):
+                    if between_batches is not None:
+                        between_batches()
+                    outputs.append(self.model.encode(
+                        [valid_texts[i] for i in indices],
+                        batch_size=len(indices),
+                        show_progress_bar=False,
+                        convert_to_numpy=True
+                    ))
+                    if show_progress:
+                        print(f"  Batch {number}/{len(batches)}: {len(indices)} texts")
+
+            # Scatter back to input order
+            embeddings = np.empty((len(valid_texts), outputs[0].shape[1]), dtype=np.float32)
+            for indices, batch in zip(batches, outputs):
+                embeddings[indices] = batch
+
+            return embeddings
 
         except Exception as e:
             raise Exception(f"Batch embedding error: {str(e)}")
@@ -103,7 +290,7 @@ class EmbeddingService:
         """Get the dimension of embeddings for the current model"""
         return self.embedding_dimension
 
-    def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
+    def compute_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
         """
         Compute cosine similarity between two embeddings
 
@@ -114,14 +301,7 @@ class EmbeddingService:
         Returns:
             Similarity score (0-1, where 1 is identical)
         """
-        # Convert to numpy arrays
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
-
-        # Compute cosine similarity
-        similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
-
-        return float(similarity)
+        return cosine(embedding1, embedding2)
 
 
 # Testing
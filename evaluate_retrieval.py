@@ -0,0 +1,246 @@
+"""
+Retrieval Evaluation Harness
+Measures recall@k, MRR, QPS and memory for every VectorStore search mode and
+chunking configuration against a labeled query set, so speed optimizations
+can be gated on retrieval quality
+
+Usage:
+    python evaluate_retrieval.py --generate-labels data/documents/Logiqgen_Company_QA.docx --labels qa_labels.json
+    python evaluate_retrieval.py --labels qa_labels.json --chunking 500:100,1000:200 --csv results.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from document_processor import DocumentProcessor
+from storage import PickleBackend
+from vector_store import VectorStore
+
+# Search modes under evaluation: name -> VectorStore constructor options
+SEARCH_MODES = {
+    "exact": {"quantization": "none"},
+    "int8": {"quantization": "int8"},
+    "binary": {"quantization": "binary"},
+}
+
+
+def _normalize(text: str) -> str:
+    """Normalize text the same way chunks are cleaned, for snippet matching"""
+    return re.sub(r"\s+", " ", DocumentProcessor()._clean_text(text)).strip().lower()
+
+
+def generate_labeled_set(file_path: str, snippet_chars: int = 120) -> List[Dict]:
+    """
+    Build a labeled query set from a Q&A document
+
+    Every paragraph ending in '?' is a query; the start of the paragraph
+    that follows it is the relevant snippet a retrieved chunk must contain.
+    """
+    processor = DocumentProcessor()
+    paragraphs = [p.strip() for p in processor.extract_text(file_path).split("\n\n") if p.strip()]
+
+    labels = []
+    for question, answer in zip(paragraphs, paragraphs[1:]):
+        if not question.endswith("?") or answer.endswith("?"):
+            continue
+        query = re.sub(r"^\s*(Q(uestion)?\s*[:.]?\s*)?\d*[.)]?\s*", "", question)
+        snippet = _normalize(answer)[:snippet_chars]
+        labels.append({"query": query, "relevant": [snippet]})
+
+    return labels
+
+
+def _is_relevant(text: str, snippets: List[str]) -> List[bool]:
+    normalized = _normalize(text)
+    return [snippet in normalized for snippet in snippets]
+
+
+def evaluate_store(store: VectorStore, labels: List[Dict], query_embeddings: np.ndarray, k: int, repeats: int) -> Dict:
+    """Run every labeled query against a store and compute quality and speed"""
+    recall_sum = 0.0
+    reciprocal_rank_sum = 0.0
+    latencies = []
+
+    for label, embedding in zip(labels, query_embeddings):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = store.query_similar(embedding, top_k=k)
+            latencies.append(time.perf_counter() - start)
+
+        snippets = [_normalize(s) for s in label["relevant"]]
+        found = [False] * len(snippets)
+        first_rank = None
+
+        for rank, result in enumerate(results["results"], 1):
+            hits = _is_relevant(result["text"], snippets)
+            if any(hits) and first_rank is None:
+                first_rank = rank
+            found = [f or h for f, h in zip(found, hits)]
+
+        recall_sum += sum(found) / len(snippets)
+        reciprocal_rank_sum += 1.0 / first_rank if first_rank else 0.0
+
+    total_time = sum(latencies)
+    return {
+        f"recall@{k}": round(recall_sum / len(labels), 4),
+        "mrr": round(reciprocal_rank_sum / len(labels), 4),
+        "qps": round(len(latencies) / total_time, 1) if total_time else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "memory_bytes": store.memory_usage(),
+        "chunks": store.count()
+    }
+
+
+def mark_pareto(rows: List[Dict], quality_key: str):
+    """Flag rows not dominated on (quality, QPS, memory)"""
+    for row in rows:
+        row["pareto"] = not any(
+            other is not row
+            and other[quality_key] >= row[quality_key]
+            and other["qps"] >= row["qps"]
+            and other["memory_bytes"] <= row["memory_bytes"]
+            and (
+                other[quality_key] > row[quality_key]
+                or other["qps"] > row["qps"]
+                or other["memory_bytes"] < row["memory_bytes"]
+            )
+            for other in rows
+        )
+
+
+def run_evaluation(
+    documents: List[str],
+    labels: List[Dict],
+    chunking: List[tuple],
+    modes: List[str],
+    k: int = 5,
+    repeats: int = 5,
+    embedding_service=None
+) -> List[Dict]:
+    """
+    Evaluate every chunking configuration x search mode combination
+
+    Returns:
+        One result row per combination
+    """
+    if embedding_service is None:
+        from embedding_service import EmbeddingService
+        embedding_service = EmbeddingService()
+
+    query_embeddings = np.asarray(
+        embedding_service.generate_embeddings_batch([l["query"] for l in labels], show_progress=False),
+        dtype=np.float32
+    )
+
+    rows = []
+    for chunk_size, chunk_overlap in chunking:
+        processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        all_chunks = []
+        for path in documents:
+            chunks, doc_hash = processor.process_document(path)
+            all_chunks.append((chunks, f"doc_{doc_hash[:8]}"))
+
+        # Embed once per chunking configuration, reuse for every mode
+        texts = [c["text"] for chunks, _ in all_chunks for c in chunks]
+        embeddings = np.asarray(
+            embedding_service.generate_embeddings_batch(texts, show_progress=False),
+            dtype=np.float32
+        )
+
+        for mode in modes:
+            temp_dir = tempfile.mkdtemp(prefix="rag_eval_")
+            try:
+                store = VectorStore(
+                    persist_directory=temp_dir,
+                    collection_name="eval",
+                    shared=False,
+                    storage=PickleBackend(temp_dir),
+                    **SEARCH_MODES[mode]
+                )
+                offset = 0
+                for chunks, document_id in all_chunks:
+                    store.add_documents(chunks, embeddings[offset:offset + len(chunks)], document_id)
+                    offset += len(chunks)
+
+                row = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "mode": mode}
+                row.update(evaluate_store(store, labels, query_embeddings, k, repeats))
+                rows.append(row)
+                store.close()
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    mark_pareto(rows, f"recall@{k}")
+    return rows
+
+
+def print_table(rows: List[Dict]):
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) + 2 for c in columns}
+
+    print("\n" + "".join(c.ljust(widths[c]) for c in columns))
+    print("-" * sum(widths.values()))
+    for row in rows:
+        print("".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def write_csv(rows: List[Dict], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval quality vs speed evaluation")
+    parser.add_argument("--labels", default="qa_labels.json", help="Labeled query set (JSON list of {query, relevant})")
+    parser.add_argument("--generate-labels", metavar="QA_DOCX", help="Generate the labeled set from a Q&A document first")
+    parser.add_argument("--documents", default="data/documents/*", help="Glob of documents to index")
+    parser.add_argument("--chunking", default="500:100,1000:200,1500:300", help="chunk_size:overlap pairs")
+    parser.add_argument("--modes", default=",".join(SEARCH_MODES), help="Search modes to evaluate")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per query")
+    parser.add_argument("--csv", help="Write results as CSV")
+    args = parser.parse_args()
+
+    if args.generate_labels:
+        labels = generate_labeled_set(args.generate_labels)
+        with open(args.labels, "w") as f:
+            json.dump(labels, f, indent=2, ensure_ascii=False)
+        print(f"[OK] Wrote {len(labels)} labeled queries to {args.labels}")
+
+    with open(args.labels) as f:
+        labels = json.load(f)
+
+    documents = sorted(
+        p for p in glob.glob(args.documents)
+        if os.path.splitext(p)[1].lower() in (".pdf", ".docx", ".doc")
+    )
+    chunking = [tuple(int(x) for x in pair.split(":")) for pair in args.chunking.split(",")]
+    modes = [m.strip() for m in args.modes.split(",")]
+
+    rows = run_evaluation(documents, labels, chunking, modes, k=args.k, repeats=args.repeats)
+
+    print("=" * 70)
+    print("RETRIEVAL EVALUATION")
+    print("=" * 70)
+    print_table(rows)
+
+    if args.csv:
+        write_csv(rows, args.csv)
+        print(f"\n[OK] Results written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Fake Groq Server
+Local stand-in for the Groq chat completions API with tunable latency and
+token rate, used by the benchmark harness (no GROQ_API_KEY needed)
+
+Usage:
+    python fake_groq_server.py --port 8765 --latency-ms 200 --tokens-per-second 500
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Serve POST /openai/v1/chat/completions in the OpenAI response format (plain or streamed)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server.config
+
+        # Rough prompt size: ~4 characters per token
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        prompt_tokens = max(1, prompt_chars // 4)
+        completion_tokens = min(body.get("max_tokens") or 500, config["completion_tokens"])
+
+        # Time to first token, then generation at the configured token rate
+        time.sleep(config["latency_ms"] / 1000.0)
+        if body.get("stream"):
+            self._stream(body, completion_tokens)
+            return
+        if config["tokens_per_second"] > 0:
+            time.sleep(completion_tokens / config["tokens_per_second"])
+
+        answer = " ".join(["token"] * completion_tokens)
+        payload = json.dumps({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, completion_tokens):
+        """Send the completion as server-sent events, one token per chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        delay = 1.0 / self.server.config["tokens_per_second"] if self.server.config["tokens_per_second"] > 0 else 0
+        for i in range(completion_tokens + 1):
+            last = i == completion_tokens
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake-model"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {} if last else {"content": "token" if i == 0 else " token"},
+                    "finish_reason": "stop" if last else None
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if delay and not last:
+                time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+def start_fake_groq_server(
+    port: int = 0,
+    latency_ms: float = 200.0,
+    tokens_per_second: float = 500.0,
+    completion_tokens: int = 100
+) -> ThreadingHTTPServer:
+    """
+    Start the fake server in a background thread
+
+    Args:
+        port: Port to bind (0 picks a free port)
+        latency_ms: Delay before the first token
+        tokens_per_second: Generation speed (0 = instant)
+        completion_tokens: Tokens returned per completion (capped by max_tokens)
+
+    Returns:
+        Running server; its base URL is http://127.0.0.1:<server.server_port>
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeGroqHandler)
+    server.daemon_threads = True
+    server.config = {
+        "latency_ms": latency_ms,
+        "tokens_per_second": tokens_per_second,
+        "completion_tokens": completion_tokens
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--completion-tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    server = start_fake_groq_server(
+        args.port, args.latency_ms, args.tokens_per_second, args.completion_tokens
+    )
+    print(f"[OK] Fake Groq server on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
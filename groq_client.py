@@ -4,79 +4,59 @@ Handles LLM chat completions using Groq with Llama models
 """
 
 import os
-from typing import List, Dict, Optional
-from groq import Groq
+from typing import Dict, Iterator, List
 from dotenv import load_dotenv
 
+from llm_client import LLMClient
+
 load_dotenv()
 
 
-class GroqClient:
+class GroqClient(LLMClient):
     """Client for Groq API interactions"""
     
-    def __init__(self, api_key: str = None, model: str = None):
+    name = "groq"
+    
+    def __init__(self, api_key: str = None, model: str = None, base_url: str = None):
         """
         Initialize Groq client
         
         Args:
             api_key: Groq API key (defaults to env variable)
             model: Model name (defaults to env variable or llama-3.1-70b-versatile)
+            base_url: API base URL (defaults to GROQ_BASE_URL env variable or Groq cloud),
+                      e.g. a local fake server for benchmarks
         """
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         self.model = model or os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+        self.base_url = base_url or os.getenv("GROQ_BASE_URL")
         
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
         
-        self.client = Groq(api_key=self.api_key)
+        # Deferred: the groq SDK (httpx, pydantic) is slow to import
+        from groq import Groq
         
-    def chat_completion(
+        self.client = Groq(api_key=self.api_key, base_url=self.base_url)
+    
+    def chat_with_history(
         self,
-        user_question: str,
-        context: str = None,
-        system_prompt: str = None,
+        messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 500
     ) -> Dict:
         """
-        Generate chat completion with optional context
+        Generate chat completion with conversation history
         
         Args:
-            user_question: User's question
-            context: Retrieved context from vector store
-            system_prompt: Custom system prompt (optional)
+            messages: List of message dicts with 'role' and 'content'
             temperature: Response creativity (0-1)
             max_tokens: Maximum response length
             
         Returns:
             Dictionary with response and metadata
         """
-        # Default system prompt
-        if system_prompt is None:
-            system_prompt = """You are a helpful restaurant assistant. Answer questions based ONLY on the provided context.
-If the answer is not in the context, politely say you don't have that information.
-Be friendly, concise, and accurate. Keep responses natural and conversational."""
-        
-        # Build messages
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Add context if provided
-        if context:
-            user_message = f"""Context from restaurant documents:
-{context}
-
-Customer Question: {user_question}
-
-Please answer the question based on the context provided above."""
-        else:
-            user_message = user_question
-        
-        messages.append({"role": "user", "content": user_message})
-        
         try:
-            # Call Groq API
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
@@ -84,80 +64,36 @@ Please answer the question based on the context provided above."""
                 max_tokens=max_tokens
             )
             
-            # Extract response
-            assistant_message = response.choices[0].message.content
-            
-            return {
-                "response": assistant_message,
-                "model": self.model,
-                "tokens_used": {
-                    "prompt": response.usage.prompt_tokens,
-                    "completion": response.usage.completion_tokens,
-                    "total": response.usage.total_tokens
-                },
-                "finish_reason": response.choices[0].finish_reason
-            }
+            return self._format_response(response)
             
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
-    def chat_with_history(
+    def stream_chat(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 500
-    ) -> Dict:
+    ) -> Iterator[str]:
         """
-        Generate chat completion with conversation history
+        Stream a chat completion
         
         Args:
             messages: List of message dicts with 'role' and 'content'
             temperature: Response creativity (0-1)
             max_tokens: Maximum response length
             
-        Returns:
-            Dictionary with response and metadata
-        """
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            
-            assistant_message = response.choices[0].message.content
-            
-            return {
-                "response": assistant_message,
-                "model": self.model,
-                "tokens_used": {
-                    "prompt": response.usage.prompt_tokens,
-                    "completion": response.usage.completion_tokens,
-                    "total": response.usage.total_tokens
-                },
-                "finish_reason": response.choices[0].finish_reason
-            }
-            
-        except Exception as e:
-            raise Exception(f"Groq API error: {str(e)}")
-    
-    def test_connection(self) -> bool:
-        """
-        Test Groq API connection
-        
-        Returns:
-            True if connection successful
+        Yields:
+            Text fragments as they are generated
         """
-        try:
-            response = self.chat_completion(
-                user_question="Hello, are you working?",
-                max_tokens=50
-            )
-            return True
-        except Exception as e:
-            print(f"Connection test failed: {e}")
-            return False
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        return self._stream_text(stream)
 
 
 # Testing
@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for multi-worker deployments
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+# Must be set before app.py is imported (preload_app below)
+# Workers attach to one memory-mapped vector index instead of private copies
+os.environ.setdefault("VECTOR_STORE_SHARED", "true")
+# Load the model in the master before forking (see preload_app below)
+os.environ.setdefault("WARMUP_MODE", "eager")
+# Keep torch from spawning a full thread pool in every worker
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+bind = f"0.0.0.0:{os.getenv('FLASK_PORT', 5000)}"
+workers = int(os.getenv("GUNICORN_WORKERS", 8))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+# Import the app (and load the SentenceTransformer weights) once in the master;
+# forked workers share those pages copy-on-write instead of loading their own
+preload_app = True
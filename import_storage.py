@@ -0,0 +1,225 @@
+"""
+Storage Import
+One-shot import of existing vector data (the legacy ChromaDB database and
+pickle collections) into the configured storage backend
+
+Usage:
+    python import_storage.py --to sqlite:///data/rag.sqlite3 --from-chroma data/chroma_db/chroma.sqlite3
+    python import_storage.py --to sqlite:///data/rag.sqlite3 --from-pickle data/chroma_db
+    python import_storage.py --from-chroma data/chroma_db/chroma.sqlite3 --reembed
+"""
+
+import argparse
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model_migration import SHADOW_SUFFIX, embedded_text
+from storage import PickleBackend, create_storage_backend
+from vector_store import VectorStore
+
+# Chroma stores the chunk text as a metadata entry under this key
+CHROMA_DOCUMENT_KEY = "chroma:document"
+
+# embeddings_queue operations (chromadb.types.Operation)
+CHROMA_DELETE = 3
+
+
+def _chroma_value(string_value, int_value, float_value, bool_value):
+    if string_value is not None:
+        return string_value
+    if int_value is not None:
+        return int_value
+    if float_value is not None:
+        return float_value
+    if bool_value is not None:
+        return bool(bool_value)
+    return None
+
+
+def read_chroma(path: str, embedder=None) -> List[Tuple[str, Dict]]:
+    """
+    Read every collection of a ChromaDB 0.4/0.5 SQLite database
+
+    Text and metadata come from the metadata segment. Vectors come from the
+    embeddings queue, which keeps every write with its float32 payload, so
+    the HNSW segment files are not needed. Rows whose vector is no longer
+    in the queue are skipped, unless an embedder is given: then the whole
+    collection is re-embedded from its text so all vectors share one model.
+
+    Args:
+        path: Path to chroma.sqlite3
+        embedder: Optional embedding service (model_name, generate_embeddings_batch)
+
+    Returns:
+        List of (collection name, snapshot dict)
+    """
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        collections = connection.execute("SELECT id, name FROM collections ORDER BY name").fetchall()
+        result = []
+
+        for collection_id, name in collections:
+            segment = connection.execute(
+                "SELECT id FROM segments WHERE collection = ? AND scope = 'METADATA'",
+                (collection_id,)
+            ).fetchone()
+            if segment is None:
+                continue
+
+            rows = {}          # row id -> chunk id, in insertion order
+            metadatas = {}     # chunk id -> metadata
+            for row_id, chunk_id in connection.execute(
+                "SELECT id, embedding_id FROM embeddings WHERE segment_id = ? ORDER BY id",
+                (segment[0],)
+            ):
+                rows[row_id] = chunk_id
+                metadatas[chunk_id] = {}
+
+            for row_id, key, *values in connection.execute(
+                "SELECT m.id, m.key, m.string_value, m.int_value, m.float_value, m.bool_value "
+                "FROM embedding_metadata m JOIN embeddings e ON e.id = m.id WHERE e.segment_id = ?",
+                (segment[0],)
+            ):
+                metadatas[rows[row_id]][key] = _chroma_value(*values)
+
+            # Replay the queue: the last vector written for an id wins, deletes drop it
+            vectors = {}
+            for chunk_id, operation, vector, encoding in connection.execute(
+                "SELECT id, operation, vector, encoding FROM embeddings_queue "
+                "WHERE topic LIKE '%/' || ? ORDER BY seq_id",
+                (collection_id,)
+            ):
+                if operation == CHROMA_DELETE:
+                    vectors.pop(chunk_id, None)
+                elif vector is not None and (encoding or "FLOAT32") == "FLOAT32":
+                    vectors[chunk_id] = np.frombuffer(vector, dtype=np.float32)
+
+            ids = list(rows.values())
+            missing = [chunk_id for chunk_id in ids if chunk_id not in vectors]
+            model = None
+            if missing and embedder is not None:
+                texts = [
+                    embedded_text(metadatas[chunk_id].get(CHROMA_DOCUMENT_KEY, ""), metadatas[chunk_id])
+                    for chunk_id in ids
+                ]
+                embeddings = embedder.generate_embeddings_batch(texts, show_progress=False)
+                vectors = dict(zip(ids, np.asarray(embeddings, dtype=np.float32)))
+                model = embedder.model_name
+                print(f"[OK] {name}: re-embedded {len(ids)} chunks with {model}")
+            elif missing:
+                print(f"[WARN] {name}: {len(missing)} chunks have no stored vector, skipped (use --reembed)")
+                ids = [chunk_id for chunk_id in ids if chunk_id in vectors]
+
+            documents = [metadatas[chunk_id].pop(CHROMA_DOCUMENT_KEY, "") for chunk_id in ids]
+            result.append((name, {
+                "ids": ids,
+                "documents": documents,
+                "embeddings": np.vstack([vectors[chunk_id] for chunk_id in ids]) if ids else np.zeros((0, 0)),
+                "metadatas": [metadatas[chunk_id] for chunk_id in ids],
+                "model": model
+            }))
+
+        return result
+    finally:
+        connection.close()
+
+
+def read_pickle(directory: str) -> List[Tuple[str, Dict]]:
+    """
+    Read every pickle collection in a directory (snapshot plus write-ahead log)
+
+    Shadow collections of unfinished model migrations are skipped; the
+    migration restarts from the imported live collection.
+    """
+    backend = PickleBackend(directory)
+    result = []
+    for name in backend.collections():
+        if name.endswith(SHADOW_SUFFIX):
+            continue
+        store = VectorStore(
+            persist_directory=directory,
+            collection_name=name,
+            shared=False,
+            quantization="none",
+            text_store="memory",
+            storage=backend
+        )
+        result.append((name, store.snapshot()))
+        store.close()
+    return result
+
+
+def import_collection(backend, name: str, data: Dict, model: str = None, overwrite: bool = False) -> Optional[int]:
+    """
+    Write one collection into a storage backend as a single replace
+
+    Args:
+        backend: Target storage backend
+        name: Collection name
+        data: Snapshot dict (ids, documents, embeddings, metadatas, model)
+        model: Embedding model to record when the source did not record one
+        overwrite: Replace a collection that already exists in the target
+
+    Returns:
+        Number of chunks imported, or None if skipped
+    """
+    adapter = backend.open(name)
+    seq = 0
+    if adapter.exists():
+        if not overwrite:
+            print(f"[WARN] {name}: already in target storage, skipped (use --overwrite)")
+            adapter.close()
+            return None
+        _, seq = adapter.read_snapshot()
+        seq = max([seq] + [record["seq"] for record in adapter.replay()])
+
+    snapshot = VectorStore._to_snapshot(dict(data, model=data.get("model") or model))
+    record = dict(snapshot, op="replace", seq=seq + 1)
+    adapter.append(record, snapshot)
+    adapter.checkpoint(snapshot, record["seq"])
+    adapter.close()
+    return len(snapshot["ids"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import legacy vector data into the configured storage")
+    parser.add_argument("--from-chroma", help="Path to a ChromaDB chroma.sqlite3 file")
+    parser.add_argument("--from-pickle", help="Directory with <collection>.pkl / .wal files")
+    parser.add_argument("--to", help="Target storage URL (defaults to VECTOR_STORAGE_URL, else pickle files)")
+    parser.add_argument("--persist-dir", default=os.getenv("CHROMA_PERSIST_DIR", "./data/chroma_db"),
+                        help="Directory for pickle targets")
+    parser.add_argument("--model", help="Embedding model to record for sources that do not store one")
+    parser.add_argument("--reembed", action="store_true",
+                        help="Re-embed Chroma collections whose vectors are missing from the queue "
+                             "(with EMBEDDING_MODEL)")
+    parser.add_argument("--overwrite", action="store_true", help="Replace collections already in the target")
+    args = parser.parse_args()
+
+    if not (args.from_chroma or args.from_pickle):
+        parser.error("nothing to import: give --from-chroma and/or --from-pickle")
+
+    backend = create_storage_backend(args.persist_dir, args.to)
+    print(f"[OK] Target storage: {args.to or os.getenv('VECTOR_STORAGE_URL') or args.persist_dir}")
+
+    collections = []
+    if args.from_chroma:
+        embedder = None
+        if args.reembed:
+            # Deferred: only needed when vectors have to be recomputed
+            from embedding_service import EmbeddingService
+            embedder = EmbeddingService()
+        collections += read_chroma(args.from_chroma, embedder)
+    if args.from_pickle:
+        collections += read_pickle(args.from_pickle)
+
+    for name, data in collections:
+        imported = import_collection(backend, name, data, args.model, args.overwrite)
+        if imported is not None:
+            print(f"[OK] Imported '{name}': {imported} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Lazy Service Module
+Thread-safe deferred construction of heavy services (models, API clients)
+so the web server can accept connections before they are loaded
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class LazyService:
+    """
+    Proxy that builds the wrapped service on first use
+
+    Attribute access is forwarded to the real service, so call sites keep
+    using it like the service itself. Construction happens exactly once,
+    even when many request threads hit it at the same time.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], object]):
+        """
+        Initialize lazy service
+
+        Args:
+            name: Service name used in health reports
+            factory: Zero-argument callable that builds the service
+        """
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._error = None
+        self._load_seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the service, building it if needed"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                    self._error = None
+                except Exception as e:
+                    self._error = str(e)
+                    raise
+                self._load_seconds = time.perf_counter() - start
+            return self._instance
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def status(self) -> Dict:
+        """Health information for this service"""
+        if self._instance is not None:
+            state = "ready"
+        elif self._error is not None:
+            state = "failed"
+        elif self._lock.locked():
+            state = "loading"
+        else:
+            state = "not_loaded"
+
+        report = {"status": state}
+        if self._load_seconds is not None:
+            report["load_seconds"] = round(self._load_seconds, 3)
+        if self._error is not None:
+            report["error"] = self._error
+        return report
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not found on the proxy itself
+        return getattr(self.get(), attribute)
+
+
+class Warmup:
+    """Run a warmup routine once, in the background or inline, and track readiness"""
+
+    def __init__(self, routine: Callable[[], None]):
+        self._routine = routine
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.error = None
+        self.seconds = None
+
+    def run(self):
+        """Run the warmup routine in the calling thread"""
+        start = time.perf_counter()
+        try:
+            self._routine()
+        except Exception as e:
+            self.error = str(e)
+            print(f"[WARN] Warmup failed: {e}")
+        finally:
+            self.seconds = time.perf_counter() - start
+            self._done.set()
+
+    def start(self):
+        """Run the warmup routine in a daemon thread"""
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
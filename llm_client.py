@@ -0,0 +1,433 @@
+"""
+LLM Client Interface
+Common interface for chat backends (Groq, local OpenAI-compatible servers) with failover and latency routing
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List
+
+from dotenv import load_dotenv
+
+from metrics import LLM_FAILOVERS, TOKENS
+
+load_dotenv()
+
+DEFAULT_SYSTEM_PROMPT = """You are a helpful restaurant assistant. Answer questions based ONLY on the provided context.
+If the answer is not in the context, politely say you don't have that information.
+Be friendly, concise, and accurate. Keep responses natural and conversational."""
+
+
+class LLMClient(ABC):
+    """
+    Chat backend used by the RAG pipeline
+
+    Subclasses implement chat_with_history and stream_chat; prompt building,
+    chat_completion and response formatting are shared.
+    """
+
+    name = "llm"
+    model = None
+
+    def build_messages(
+        self,
+        user_question: str,
+        context: str = None,
+        system_prompt: str = None,
+        history: List[Dict[str, str]] = None,
+        summary: str = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build the message list for a question with optional context and history
+
+        Args:
+            user_question: User's question
+            context: Retrieved context from vector store
+            system_prompt: Custom system prompt (optional)
+            history: Earlier turns of the conversation, oldest first
+            summary: Compressed summary of turns older than history
+
+        Returns:
+            List of message dicts with 'role' and 'content'
+        """
+        if system_prompt is None:
+            system_prompt = DEFAULT_SYSTEM_PROMPT
+        if summary:
+            system_prompt = f"{system_prompt}\n\nEarlier in this conversation:\n{summary}"
+
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(history or [])
+
+        # Add context if provided
+        if context:
+            user_message = f"""Context from restaurant documents:
+{context}
+
+Customer Question: {user_question}
+
+Please answer the question based on the context provided above."""
+        else:
+            user_message = user_question
+
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def chat_completion(
+        self,
+        user_question: str,
+        context: str = None,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Dict:
+        """
+        Generate chat completion with optional context
+
+        Args:
+            user_question: User's question
+            context: Retrieved context from vector store
+            system_prompt: Custom system prompt (optional)
+            temperature: Response creativity (0-1)
+            max_tokens: Maximum response length
+
+        Returns:
+            Dictionary with response and metadata
+        """
+        return self.chat_with_history(
+            self.build_messages(user_question, context, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+    @abstractmethod
+    def chat_with_history(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Dict:
+        """
+        Generate chat completion with conversation history
+
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Response creativity (0-1)
+            max_tokens: Maximum response length
+
+        Returns:
+            Dictionary with response and metadata
+        """
+
+    @abstractmethod
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Iterator[str]:
+        """
+        Stream a chat completion
+
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Response creativity (0-1)
+            max_tokens: Maximum response length
+
+        Yields:
+            Text fragments as they are generated
+        """
+
+    def _format_response(self, response) -> Dict:
+        """Extract the answer and token usage from an OpenAI-style response"""
+        TOKENS.inc(response.usage.prompt_tokens, type="prompt")
+        TOKENS.inc(response.usage.completion_tokens, type="completion")
+
+        return {
+            "response": response.choices[0].message.content,
+            "model": self.model,
+            "backend": self.name,
+            "tokens_used": {
+                "prompt": response.usage.prompt_tokens,
+                "completion": response.usage.completion_tokens,
+                "total": response.usage.total_tokens
+            },
+            "finish_reason": response.choices[0].finish_reason
+        }
+
+    @staticmethod
+    def _stream_text(stream) -> Iterator[str]:
+        """Yield the text deltas of an OpenAI-style streaming response"""
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def test_connection(self) -> bool:
+        """
+        Test backend connection
+
+        Returns:
+            True if connection successful
+        """
+        try:
+            self.chat_completion(
+                user_question="Hello, are you working?",
+                max_tokens=50
+            )
+            return True
+        except Exception as e:
+            print(f"Connection test failed: {e}")
+            return False
+
+
+class OpenAICompatibleClient(LLMClient):
+    """
+    Local backend speaking the OpenAI chat API
+
+    Works with llama.cpp's server, Ollama, vLLM, LM Studio and similar.
+    """
+
+    name = "local"
+
+    def __init__(self, base_url: str = None, model: str = None, api_key: str = None, timeout: float = None):
+        """
+        Initialize local LLM client
+
+        Args:
+            base_url: Server URL including /v1 (defaults to LOCAL_LLM_BASE_URL or llama.cpp's default)
+            model: Model name sent to the server (defaults to LOCAL_LLM_MODEL)
+            api_key: API key if the server needs one (defaults to LOCAL_LLM_API_KEY)
+            timeout: Request timeout in seconds (defaults to LOCAL_LLM_TIMEOUT or 60)
+        """
+        self.base_url = base_url or os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8080/v1")
+        self.model = model or os.getenv("LOCAL_LLM_MODEL", "local-model")
+        timeout = timeout or float(os.getenv("LOCAL_LLM_TIMEOUT", 60))
+
+        # Deferred: the openai SDK (httpx, pydantic) is slow to import
+        from openai import OpenAI
+
+        # Failover handles retries across backends
+        self.client = OpenAI(
+            base_url=self.base_url,
+            api_key=api_key or os.getenv("LOCAL_LLM_API_KEY", "not-needed"),
+            timeout=timeout,
+            max_retries=0
+        )
+
+    def chat_with_history(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Dict:
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+
+            return self._format_response(response)
+
+        except Exception as e:
+            raise Exception(f"Local LLM error: {str(e)}")
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        return self._stream_text(stream)
+
+
+class LLMRouter(LLMClient):
+    """
+    Route requests across several backends
+
+    failover: try backends in the configured order (e.g. groq, then local)
+    latency:  prefer the backend with the lowest recent latency, probing the
+              others now and then so their estimates stay fresh
+
+    A backend that raises is skipped for cooldown_seconds while the request
+    moves on to the next one.
+    """
+
+    name = "router"
+
+    def __init__(
+        self,
+        backends: List[LLMClient],
+        policy: str = None,
+        cooldown_seconds: float = None,
+        probe_every: int = None
+    ):
+        """
+        Initialize router
+
+        Args:
+            backends: Backends in priority order
+            policy: "failover" or "latency" (defaults to LLM_ROUTING or failover)
+            cooldown_seconds: Time a failed backend is skipped (defaults to LLM_FAILOVER_COOLDOWN or 30)
+            probe_every: With latency routing, send every Nth request to the
+                         least recently used backend (defaults to LLM_PROBE_EVERY or 20)
+        """
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+
+        self.backends = backends
+        self.policy = (policy or os.getenv("LLM_ROUTING", "failover")).lower()
+        if self.policy not in ("failover", "latency"):
+            raise ValueError(f"Unsupported LLM_ROUTING policy: {self.policy}")
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else float(
+            os.getenv("LLM_FAILOVER_COOLDOWN", 30)
+        )
+        self.probe_every = probe_every or int(os.getenv("LLM_PROBE_EVERY", 20))
+
+        self._lock = threading.Lock()
+        self._latency = {b.name: None for b in backends}      # EWMA seconds
+        self._down_until = {b.name: 0.0 for b in backends}
+        self._last_used = {b.name: 0.0 for b in backends}
+        self._calls = 0
+
+    @property
+    def model(self):
+        return self.backends[0].model
+
+    def _ordered_backends(self) -> List[LLMClient]:
+        """Backends to try for the next request, best first"""
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            healthy = [b for b in self.backends if self._down_until[b.name] <= now]
+            cooling = [b for b in self.backends if self._down_until[b.name] > now]
+
+            if self.policy == "latency" and len(healthy) > 1:
+                if self._calls % self.probe_every == 0:
+                    healthy.sort(key=lambda b: self._last_used[b.name])
+                else:
+                    # Unmeasured backends sort first so each gets a sample
+                    healthy.sort(key=lambda b: self._latency[b.name] or 0.0)
+
+        # Everything failed recently: still try, in configured order
+        return healthy + cooling
+
+    def _record_success(self, backend: LLMClient, seconds: float):
+        with self._lock:
+            previous = self._latency[backend.name]
+            self._latency[backend.name] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+            self._down_until[backend.name] = 0.0
+            self._last_used[backend.name] = time.monotonic()
+
+    def _record_failure(self, backend: LLMClient, error: Exception):
+        print(f"[WARN] LLM backend '{backend.name}' failed, failing over: {str(error)}")
+        LLM_FAILOVERS.inc(backend=backend.name)
+        with self._lock:
+            self._down_until[backend.name] = time.monotonic() + self.cooldown_seconds
+            self._last_used[backend.name] = time.monotonic()
+
+    def chat_with_history(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Dict:
+        last_error = None
+        for backend in self._ordered_backends():
+            start = time.perf_counter()
+            try:
+                response = backend.chat_with_history(messages, temperature, max_tokens)
+            except Exception as e:
+                self._record_failure(backend, e)
+                last_error = e
+                continue
+            self._record_success(backend, time.perf_counter() - start)
+            return response
+        raise last_error
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> Iterator[str]:
+        """Stream from the first backend that produces a token (latency = time to first token)"""
+        last_error = None
+        for backend in self._ordered_backends():
+            start = time.perf_counter()
+            try:
+                stream = iter(backend.stream_chat(messages, temperature, max_tokens))
+                first = next(stream, "")
+            except Exception as e:
+                self._record_failure(backend, e)
+                last_error = e
+                continue
+            self._record_success(backend, time.perf_counter() - start)
+            return self._chain(first, stream)
+        raise last_error
+
+    @staticmethod
+    def _chain(first: str, stream: Iterator[str]) -> Iterator[str]:
+        if first:
+            yield first
+        yield from stream
+
+    def get_stats(self) -> Dict:
+        """
+        Get routing statistics
+
+        Returns:
+            Dictionary with policy and per-backend latency and health
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "backends": [
+                    {
+                        "name": b.name,
+                        "model": b.model,
+                        "latency_ms": None if self._latency[b.name] is None else round(self._latency[b.name] * 1000, 1),
+                        "healthy": self._down_until[b.name] <= now
+                    }
+                    for b in self.backends
+                ]
+            }
+
+
+def create_llm_client() -> LLMClient:
+    """
+    Build the configured LLM client
+
+    LLM_BACKENDS is a comma-separated priority list of "groq" and "local"
+    (default: groq). More than one backend yields an LLMRouter.
+
+    Returns:
+        LLMClient
+    """
+    from groq_client import GroqClient
+
+    factories = {"groq": GroqClient, "local": OpenAICompatibleClient}
+    names = [n.strip().lower() for n in os.getenv("LLM_BACKENDS", "groq").split(",") if n.strip()] or ["groq"]
+
+    unknown = [n for n in names if n not in factories]
+    if unknown:
+        raise ValueError(f"Unknown LLM backend(s): {', '.join(unknown)}")
+
+    backends = [factories[n]() for n in names]
+    if len(backends) == 1:
+        return backends[0]
+
+    # Fail over right away instead of letting the SDK retry a dead backend
+    for backend in backends:
+        backend.client = backend.client.with_options(max_retries=0)
+    return LLMRouter(backends)
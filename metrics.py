@@ -0,0 +1,238 @@
+"""
+Metrics Module
+Lightweight in-process counters, gauges and histograms with Prometheus
+text exposition, plus per-request stage timings for Server-Timing headers
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds (1 ms .. 30 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """Base class: a named metric with optional label names"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down (e.g. in-flight requests)"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.label_names, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds", "Time spent in each RAG pipeline stage", ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_request_duration_seconds", "HTTP request latency", ["endpoint"]
+)
+REQUESTS = REGISTRY.counter(
+    "rag_requests_total", "HTTP requests handled", ["endpoint", "status"]
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "rag_requests_in_flight", "Requests currently being processed (queue depth)", ["endpoint"]
+)
+TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "LLM tokens used", ["type"]
+)
+CACHE_HITS = REGISTRY.counter(
+    "rag_cache_hits_total", "Cache hits", ["cache"]
+)
+CACHE_MISSES = REGISTRY.counter(
+    "rag_cache_misses_total", "Cache misses", ["cache"]
+)
+LLM_FAILOVERS = REGISTRY.counter(
+    "rag_llm_failovers_total", "LLM requests moved to another backend after an error", ["backend"]
+)
+RERANK_FALLBACKS = REGISTRY.counter(
+    "rag_rerank_fallbacks_total", "Queries served in vector order because reranking missed its budget or failed", ["reason"]
+)
+SCHEDULER_ACTIVE = REGISTRY.gauge(
+    "rag_scheduler_active", "Requests holding a scheduler slot", ["workload"]
+)
+SCHEDULER_QUEUED = REGISTRY.gauge(
+    "rag_scheduler_queued", "Requests waiting for a scheduler slot", ["workload"]
+)
+SCHEDULER_REJECTED = REGISTRY.counter(
+    "rag_scheduler_rejected_total", "Requests shed with 429 by admission control", ["workload"]
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "rag_scheduler_wait_seconds", "Time spent waiting for a scheduler slot", ["workload"]
+)
+
+
+# ==================== REQUEST STAGE TIMINGS ====================
+
+_request_local = threading.local()
+
+
+def start_request_timing():
+    """Begin collecting stage timings for the request on this thread"""
+    _request_local.timings = []
+
+
+def request_timings() -> List[Tuple[str, float]]:
+    """Return (stage, seconds) pairs recorded for the current request"""
+    return getattr(_request_local, "timings", None) or []
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a pipeline stage
+
+    Observes the stage histogram and, inside a request, records the
+    duration for the Server-Timing header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = getattr(_request_local, "timings", None)
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing_header(total_seconds: float = None) -> str:
+    """Format the current request's stage timings as a Server-Timing header value"""
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in request_timings()]
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
@@ -0,0 +1,338 @@
+"""
+Model Migration Module
+Background re-embedding into a shadow index when the embedding model changes
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from shared_index import FCNTL_AVAILABLE
+from tenant_store import TENANT_INDEXES, TenantStoreRegistry
+from vector_store import VectorStore
+
+if FCNTL_AVAILABLE:
+    import fcntl
+
+load_dotenv()
+
+# Shadow collections are stored next to the live one as <collection>.shadow
+SHADOW_SUFFIX = ".shadow"
+
+# How long to wait before re-checking a collection another process is migrating
+BUSY_RETRY_SECONDS = 60
+
+
+def embedded_text(text: str, metadata: Dict) -> str:
+    """Text a chunk's vector was made from (FAQ entries embed the question, not the answer)"""
+    return metadata.get("question") or text
+
+
+def document_rows(data: Dict) -> Dict[str, List[int]]:
+    """Group snapshot rows by document id, keeping the stored chunk order"""
+    rows = {}
+    for i, metadata in enumerate(data["metadatas"]):
+        rows.setdefault(metadata.get("document_id"), []).append(i)
+    return rows
+
+
+class Migration:
+    """Progress of one collection's re-embedding"""
+
+    def __init__(self, collection: str, restaurant_id: Optional[str], index: Optional[str],
+                 source_model: Optional[str], target_model: str):
+        self.collection = collection
+        self.restaurant_id = restaurant_id
+        self.index = index
+        self.source_model = source_model
+        self.target_model = target_model
+        self.status = "queued"          # queued, running, busy, switched or failed
+        self.documents_total = 0
+        self.documents_done = 0
+        self.chunks_embedded = 0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.shadow = None              # shadow VectorStore while running
+
+    def to_dict(self) -> Dict:
+        return {
+            "collection": self.collection,
+            "source_model": self.source_model,
+            "target_model": self.target_model,
+            "status": self.status,
+            "documents_total": self.documents_total,
+            "documents_done": self.documents_done,
+            "chunks_embedded": self.chunks_embedded,
+            "error": self.error,
+            "seconds": (
+                round((self.finished_at or time.time()) - self.started_at, 1)
+                if self.started_at else None
+            )
+        }
+
+
+class MigrationManager:
+    """
+    Re-embed collections whose recorded model differs from the configured one
+
+    Stored chunk text is embedded with the new model into a shadow
+    collection by a background thread; nothing is re-extracted from the
+    original files. The live collection keeps serving (queries are embedded
+    with its recorded model) and keeps accepting uploads. When the shadow
+    holds every live document it replaces the live collection in one
+    atomic snapshot swap, with the last writes caught up while uploads are
+    briefly blocked. The shadow is persisted, so a restarted migration
+    only embeds the documents it is still missing.
+    """
+
+    def __init__(
+        self,
+        registry: TenantStoreRegistry,
+        embedder: Callable[[str], object],
+        target_model: str,
+        between_batches: Callable[[], None] = None,
+        auto: bool = None
+    ):
+        """
+        Initialize migration manager (the worker thread starts on first use)
+
+        Args:
+            registry: Tenant store registry holding the live collections
+            embedder: Returns an embedding service for a model name
+            target_model: Model every collection should end up on
+            between_batches: Passed to generate_embeddings_batch, e.g. to
+                             yield to interactive queries
+            auto: Start migrations when an outdated collection is opened
+                  (defaults to EMBEDDING_MIGRATION_AUTO env variable)
+        """
+        self.registry = registry
+        self.embedder = embedder
+        self.target_model = target_model
+        self.between_batches = between_batches
+        self.auto = auto if auto is not None else (
+            os.getenv("EMBEDDING_MIGRATION_AUTO", "true").lower() == "true"
+        )
+
+        self._lock = threading.Lock()
+        self._migrations = {}             # collection -> Migration
+        self._checked = set()             # collections known to be on the target model
+        self._queue = queue.Queue()
+        self._worker_pid = None
+
+    def needs_migration(self, store: VectorStore) -> bool:
+        """True if a collection's embeddings were made with another model"""
+        if store.count() == 0:
+            return False
+        if store.embedding_model is not None:
+            return store.embedding_model != self.target_model
+        # Collections from before the model was recorded: compare dimensions
+        return store.dimension != self.embedder(self.target_model).embedding_dimension
+
+    def ensure(self, restaurant_id: Optional[str] = None, force: bool = False) -> List[Migration]:
+        """
+        Queue migrations for a tenant's collections that are on an old model
+
+        Args:
+            restaurant_id: Tenant identifier (None for the default collection)
+            force: Queue even when automatic migration is off
+
+        Returns:
+            Migrations queued or running for this tenant
+        """
+        if not (self.auto or force):
+            return []
+
+        active = []
+        for index in (None,) + TENANT_INDEXES:
+            collection = self.registry.collection_for(restaurant_id, index)
+            if collection in self._checked:
+                continue
+
+            with self._lock:
+                migration = self._migrations.get(collection)
+                if migration is not None and migration.status in ("queued", "running"):
+                    active.append(migration)
+                    continue
+                if (migration is not None and migration.status == "busy"
+                        and time.time() - migration.finished_at < BUSY_RETRY_SECONDS):
+                    continue
+
+            store = self.registry.get(restaurant_id, index=index, create=False)
+            if store is None:
+                continue
+            if not self.needs_migration(store):
+                self._checked.add(collection)
+                continue
+
+            migration = Migration(collection, restaurant_id, index, store.embedding_model, self.target_model)
+            with self._lock:
+                self._migrations[collection] = migration
+            self._ensure_worker()
+            self._queue.put(migration)
+            print(f"[OK] Queued re-embedding of '{collection}': {migration.source_model} -> {self.target_model}")
+            active.append(migration)
+
+        return active
+
+    def ensure_all(self) -> List[Migration]:
+        """Queue migrations for the default collection and every tenant on disk"""
+        migrations = self.ensure(None, force=True)
+        for restaurant_id in self.registry.known_tenants():
+            migrations += self.ensure(restaurant_id, force=True)
+        return migrations
+
+    def shadow_store(self, restaurant_id: Optional[str] = None, index: str = None) -> Optional[VectorStore]:
+        """Shadow index of a running migration (for A/B queries), else None"""
+        collection = self.registry.collection_for(restaurant_id, index)
+        with self._lock:
+            migration = self._migrations.get(collection)
+        if migration is None or migration.status != "running":
+            return None
+        return migration.shadow
+
+    def _ensure_worker(self):
+        """Start the migration thread (again after a fork, e.g. gunicorn preload)"""
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                threading.Thread(target=self._worker_loop, name="model-migration", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _worker_loop(self):
+        while True:
+            migration = self._queue.get()
+            try:
+                self.migrate(migration)
+            except Exception as e:
+                migration.status = "failed"
+                migration.error = str(e)
+                migration.finished_at = time.time()
+                print(f"[WARN] Re-embedding of '{migration.collection}' failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def wait(self):
+        """Block until every queued migration has finished (for scripts and tests)"""
+        self._queue.join()
+
+    def migrate(self, migration: Migration):
+        """
+        Re-embed one collection into its shadow and switch to it
+
+        Runs on the worker thread; only one process migrates a collection
+        at a time (others mark it busy and re-check later).
+        """
+        live = self.registry.get(migration.restaurant_id, index=migration.index, create=False)
+        if live is None:
+            migration.status = "switched"
+            return
+
+        lock_path = os.path.join(live.persist_directory, f"{live.collection_name}.migration.lock")
+        with open(lock_path, "a") as lock:
+            if FCNTL_AVAILABLE:
+                try:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    migration.status = "busy"
+                    migration.finished_at = time.time()
+                    return
+            try:
+                self._migrate_locked(migration, live)
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _migrate_locked(self, migration: Migration, live: VectorStore):
+        # Another process may have finished while this one waited
+        if not self.needs_migration(live):
+            migration.status = "switched"
+            self._checked.add(migration.collection)
+            return
+
+        migration.status = "running"
+        migration.started_at = time.time()
+        embedder = self.embedder(self.target_model)
+
+        shadow = VectorStore(
+            persist_directory=live.persist_directory,
+            collection_name=live.collection_name + SHADOW_SUFFIX,
+            storage=live.backend
+        )
+        if shadow.embedding_model not in (None, self.target_model):
+            shadow.reset_collection()
+        migration.shadow = shadow
+
+        # Bulk pass without blocking writes; repeat while uploads keep landing
+        while True:
+            pending, stale = self._diff(live.snapshot(), shadow.snapshot())
+            if not pending and not stale:
+                break
+            self._catch_up(migration, live.snapshot(), shadow, embedder, pending, stale)
+
+        def final_sync(data):
+            pending, stale = self._diff(data, shadow.snapshot())
+            self._catch_up(migration, data, shadow, embedder, pending, stale)
+
+        # Re-resolve in case the registry evicted and reloaded the collection meanwhile
+        live = self.registry.get(migration.restaurant_id, index=migration.index)
+        live.replace_with(shadow, sync=final_sync)
+
+        migration.shadow = None
+        shadow.drop_files()
+        migration.status = "switched"
+        migration.finished_at = time.time()
+        self._checked.add(migration.collection)
+        print(f"[OK] '{migration.collection}' now uses {self.target_model} "
+              f"({migration.chunks_embedded} chunks re-embedded in {migration.to_dict()['seconds']}s)")
+
+    @staticmethod
+    def _diff(live_data: Dict, shadow_data: Dict) -> Tuple[List[str], List[str]]:
+        """Documents missing from the shadow and documents deleted from the live collection"""
+        live_docs = document_rows(live_data)
+        shadow_docs = document_rows(shadow_data)
+        pending = [doc for doc in live_docs if doc not in shadow_docs]
+        stale = [doc for doc in shadow_docs if doc not in live_docs]
+        return pending, stale
+
+    def _catch_up(self, migration: Migration, live_data: Dict, shadow: VectorStore, embedder,
+                  pending: List[str], stale: List[str]):
+        """Embed missing documents into the shadow and drop deleted ones"""
+        for document_id in stale:
+            shadow.delete_document(document_id)
+
+        rows = document_rows(live_data)
+        migration.documents_total = len(rows)
+        for document_id in pending:
+            indices = rows[document_id]
+            chunks = [
+                dict(live_data["metadatas"][i], text=live_data["documents"][i])
+                for i in indices
+            ]
+            embeddings = embedder.generate_embeddings_batch(
+                [embedded_text(chunk["text"], chunk) for chunk in chunks],
+                show_progress=False,
+                between_batches=self.between_batches
+            )
+            shadow.add_documents(chunks, embeddings, document_id, model=self.target_model)
+            migration.chunks_embedded += len(chunks)
+
+        migration.documents_done = len(rows) - len(self._diff(live_data, shadow.snapshot())[0])
+
+    def get_stats(self) -> Dict:
+        """
+        Get migration statistics
+
+        Returns:
+            Dictionary with the target model and each migration's progress
+        """
+        with self._lock:
+            migrations = [m.to_dict() for m in self._migrations.values()]
+        return {
+            "target_model": self.target_model,
+            "auto": self.auto,
+            "migrations": migrations
+        }
@@ -0,0 +1,105 @@
+"""
+Profiler Module
+Low-overhead sampling profiler over all threads (flamegraph collapsed-stack
+output) and a cProfile helper for tracing a single request
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Tuple
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Periodically sample the stacks of every running thread
+
+    Stacks are aggregated in the collapsed format understood by
+    flamegraph.pl and speedscope: ``thread;outer;...;inner count``.
+    Only one profile runs at a time.
+    """
+
+    def __init__(self, interval: float = None, max_seconds: float = None):
+        """
+        Initialize sampling profiler
+
+        Args:
+            interval: Seconds between samples
+            max_seconds: Upper bound for a single profiling run
+        """
+        self.interval = interval or float(os.getenv("PROFILE_INTERVAL", 0.005))
+        self.max_seconds = max_seconds or float(os.getenv("PROFILE_MAX_SECONDS", 60))
+        self._running = threading.Lock()
+
+    def busy(self) -> bool:
+        return self._running.locked()
+
+    def profile(self, seconds: float) -> Tuple[str, int]:
+        """
+        Sample all threads for ``seconds``
+
+        Returns:
+            Tuple of (collapsed stack text, number of samples taken)
+
+        Raises:
+            RuntimeError: If another profile is already running
+        """
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+
+        try:
+            seconds = min(max(seconds, self.interval), self.max_seconds)
+            stacks = Counter()
+            samples = 0
+            own_id = threading.get_ident()
+            deadline = time.monotonic() + seconds
+
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(thread_id, str(thread_id)).replace(" ", "_"))
+                    stacks[";".join(reversed(labels))] += 1
+
+                samples += 1
+                time.sleep(self.interval)
+
+            collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+            return collapsed + "\n", samples
+        finally:
+            self._running.release()
+
+
+def profile_call(fn: Callable, *args, limit: int = 25, **kwargs) -> Tuple[object, str]:
+    """
+    Run ``fn`` under cProfile
+
+    Returns:
+        Tuple of (fn result, text summary of the top functions by cumulative time)
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profile.disable()
+
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return result, stream.getvalue()
@@ -0,0 +1,277 @@
+"""
+Quantization Module
+Scalar (int8) and binary quantized embedding indexes for VectorStore first-pass search
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from similarity import cosine_one_to_many, inverse_norms, normalize_rows, top_k
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Rows processed per block so temporaries stay small on large collections
+_BLOCK_ROWS = 16384
+
+# Popcount lookup for numpy versions without np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(packed: np.ndarray) -> np.ndarray:
+    """Number of set bits per row of a packed uint8 matrix"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(packed).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_TABLE[packed].sum(axis=1, dtype=np.int32)
+
+
+class QuantizedIndex:
+    """
+    Compact in-memory index used for the first pass of a similarity search
+
+    int8:   symmetric per-vector scale, 1 byte per dimension (4x smaller)
+    binary: sign of (vector - mean), 1 bit per dimension (32x smaller)
+
+    Candidates are rescored against the float vectors by the caller.
+    """
+
+    def __init__(self, embeddings: np.ndarray, mode: str):
+        """
+        Build a quantized index
+
+        Args:
+            embeddings: Float matrix (n, dim), may be a read-only memmap
+            mode: "int8" or "binary"
+        """
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+
+        self.mode = mode
+        n, dim = embeddings.shape
+        self.dimension = dim
+
+        if mode == "binary":
+            self.mean = np.asarray(embeddings.mean(axis=0), dtype=np.float32) if n else np.zeros(dim, np.float32)
+
+        self.norms, self.codes, scales = self._encode(embeddings)
+        if mode == "int8":
+            self.scales = scales
+
+    def _encode(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """Quantize rows with this index's settings: (norms, codes, int8 scales or None)"""
+        n, dim = embeddings.shape
+        norms = np.empty(n, dtype=np.float32)
+        scales = None
+
+        if self.mode == "int8":
+            codes = np.empty((n, dim), dtype=np.int8)
+            scales = np.empty(n, dtype=np.float32)
+        else:
+            codes = np.empty((n, (dim + 7) // 8), dtype=np.uint8)
+
+        for start in range(0, n, _BLOCK_ROWS):
+            block = np.asarray(embeddings[start:start + _BLOCK_ROWS], dtype=np.float32)
+            end = start + len(block)
+            norms[start:end] = np.linalg.norm(block, axis=1)
+
+            if self.mode == "int8":
+                scale = np.abs(block).max(axis=1) / 127.0
+                scale[scale == 0] = 1.0
+                scales[start:end] = scale
+                codes[start:end] = np.round(block / scale[:, None]).astype(np.int8)
+            else:
+                codes[start:end] = np.packbits(block > self.mean, axis=1)
+
+        norms[norms == 0] = 1.0
+        return norms, codes, scales
+
+    def _derive(self, norms: np.ndarray, codes: np.ndarray, scales: Optional[np.ndarray]) -> "QuantizedIndex":
+        """New index with this one's settings over the given rows"""
+        index = QuantizedIndex.__new__(QuantizedIndex)
+        index.mode = self.mode
+        index.dimension = self.dimension
+        index.norms = norms
+        index.codes = codes
+        if self.mode == "int8":
+            index.scales = scales
+        else:
+            index.mean = self.mean
+        return index
+
+    def extend(self, embeddings: np.ndarray) -> "QuantizedIndex":
+        """
+        Return a new index with rows appended, quantizing only those rows
+
+        Binary codes of the new rows use this index's mean, which drifts
+        from the data as it grows; rebuild the index from time to time.
+
+        Args:
+            embeddings: Float matrix (m, dim) of the appended rows
+        """
+        if embeddings.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension mismatch: index has {self.dimension}, got {embeddings.shape[1]}"
+            )
+        norms, codes, scales = self._encode(embeddings)
+        return self._derive(
+            np.concatenate([self.norms, norms]),
+            np.concatenate([self.codes, codes]),
+            np.concatenate([self.scales, scales]) if self.mode == "int8" else None
+        )
+
+    def take(self, rows: np.ndarray) -> "QuantizedIndex":
+        """Return a new index holding only the given rows, in that order (e.g. after a delete)"""
+        return self._derive(
+            self.norms[rows],
+            self.codes[rows],
+            self.scales[rows] if self.mode == "int8" else None
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the index in bytes"""
+        total = self.codes.nbytes + self.norms.nbytes
+        if self.mode == "int8":
+            total += self.scales.nbytes
+        else:
+            total += self.mean.nbytes
+        return total
+
+    def approximate_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate similarity of ``query`` to every (or selected) stored vector
+
+        Higher is more similar. For int8 the score approximates cosine
+        similarity; for binary it is the negated Hamming distance.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        codes = self.codes if rows is None else self.codes[rows]
+
+        if self.mode == "binary":
+            query_bits = np.packbits(query > self.mean)
+            return -_popcount(np.bitwise_xor(codes, query_bits)).astype(np.float32)
+
+        scales = self.scales if rows is None else self.scales[rows]
+        norms = self.norms if rows is None else self.norms[rows]
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        # numpy has no int8 GEMM, so codes are upcast block by block
+        dots = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            block = codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            dots[start:start + len(block)] = block @ query
+
+        return dots * scales / norms
+
+    def candidates(self, query: np.ndarray, limit: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return up to ``limit`` row indices with the best approximate scores
+
+        Args:
+            query: Query vector
+            limit: Number of candidates to keep for rescoring
+            rows: Optional subset of rows to search (e.g. after metadata filters)
+        """
+        scores = self.approximate_scores(query, rows)
+        limit = min(limit, len(scores))
+        if limit <= 0:
+            return np.zeros(0, dtype=np.int64)
+
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        return top if rows is None else np.asarray(rows)[top]
+
+
+def exact_top_k(queries: np.ndarray, embeddings: np.ndarray, k: int) -> np.ndarray:
+    """Exact cosine top-k row indices for a batch of queries (one pass over the data)"""
+    queries = normalize_rows(queries)
+    n = len(embeddings)
+    k = min(k, n)
+
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+    for start in range(0, n, _BLOCK_ROWS):
+        block = np.asarray(embeddings[start:start + _BLOCK_ROWS], dtype=np.float32)
+        scores = (queries @ block.T) * inverse_norms(block)
+
+        rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        merged_scores = np.hstack([best_scores, scores])
+        merged_rows = np.hstack([best_rows, rows])
+        keep = np.argsort(-merged_scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+    return best_rows
+
+
+def rescored_top_k(
+    index: QuantizedIndex,
+    embeddings: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    rescore_factor: int
+) -> np.ndarray:
+    """Quantized first pass followed by exact rescoring of the candidates"""
+    candidates = np.sort(index.candidates(query, k * rescore_factor))
+    scores = cosine_one_to_many(query, embeddings, rows=candidates)
+    return candidates[top_k(scores, k)]
+
+
+def evaluate_recall(
+    index: QuantizedIndex,
+    embeddings: np.ndarray,
+    k: int = 5,
+    rescore_factor: int = 4,
+    n_queries: int = 50,
+    seed: int = 0
+) -> float:
+    """
+    Measure recall@k of quantized search + rescoring against exact search
+
+    Queries are stored vectors perturbed with noise, so they resemble real
+    questions landing near (but not exactly on) stored chunks.
+    """
+    n = len(embeddings)
+    if n == 0:
+        return 1.0
+
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n, size=min(n_queries, n), replace=False)
+    queries = np.asarray(embeddings[np.sort(sample)], dtype=np.float32)
+    spread = float(np.abs(queries).mean()) or 1.0
+    queries = queries + rng.normal(0, spread * 0.5, queries.shape).astype(np.float32)
+
+    truth = exact_top_k(queries, embeddings, k)
+
+    hits = 0
+    for query, expected in zip(queries, truth):
+        found = rescored_top_k(index, embeddings, query, k, rescore_factor)
+        hits += len(set(found.tolist()) & set(expected.tolist()))
+
+    return hits / float(truth.size)
+
+
+def tune_rescore_factor(
+    index: QuantizedIndex,
+    embeddings: np.ndarray,
+    recall_floor: float,
+    k: int = 5,
+    start_factor: int = 4,
+    max_factor: int = 64,
+    n_queries: int = 50
+) -> Dict:
+    """
+    Find the smallest rescore factor whose recall@k meets ``recall_floor``
+
+    Returns:
+        Dictionary with the chosen factor, its measured recall and the
+        number of rows it was measured on
+    """
+    factor = start_factor
+    recall = evaluate_recall(index, embeddings, k=k, rescore_factor=factor, n_queries=n_queries)
+
+    while recall < recall_floor and factor < max_factor:
+        factor *= 2
+        recall = evaluate_recall(index, embeddings, k=k, rescore_factor=factor, n_queries=n_queries)
+
+    return {"rescore_factor": factor, "recall_at_k": recall, "k": k, "rows": len(embeddings)}
@@ -0,0 +1,209 @@
+"""
+Reranker Module
+Optional cross-encoder reranking of retrieved chunks with a latency budget
+"""
+
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import CACHE_HITS, CACHE_MISSES, RERANK_FALLBACKS
+
+load_dotenv()
+
+# Candidates fetched from the vector store for the reranker to choose from
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+
+
+class Reranker:
+    """
+    Rescore (query, chunk) pairs with a local cross-encoder
+
+    Pairs from concurrent requests are collected for a few milliseconds and
+    scored in one model call. Scores are cached per pair. When a request's
+    budget runs out it keeps the vector store order; the pending scores still
+    land in the cache for the next time.
+    """
+
+    def __init__(
+        self,
+        model_name: str = None,
+        budget_ms: float = None,
+        cache_size: int = None,
+        batch_window_ms: float = None,
+        max_batch: int = None
+    ):
+        """
+        Load the cross-encoder (the batching thread starts on first use)
+
+        Args:
+            model_name: Cross-encoder model (defaults to cross-encoder/ms-marco-MiniLM-L-6-v2)
+            budget_ms: Time a request may wait for scores before falling back
+            cache_size: (query, chunk) scores kept in the LRU cache (0 disables)
+            batch_window_ms: How long to collect pairs from other requests
+            max_batch: Most pairs scored in one model call
+        """
+        self.model_name = model_name or os.getenv(
+            "RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        )
+        self.budget = (budget_ms if budget_ms is not None else float(
+            os.getenv("RERANK_BUDGET_MS", 150)
+        )) / 1000.0
+        self.cache_size = cache_size if cache_size is not None else int(
+            os.getenv("RERANK_CACHE_SIZE", 4096)
+        )
+        self.batch_window = (batch_window_ms if batch_window_ms is not None else float(
+            os.getenv("RERANK_BATCH_WINDOW_MS", 5)
+        )) / 1000.0
+        self.max_batch = max_batch or int(os.getenv("RERANK_MAX_BATCH", 64))
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+        self._worker_pid = None
+
+        # Deferred: importing sentence-transformers pulls in torch (seconds)
+        from sentence_transformers import CrossEncoder
+
+        print(f"Loading reranker model: {self.model_name}...")
+        self.model = CrossEncoder(self.model_name)
+
+        print(f"[OK] Cross-encoder reranker initialized")
+        print(f"  Model: {self.model_name}")
+        print(f"  Budget: {self.budget * 1000:.0f} ms")
+
+    @staticmethod
+    def _pair_key(query: str, text: str) -> Tuple[str, str]:
+        return query, hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _ensure_worker(self):
+        """Start the batching thread (again after a fork, e.g. gunicorn preload)"""
+        if self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid != os.getpid():
+                self._pending = queue.Queue()
+                threading.Thread(target=self._batch_loop, name="reranker", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _batch_loop(self):
+        """Score queued pairs in batches shared by all waiting requests"""
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                scores = self.model.predict(
+                    [pair for pair, _, _ in batch],
+                    batch_size=self.max_batch,
+                    show_progress_bar=False
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._cache_lock:
+                for (_, key, future), score in zip(batch, scores):
+                    if self.cache_size:
+                        self._cache[key] = float(score)
+                        self._cache.move_to_end(key)
+                    future.set_result(float(score))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Cross-encoder scores for one query against several chunks
+
+        Args:
+            query: User question
+            texts: Chunk texts
+
+        Returns:
+            One score per text
+
+        Raises:
+            TimeoutError: If the scores are not ready within the budget
+        """
+        deadline = time.perf_counter() + self.budget
+        scores = [None] * len(texts)
+        futures = []
+
+        with self._cache_lock:
+            for position, text in enumerate(texts):
+                key = self._pair_key(query, text)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    scores[position] = cached
+                else:
+                    futures.append((position, key, text))
+
+        if len(texts) > len(futures):
+            CACHE_HITS.inc(len(texts) - len(futures), cache="rerank")
+        if futures:
+            CACHE_MISSES.inc(len(futures), cache="rerank")
+
+        self._ensure_worker()
+        waiting = []
+        for position, key, text in futures:
+            future = Future()
+            self._pending.put(((query, text), key, future))
+            waiting.append((position, future))
+
+        for position, future in waiting:
+            remaining = deadline - time.perf_counter()
+            try:
+                scores[position] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                raise TimeoutError("Rerank budget exceeded")
+
+        return scores
+
+    def rerank(self, query: str, results: Dict, top_k: int) -> Dict:
+        """
+        Reorder vector store results by cross-encoder score and keep the best top_k
+
+        Args:
+            query: User question
+            results: query_similar output ({"results", "count"})
+            top_k: Number of results to keep
+
+        Returns:
+            Results in the same shape, each with a rerank_score when reranked
+        """
+        candidates = results["results"]
+        if len(candidates) <= 1:
+            return results
+
+        try:
+            scores = self.score(query, [r["text"] for r in candidates])
+        except TimeoutError:
+            RERANK_FALLBACKS.inc(reason="budget")
+            kept = candidates[:top_k]
+            return {"results": kept, "count": len(kept)}
+        except Exception as e:
+            print(f"[WARN] Reranking failed, keeping vector order: {str(e)}")
+            RERANK_FALLBACKS.inc(reason="error")
+            kept = candidates[:top_k]
+            return {"results": kept, "count": len(kept)}
+
+        ranked = sorted(zip(candidates, scores), key=lambda x: x[1], reverse=True)[:top_k]
+        kept = [dict(r, rerank_score=score) for r, score in ranked]
+        return {"results": kept, "count": len(kept)}
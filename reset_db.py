@@ -1,6 +1,10 @@
 """
 Reset ChromaDB Database
-This script resets the ChromaDB collection to fix dimension mismatches
+This script deletes all collections and their documents
+
+Changing EMBEDDING_MODEL no longer needs a reset: collections record the
+model they were built with and are re-embedded in the background (see
+model_migration.py).
 """
 
 import os
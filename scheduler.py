@@ -0,0 +1,219 @@
+"""
+Scheduler Module
+Admission control and priority between interactive queries and batch ingestion
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from metrics import SCHEDULER_ACTIVE, SCHEDULER_QUEUED, SCHEDULER_REJECTED, SCHEDULER_WAIT_SECONDS
+
+load_dotenv()
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, workload: str, retry_after: int):
+        super().__init__(f"Server busy ({workload} queue full), retry in {retry_after}s")
+        self.workload = workload
+        self.retry_after = retry_after
+
+
+class _Lane:
+    """Concurrency limit and bounded wait queue for one workload class"""
+
+    def __init__(self, limit: int, max_queued: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.service_seconds = None     # EWMA of time a request holds its slot
+
+
+class WorkloadScheduler:
+    """
+    Classify work as interactive (chat, search) or batch (ingestion)
+
+    Each class has its own concurrency limit and a short bounded queue;
+    anything beyond that is shed with a Retry-After estimate instead of
+    piling up behind the CPU. Interactive work has strict priority: no new
+    ingestion is admitted while queries are waiting, and running ingestion
+    pauses between embedding batches while queries are in flight.
+    """
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(
+        self,
+        max_interactive: int = None,
+        max_interactive_queued: int = None,
+        interactive_queue_timeout: float = None,
+        max_ingest: int = None,
+        max_ingest_queued: int = None,
+        ingest_queue_timeout: float = None,
+        max_batch_pause: float = None
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            max_interactive: Queries processed at once
+            max_interactive_queued: Queries allowed to wait for a slot
+            interactive_queue_timeout: Longest a query waits before it is shed
+            max_ingest: Uploads processed at once
+            max_ingest_queued: Uploads allowed to wait for a slot
+            ingest_queue_timeout: Longest an upload waits before it is shed
+            max_batch_pause: Longest ingestion yields to queries per batch
+                             (bounds starvation under constant chat load)
+        """
+        self._lanes = {
+            INTERACTIVE: _Lane(
+                max_interactive or int(os.getenv("SCHEDULER_MAX_INTERACTIVE", 8)),
+                max_interactive_queued if max_interactive_queued is not None else int(
+                    os.getenv("SCHEDULER_MAX_INTERACTIVE_QUEUED", 32)
+                ),
+                interactive_queue_timeout if interactive_queue_timeout is not None else float(
+                    os.getenv("SCHEDULER_INTERACTIVE_QUEUE_TIMEOUT", 2.0)
+                )
+            ),
+            BATCH: _Lane(
+                max_ingest or int(os.getenv("SCHEDULER_MAX_INGEST", 1)),
+                max_ingest_queued if max_ingest_queued is not None else int(
+                    os.getenv("SCHEDULER_MAX_INGEST_QUEUED", 4)
+                ),
+                ingest_queue_timeout if ingest_queue_timeout is not None else float(
+                    os.getenv("SCHEDULER_INGEST_QUEUE_TIMEOUT", 30.0)
+                )
+            )
+        }
+        self.max_batch_pause = max_batch_pause if max_batch_pause is not None else float(
+            os.getenv("SCHEDULER_MAX_BATCH_PAUSE", 1.0)
+        )
+        self._condition = threading.Condition()
+        self.batch_pauses = 0
+
+    def _retry_after(self, lane: _Lane) -> int:
+        """Estimate when a slot frees up from queue depth and service time"""
+        service = lane.service_seconds or 1.0
+        return max(1, math.ceil(service * (lane.queued + 1) / lane.limit))
+
+    def _reject(self, workload: str, lane: _Lane):
+        lane.rejected += 1
+        SCHEDULER_REJECTED.inc(workload=workload)
+        raise Overloaded(workload, self._retry_after(lane))
+
+    def _blocked(self, workload: str, lane: _Lane) -> bool:
+        if lane.active >= lane.limit:
+            return True
+        # Strict priority: ingestion does not start while queries are waiting
+        return workload == BATCH and self._lanes[INTERACTIVE].queued > 0
+
+    @contextmanager
+    def admit(self, workload: str):
+        """
+        Hold a slot for one request of the given workload
+
+        Args:
+            workload: INTERACTIVE or BATCH
+
+        Raises:
+            Overloaded: If the queue is full or the wait exceeds the queue timeout
+        """
+        lane = self._lanes[workload]
+        start = time.perf_counter()
+
+        with self._condition:
+            if self._blocked(workload, lane):
+                if lane.queued >= lane.max_queued:
+                    self._reject(workload, lane)
+
+                deadline = start + lane.queue_timeout
+                lane.queued += 1
+                SCHEDULER_QUEUED.inc(workload=workload)
+                try:
+                    while self._blocked(workload, lane):
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._reject(workload, lane)
+                        self._condition.wait(remaining)
+                finally:
+                    lane.queued -= 1
+                    SCHEDULER_QUEUED.dec(workload=workload)
+                    # A batch request may be waiting for the interactive queue to drain
+                    self._condition.notify_all()
+
+            lane.active += 1
+            lane.admitted += 1
+            SCHEDULER_ACTIVE.inc(workload=workload)
+
+        admitted = time.perf_counter()
+        SCHEDULER_WAIT_SECONDS.observe(admitted - start, workload=workload)
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - admitted
+            with self._condition:
+                lane.active -= 1
+                SCHEDULER_ACTIVE.dec(workload=workload)
+                if lane.service_seconds is None:
+                    lane.service_seconds = held
+                else:
+                    lane.service_seconds += self.EWMA_ALPHA * (held - lane.service_seconds)
+                self._condition.notify_all()
+
+    def yield_to_interactive(self):
+        """
+        Pause batch work while queries are running or waiting
+
+        Called by ingestion between embedding batches. The pause is capped
+        at max_batch_pause so ingestion still progresses under steady load.
+        """
+        interactive = self._lanes[INTERACTIVE]
+        with self._condition:
+            if not (interactive.active or interactive.queued):
+                return
+            self.batch_pauses += 1
+            deadline = time.perf_counter() + self.max_batch_pause
+            while interactive.active or interactive.queued:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return
+                self._condition.wait(remaining)
+
+    def get_stats(self) -> Dict:
+        """
+        Get scheduler statistics
+
+        Returns:
+            Dictionary with limits, queue depth and shed counts per workload
+        """
+        with self._condition:
+            stats = {
+                workload: {
+                    "limit": lane.limit,
+                    "active": lane.active,
+                    "queued": lane.queued,
+                    "max_queued": lane.max_queued,
+                    "admitted": lane.admitted,
+                    "rejected": lane.rejected,
+                    "avg_service_seconds": (
+                        round(lane.service_seconds, 4) if lane.service_seconds is not None else None
+                    )
+                }
+                for workload, lane in self._lanes.items()
+            }
+            stats["batch_pauses"] = self.batch_pauses
+            return stats
@@ -0,0 +1,279 @@
+"""
+Session Store Module
+Bounded in-process conversation memory with TTL, LRU eviction and a rolling summary
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,128}$")
+
+# Follow-ups that lean on the previous question ("and is it spicy?")
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|it's|they|them|their|that|those|this|these|one|ones|same|also|too|else)\b"
+    r"|^\s*(and|or|but|what about|how about)\b",
+    re.IGNORECASE
+)
+
+SUMMARY_PROMPT = """Summarize this restaurant conversation for the assistant's memory.
+Keep dishes, preferences, allergies, party details and open questions. Drop pleasantries.
+Reply with the summary only, at most 80 words."""
+
+
+class ConversationSession:
+    """Recent turns plus a compressed summary of everything older"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.summary = ""
+        self.turns = []             # [{"role": ..., "content": ...}], oldest first
+        self.overflow = []          # turns waiting to be folded into the summary
+        self.compressing = False    # a summary job is queued or running
+        self.topic = None           # last standalone question, anchors follow-ups
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    """
+    Server-side chat memory keyed by restaurant and table/session id
+
+    Only the last few turns are sent to the LLM verbatim; older turns are
+    compressed into a summary in the background, so the prompt stays the
+    same size however long the conversation runs. Sessions expire after
+    a TTL and the least recently used are evicted past max_sessions.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = None,
+        ttl_seconds: float = None,
+        max_turns: int = None,
+        summary_max_chars: int = None,
+        summarizer: Callable[[str, List[Dict]], str] = None
+    ):
+        """
+        Initialize session store
+
+        Args:
+            max_sessions: Sessions kept in memory before LRU eviction
+            ttl_seconds: Idle time after which a session expires
+            max_turns: Messages (user + assistant) kept verbatim
+            summary_max_chars: Hard cap on the rolling summary
+            summarizer: Callable (summary, turns) -> new summary, e.g. an LLM call;
+                        without one the oldest turns are appended and trimmed
+        """
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX", 10000))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("SESSION_TTL_SECONDS", 3600))
+        self.max_turns = max_turns or int(os.getenv("SESSION_MAX_TURNS", 6))
+        self.summary_max_chars = summary_max_chars or int(
+            os.getenv("SESSION_SUMMARY_MAX_CHARS", 600)
+        )
+        self.summarizer = summarizer
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()    # key -> ConversationSession (LRU order)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="session-summary")
+
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.summaries = 0
+        self.summary_failures = 0
+
+    @staticmethod
+    def session_key(session_id: str, restaurant_id: Optional[str] = None) -> str:
+        """
+        Build the store key for a session
+
+        Raises:
+            ValueError: If the session id contains unsupported characters
+        """
+        if not _SESSION_ID_PATTERN.match(session_id or ""):
+            raise ValueError(
+                "Invalid session_id: use up to 128 letters, digits, '_', '-', '.' or ':'"
+            )
+        return f"{restaurant_id or ''}/{session_id}"
+
+    def _expire_locked(self, now: float):
+        """Drop sessions idle past the TTL (LRU order, so stop at the first live one)"""
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_active < self.ttl_seconds:
+                break
+            del self._sessions[key]
+            self.expired += 1
+
+    def get(self, session_id: str, restaurant_id: Optional[str] = None) -> ConversationSession:
+        """
+        Get a session, starting a new one if it does not exist or expired
+
+        Args:
+            session_id: Table or client session identifier
+            restaurant_id: Tenant the session belongs to
+
+        Returns:
+            ConversationSession
+        """
+        key = self.session_key(session_id, restaurant_id)
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire_locked(now)
+
+            session = self._sessions.get(key)
+            if session is None:
+                session = ConversationSession(key)
+                self._sessions[key] = session
+                self.created += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(key)
+
+            session.last_active = now
+            return session
+
+    def end(self, session_id: str, restaurant_id: Optional[str] = None) -> bool:
+        """
+        Forget a session
+
+        Returns:
+            True if the session existed
+        """
+        key = self.session_key(session_id, restaurant_id)
+        with self._lock:
+            return self._sessions.pop(key, None) is not None
+
+    def history(self, session: ConversationSession) -> Tuple[str, List[Dict]]:
+        """
+        Summary and recent turns to send with the next question
+
+        Returns:
+            Tuple of (summary, turns)
+        """
+        with session.lock:
+            return session.summary, list(session.turns)
+
+    @staticmethod
+    def is_follow_up(question: str) -> bool:
+        """True if a question refers back to an earlier one ("is it spicy?")"""
+        return _FOLLOW_UP_PATTERN.search(question) is not None
+
+    def rewrite_query(self, session: ConversationSession, question: str) -> str:
+        """
+        Make a follow-up question self-contained for retrieval
+
+        Questions that refer back ("is it spicy?") are prefixed with the
+        last standalone question, so the embedding lands near the dish
+        being discussed. Standalone questions pass through, however short.
+
+        Args:
+            session: Conversation session
+            question: Latest user question
+
+        Returns:
+            Query text to embed
+        """
+        with session.lock:
+            topic = session.topic
+
+        if not topic or not self.is_follow_up(question):
+            return question
+        return f"{topic} {question}"
+
+    def record(self, session: ConversationSession, question: str, answer: str):
+        """
+        Append a question/answer exchange and compress the oldest turns
+
+        Args:
+            session: Conversation session
+            question: User question
+            answer: Assistant answer
+        """
+        with session.lock:
+            # Standalone questions become the topic later follow-ups refer to
+            if session.topic is None or not self.is_follow_up(question):
+                session.topic = question
+            session.turns.append({"role": "user", "content": question})
+            session.turns.append({"role": "assistant", "content": answer})
+
+            overflow = len(session.turns) - self.max_turns
+            if overflow <= 0:
+                return
+            # Move whole exchanges so the kept history starts with a user turn
+            overflow += overflow % 2
+            session.overflow.extend(session.turns[:overflow])
+            del session.turns[:overflow]
+
+            # One job per session, so each summary builds on the previous one
+            if session.compressing:
+                return
+            session.compressing = True
+
+        self._executor.submit(self._compress, session)
+
+    def _compress(self, session: ConversationSession):
+        """Fold overflowed turns into the rolling summary until none are left"""
+        try:
+            while True:
+                with session.lock:
+                    summary, turns = session.summary, session.overflow
+                    session.overflow = []
+                    if not turns:
+                        session.compressing = False
+                        return
+                self._fold(session, summary, turns)
+        except Exception:
+            with session.lock:
+                session.compressing = False
+            raise
+
+    def _fold(self, session: ConversationSession, summary: str, turns: List[Dict]):
+        """Replace the summary with one covering it and the given turns"""
+        new_summary = None
+        if self.summarizer is not None:
+            try:
+                new_summary = self.summarizer(summary, turns).strip()
+                self.summaries += 1
+            except Exception as e:
+                print(f"[WARN] Session summary failed, trimming instead: {str(e)}")
+                self.summary_failures += 1
+
+        if not new_summary:
+            lines = [f"{t['role']}: {t['content']}" for t in turns]
+            new_summary = "\n".join(([summary] if summary else []) + lines)
+
+        with session.lock:
+            # Keep the most recent part if the summary is still too long
+            session.summary = new_summary[-self.summary_max_chars:]
+
+    def get_stats(self) -> Dict:
+        """
+        Get session store statistics
+
+        Returns:
+            Dictionary with active sessions and eviction counters
+        """
+        with self._lock:
+            self._expire_locked(time.monotonic())
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "summaries": self.summaries,
+                "summary_failures": self.summary_failures
+            }
@@ -0,0 +1,232 @@
+"""
+Shared Index Module
+Read-only, memory-mapped generations of a VectorStore that many worker
+processes can attach to zero-copy (e.g. gunicorn workers on one host)
+"""
+
+import os
+import pickle
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+class TextArena:
+    """
+    Read-only sequence of chunk texts backed by one memory-mapped UTF-8 buffer
+
+    Texts are decoded on access, so only the chunks actually returned by a
+    query are materialized as Python strings.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("text index out of range")
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._buffer[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def write_texts(texts, texts_path: str, offsets_path: str):
+    """Write chunk texts as one UTF-8 buffer plus int64 offsets (read back with load_texts)"""
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    np.save(offsets_path, offsets)
+    with open(texts_path, "wb") as f:
+        f.write(b"".join(encoded))
+
+
+def load_texts(texts_path: str, offsets_path: str) -> TextArena:
+    """Memory-map texts written by write_texts"""
+    offsets = np.load(offsets_path, mmap_mode="r")
+    if os.path.getsize(texts_path) > 0:
+        buffer = np.memmap(texts_path, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.zeros(0, dtype=np.uint8)
+    return TextArena(buffer, offsets)
+
+
+class SharedIndex:
+    """
+    Publish and attach memory-mapped generations of a collection
+
+    Layout under ``<persist_directory>/<collection>.shared/``:
+        gen-<N>/embeddings.npy   float32 matrix (n, dim)
+        gen-<N>/texts.bin        concatenated UTF-8 chunk texts
+        gen-<N>/offsets.npy      int64 text offsets (n + 1)
+        gen-<N>/meta.pkl         ids, metadatas and embedding model name
+        CURRENT                  number of the live generation (atomically replaced)
+        .lock                    cross-process writer lock
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str, keep_generations: int = 2):
+        """
+        Initialize shared index directory
+
+        Args:
+            persist_directory: Vector store persist directory
+            collection_name: Name of the collection
+            keep_generations: Number of old generations kept for late readers
+        """
+        if not FCNTL_AVAILABLE:
+            raise RuntimeError("Shared index mode requires POSIX file locking (fcntl)")
+
+        self.root = os.path.join(persist_directory, f"{collection_name}.shared")
+        self.current_file = os.path.join(self.root, "CURRENT")
+        self.lock_file = os.path.join(self.root, ".lock")
+        self.keep_generations = keep_generations
+
+        os.makedirs(self.root, exist_ok=True)
+
+        self._current_stat = None
+        self._current_generation = None
+
+    @contextmanager
+    def writer_lock(self):
+        """Exclusive lock held by the single process publishing a generation"""
+        with open(self.lock_file, "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def current_generation(self) -> Optional[int]:
+        """
+        Return the live generation number (None if nothing was published)
+
+        Only a stat() is done per call; CURRENT is re-read when it changed.
+        """
+        try:
+            st = os.stat(self.current_file)
+        except FileNotFoundError:
+            return None
+
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._current_stat:
+            with open(self.current_file) as f:
+                self._current_generation = int(f.read().strip())
+            self._current_stat = key
+
+        return self._current_generation
+
+    def last_published_ns(self) -> int:
+        """Modification time of CURRENT in nanoseconds (0 if unpublished)"""
+        try:
+            return os.stat(self.current_file).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def publish(self, data: Dict, generation: int):
+        """
+        Write ``data`` as a new generation and make it live
+
+        Caller must hold ``writer_lock``.
+
+        Args:
+            data: Vector store snapshot
+            generation: Generation number (the store's mutation sequence)
+        """
+        gen_dir = os.path.join(self.root, f"gen-{generation}")
+        if generation == self.current_generation() and os.path.isdir(gen_dir):
+            # Same mutation sequence as the live generation (e.g. republished
+            # after a compaction touched the snapshot): the content is the same,
+            # and rewriting it would delete files other workers are attaching
+            self._write_current(generation)
+            return
+
+        tmp_dir = f"{gen_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        np.save(os.path.join(tmp_dir, "embeddings.npy"), np.asarray(data["embeddings"], dtype=np.float32))
+        write_texts(
+            data["documents"],
+            os.path.join(tmp_dir, "texts.bin"),
+            os.path.join(tmp_dir, "offsets.npy")
+        )
+        with open(os.path.join(tmp_dir, "meta.pkl"), "wb") as f:
+            pickle.dump(
+                {"ids": data["ids"], "metadatas": data["metadatas"], "model": data.get("model")},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+
+        shutil.rmtree(gen_dir, ignore_errors=True)
+        os.replace(tmp_dir, gen_dir)
+
+        self._write_current(generation)
+        self._prune(generation)
+
+    def _write_current(self, generation: int):
+        """Atomically point CURRENT at a generation (also refreshes its mtime)"""
+        tmp_current = f"{self.current_file}.tmp"
+        with open(tmp_current, "w") as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_current, self.current_file)
+
+    def attach(self, generation: int) -> Dict:
+        """
+        Map a published generation read-only into this process
+
+        Returns:
+            Snapshot dict whose embeddings and documents share page cache
+            with every other attached process
+        """
+        gen_dir = os.path.join(self.root, f"gen-{generation}")
+
+        with open(os.path.join(gen_dir, "meta.pkl"), "rb") as f:
+            meta = pickle.load(f)
+
+        embeddings = np.load(os.path.join(gen_dir, "embeddings.npy"), mmap_mode="r")
+
+        return {
+            "ids": meta["ids"],
+            "documents": load_texts(
+                os.path.join(gen_dir, "texts.bin"),
+                os.path.join(gen_dir, "offsets.npy")
+            ),
+            "embeddings": embeddings,
+            "metadatas": meta["metadatas"],
+            "model": meta.get("model")
+        }
+
+    def _prune(self, live_generation: int):
+        """Remove generations older than the ones kept for late readers"""
+        generations = []
+        for name in os.listdir(self.root):
+            if name.startswith("gen-") and not name.endswith(".tmp"):
+                try:
+                    generations.append(int(name[4:]))
+                except ValueError:
+                    continue
+
+        # Already-mapped files stay valid after unlink, so pruning is safe
+        for gen in sorted(generations)[:-self.keep_generations]:
+            if gen != live_generation:
+                shutil.rmtree(os.path.join(self.root, f"gen-{gen}"), ignore_errors=True)
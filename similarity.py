@@ -0,0 +1,146 @@
+"""
+Similarity Module
+Cosine similarity kernels on float32: normalization, one-to-many and pairwise scores, top-k
+"""
+
+import math
+import os
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+# BLAS thread control is optional (pip install threadpoolctl)
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+load_dotenv()
+
+# Rows processed per block so temporaries stay small on large (memory-mapped) matrices
+_BLOCK_ROWS = 16384
+
+
+def inverse_norms(matrix: np.ndarray) -> np.ndarray:
+    """
+    1 / L2 norm of every row, as float32 (0 for zero rows, so they score 0)
+
+    Computed once per snapshot; scoring a query is then a single
+    matrix-vector product scaled by these, with no normalized copy of the
+    matrix.
+    """
+    n = len(matrix)
+    result = np.empty(n, dtype=np.float32)
+    for start in range(0, n, _BLOCK_ROWS):
+        block = np.asarray(matrix[start:start + _BLOCK_ROWS], dtype=np.float32)
+        result[start:start + len(block)] = np.sqrt(np.einsum("ij,ij->i", block, block))
+    nonzero = result > 0
+    result[nonzero] = 1.0 / result[nonzero]
+    return result
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    """Vector scaled to unit length as float32 (a zero vector stays zero)"""
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = float(np.sqrt(vector @ vector))
+    return vector / norm if norm > 0 else vector
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length as float32 (zero rows stay zero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        return normalize(matrix)
+    return matrix * inverse_norms(matrix)[:, None]
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine similarity of two vectors (0 if either is zero)"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1)
+    b = np.asarray(b, dtype=np.float32).reshape(-1)
+    denominator = math.sqrt(float(a @ a) * float(b @ b))
+    return float(a @ b) / denominator if denominator > 0 else 0.0
+
+
+def cosine_one_to_many(
+    query: np.ndarray,
+    matrix: np.ndarray,
+    inv_norms: Optional[np.ndarray] = None,
+    rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Cosine similarity of one query against many rows
+
+    Args:
+        query: Query vector (dim,)
+        matrix: Row vectors (n, dim), float32, may be a read-only memmap
+        inv_norms: Precomputed inverse_norms(matrix); computed if omitted
+        rows: Optional row indices to score (e.g. candidates or a filter)
+
+    Returns:
+        float32 scores, one per row (per entry of rows if given)
+    """
+    query = normalize(query)
+    if rows is not None:
+        vectors = np.asarray(matrix[rows], dtype=np.float32)
+        scale = inv_norms[rows] if inv_norms is not None else inverse_norms(vectors)
+    else:
+        vectors = matrix
+        scale = inv_norms if inv_norms is not None else inverse_norms(vectors)
+    return (vectors @ query) * scale
+
+
+def cosine_pairwise(a: np.ndarray, b: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Cosine similarity between every row of a and every row of b (or of a)
+
+    Returns:
+        float32 matrix (len(a), len(b))
+    """
+    unit_a = normalize_rows(a)
+    unit_b = unit_a if b is None else normalize_rows(b)
+    return unit_a @ unit_b.T
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, best first
+
+    Uses a linear-time partition, then sorts only the k survivors (ties by
+    position, so results are deterministic).
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        positions = np.argpartition(-scores, k - 1)[:k]
+    else:
+        positions = np.arange(n)
+    return positions[np.lexsort((positions, -scores[positions]))]
+
+
+def set_blas_threads(threads: int = None) -> Optional[int]:
+    """
+    Cap the BLAS thread pool used by the similarity kernels
+
+    With several gunicorn workers per host, each worker's BLAS library
+    would otherwise start one thread per core and they oversubscribe the
+    CPU. Applies process-wide; does nothing without threadpoolctl.
+
+    Args:
+        threads: Thread count (defaults to SIMILARITY_THREADS env variable; unset leaves BLAS alone)
+
+    Returns:
+        The applied limit, or None if nothing was changed
+    """
+    threads = threads or int(os.getenv("SIMILARITY_THREADS", 0))
+    if not threads:
+        return None
+    if not THREADPOOLCTL_AVAILABLE:
+        print("[WARN] SIMILARITY_THREADS needs threadpoolctl (pip install threadpoolctl); ignored")
+        return None
+    threadpool_limits(limits=threads, user_api="blas")
+    return threads
@@ -0,0 +1,270 @@
+"""
+Tenant Store Module
+Per-restaurant VectorStore shards, loaded lazily and evicted LRU
+"""
+
+import os
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from storage import create_storage_backend
+from vector_store import VectorStore
+
+load_dotenv()
+
+_TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Secondary per-tenant indexes, stored as <collection>.<index>
+TENANT_INDEXES = ("faq",)
+
+
+class TenantStoreRegistry:
+    """
+    Route each restaurant to its own VectorStore collection
+
+    A tenant's shard is loaded on first use, so queries only ever touch
+    that tenant's vectors. Shards are evicted least-recently-used when the
+    resident count or memory limit is exceeded, and after sitting idle,
+    so idle tenants cost no RAM (their data stays on disk).
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = None,
+        base_collection: str = None,
+        max_resident: int = None,
+        memory_limit_mb: float = None,
+        idle_seconds: float = None,
+        storage=None
+    ):
+        """
+        Initialize tenant registry
+
+        Args:
+            persist_directory: Path to persist data
+            base_collection: Collection used when no restaurant_id is given;
+                             tenant collections are named <base>__<restaurant_id>
+            max_resident: Maximum shards kept in memory
+            memory_limit_mb: Evict shards while resident memory exceeds this
+            idle_seconds: Evict shards unused for this long (0 disables)
+            storage: Storage backend for every shard (defaults to one built
+                     from the VECTOR_STORAGE_URL env variable)
+        """
+        self.persist_directory = persist_directory or os.getenv(
+            "CHROMA_PERSIST_DIR",
+            "./data/chroma_db"
+        )
+        self.base_collection = base_collection or os.getenv(
+            "COLLECTION_NAME",
+            "restaurant_docs"
+        )
+        self.max_resident = max_resident or int(os.getenv("MAX_RESIDENT_TENANTS", 16))
+        self.memory_limit_bytes = (
+            memory_limit_mb if memory_limit_mb is not None
+            else float(os.getenv("TENANT_MEMORY_LIMIT_MB", 512))
+        ) * 1024 * 1024
+        self.idle_seconds = (
+            idle_seconds if idle_seconds is not None
+            else float(os.getenv("TENANT_IDLE_SECONDS", 1800))
+        )
+        self.storage = storage or create_storage_backend(self.persist_directory)
+
+        self._lock = threading.Lock()
+        self._stores = OrderedDict()      # collection name -> VectorStore (LRU order)
+        self._last_used = {}              # collection name -> monotonic timestamp
+        self._loading = {}                # collection name -> per-shard load lock
+        # Evicted shards still referenced by in-flight requests; reused instead of
+        # opening a second writer on the same files
+        self._evicted = weakref.WeakValueDictionary()
+
+        self.loads = 0
+        self.evictions = 0
+
+    def collection_for(self, restaurant_id: Optional[str], index: str = None) -> str:
+        """
+        Map a restaurant id to its collection name
+
+        Args:
+            restaurant_id: Tenant identifier (None for the default collection)
+            index: Optional secondary index name (see TENANT_INDEXES)
+
+        Raises:
+            ValueError: If the restaurant id contains unsupported characters
+        """
+        if index is not None and index not in TENANT_INDEXES:
+            raise ValueError(f"Unknown tenant index: {index}")
+        suffix = f".{index}" if index else ""
+
+        if restaurant_id in (None, ""):
+            return self.base_collection + suffix
+
+        restaurant_id = str(restaurant_id)
+        if not _TENANT_ID_PATTERN.match(restaurant_id):
+            raise ValueError("restaurant_id may only contain letters, digits, '-' and '_'")
+
+        return f"{self.base_collection}__{restaurant_id}{suffix}"
+
+    def get(self, restaurant_id: Optional[str] = None, index: str = None, create: bool = True) -> Optional[VectorStore]:
+        """
+        Return the shard for a restaurant, loading it on first use
+
+        Args:
+            restaurant_id: Tenant identifier (None for the default collection)
+            index: Optional secondary index (e.g. "faq") instead of the chunk store
+            create: If False, return None instead of creating a store with no data on disk
+
+        Returns:
+            VectorStore for that tenant
+        """
+        collection = self.collection_for(restaurant_id, index)
+
+        with self._lock:
+            store = self._touch_locked(collection)
+            if store is not None:
+                return store
+            if not create and not self.storage.exists(collection):
+                return None
+            load_lock = self._loading.setdefault(collection, threading.Lock())
+
+        # Load outside the registry lock so other tenants are not blocked
+        with load_lock:
+            with self._lock:
+                store = self._touch_locked(collection)
+                if store is not None:
+                    return store
+
+            store = VectorStore(
+                persist_directory=self.persist_directory,
+                collection_name=collection,
+                storage=self.storage
+            )
+
+            with self._lock:
+                self._stores[collection] = store
+                self._last_used[collection] = time.monotonic()
+                self._loading.pop(collection, None)
+                self.loads += 1
+                self._evict_locked(keep=collection)
+
+        return store
+
+    def _touch_locked(self, collection: str) -> Optional[VectorStore]:
+        store = self._stores.get(collection)
+        if store is None:
+            store = self._evicted.pop(collection, None)
+            if store is not None:
+                self._stores[collection] = store
+        if store is not None:
+            self._stores.move_to_end(collection)
+            self._last_used[collection] = time.monotonic()
+            self._evict_locked(keep=collection)
+        return store
+
+    def _evict_locked(self, keep: str):
+        """Evict idle shards, then LRU shards while over the limits"""
+        now = time.monotonic()
+
+        if self.idle_seconds > 0:
+            for collection in list(self._stores):
+                if collection != keep and now - self._last_used[collection] > self.idle_seconds:
+                    self._drop_locked(collection)
+
+        while len(self._stores) > 1 and (
+            len(self._stores) > self.max_resident
+            or self._resident_bytes_locked() > self.memory_limit_bytes
+        ):
+            oldest = next(iter(self._stores))
+            if oldest == keep:
+                break
+            self._drop_locked(oldest)
+
+    def _resident_bytes_locked(self) -> int:
+        return sum(store.memory_usage() for store in self._stores.values())
+
+    def _drop_locked(self, collection: str):
+        store = self._stores.pop(collection)
+        self._last_used.pop(collection, None)
+        # Not closed: in-flight requests may still write through their reference.
+        # The snapshot and log file are released with the last reference.
+        self._evicted[collection] = store
+        self.evictions += 1
+        print(f"[OK] Evicted tenant collection: {collection}")
+
+    def is_resident(self, restaurant_id: Optional[str] = None) -> bool:
+        """True if a tenant's chunk store is loaded in memory"""
+        collection = self.collection_for(restaurant_id)
+        with self._lock:
+            return collection in self._stores
+
+    def evict(self, restaurant_id: Optional[str] = None) -> bool:
+        """Drop a tenant's shard and its secondary indexes from memory (data stays on disk)"""
+        collections = [self.collection_for(restaurant_id)]
+        collections += [self.collection_for(restaurant_id, index) for index in TENANT_INDEXES]
+        with self._lock:
+            resident = [c for c in collections if c in self._stores]
+            for collection in resident:
+                self._drop_locked(collection)
+            return bool(resident)
+
+    def list_documents(self, restaurant_id: Optional[str] = None) -> Tuple[List[Dict], int]:
+        """
+        List a tenant's documents, answered by the storage backend when possible
+
+        A shard that is not resident is not loaded if the backend can list
+        it directly (SQL storage); otherwise the shard is loaded as usual.
+        Nothing is created for a tenant without data.
+
+        Returns:
+            Tuple of (documents as in VectorStore.get_all_documents, total chunks)
+        """
+        collection = self.collection_for(restaurant_id)
+        with self._lock:
+            store = self._touch_locked(collection)
+
+        if store is None:
+            if not self.storage.exists(collection):
+                return [], 0
+            # Only SQL storage lists without loading; opening a pickle adapter
+            # would just open its write-ahead log
+            if self.storage.kind == "sql":
+                adapter = self.storage.open(collection)
+                return adapter.list_documents(), adapter.count()
+            store = self.get(restaurant_id, create=False)
+            if store is None:
+                return [], 0
+
+        return store.get_all_documents(), store.count()
+
+    def known_tenants(self) -> List[str]:
+        """List restaurant ids that have stored data"""
+        prefix = f"{self.base_collection}__"
+        tenants = set()
+        for collection in self.storage.collections():
+            # Secondary indexes (<collection>.faq) belong to the same tenant
+            stem = collection.split(".", 1)[0]
+            if stem.startswith(prefix):
+                tenants.add(stem[len(prefix):])
+        return sorted(tenants)
+
+    def get_stats(self) -> Dict:
+        """
+        Get registry statistics
+
+        Returns:
+            Dictionary with resident shards, memory and eviction counters
+        """
+        with self._lock:
+            return {
+                "resident_collections": list(self._stores),
+                "resident_bytes": self._resident_bytes_locked(),
+                "max_resident": self.max_resident,
+                "memory_limit_bytes": int(self.memory_limit_bytes),
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
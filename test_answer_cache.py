@@ -0,0 +1,79 @@
+"""
+Test the question log and precomputed answers for frequent questions
+"""
+
+from answer_cache import AnswerCache, normalize_question
+
+
+class FakeCollection:
+    """Collection version plus a counter of computed answers"""
+
+    def __init__(self):
+        self.version = 1
+        self.computed = []
+
+    def compute(self, restaurant_id, question):
+        self.computed.append(question)
+        return self.version, {"answer": f"{question} (v{self.version})", "results": [], "fast_path": None}
+
+
+def _cache(collection, **kwargs):
+    return AnswerCache(
+        compute=collection.compute,
+        version=lambda restaurant_id: collection.version,
+        enabled=True,
+        auto=False,
+        **kwargs
+    )
+
+
+def test_normalize_question():
+    assert normalize_question("  What are your OPENING hours?? ") == "what are your opening hours"
+    assert normalize_question("Is it vegan?") == normalize_question("is it   vegan")
+    print("[OK] Questions are normalized")
+
+
+def test_warms_top_questions_only():
+    collection = FakeCollection()
+    cache = _cache(collection, top_n=2, min_count=2)
+
+    for question, times in (("Opening hours?", 5), ("Vegan options?", 3), ("Parking?", 2), ("Wifi?", 1)):
+        for _ in range(times):
+            cache.record("bistro", question)
+
+    assert cache.top_questions("bistro", 3) == [("Opening hours?", 5), ("Vegan options?", 3), ("Parking?", 2)]
+    collection.computed.clear()
+    assert cache.warm("bistro") == 2
+    assert sorted(collection.computed) == ["Opening hours?", "Vegan options?"]
+
+    assert cache.lookup("bistro", "opening hours", 1)["answer"] == "Opening hours? (v1)"
+    assert cache.lookup("bistro", "Parking?", 1) is None
+    assert cache.lookup("cafe", "opening hours", 1) is None
+
+    # Fresh answers are not recomputed
+    assert cache.warm("bistro") == 0
+    print("[OK] Only the most asked questions are warmed")
+
+
+def test_write_invalidates_and_rewarms():
+    collection = FakeCollection()
+    cache = _cache(collection, min_count=1)
+    cache.record(None, "Do you deliver?")
+    cache.warm(None)
+
+    # An upload bumps the version: the old answer is never served
+    collection.version = 2
+    assert cache.lookup(None, "Do you deliver?", 2) is None
+    assert cache.warm(None) == 1
+    assert cache.lookup(None, "do you deliver", 2)["answer"] == "Do you deliver? (v2)"
+
+    stats = cache.get_stats()
+    assert stats["warm_answers"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+    print("[OK] Writes invalidate warm answers until they are recomputed")
+
+
+if __name__ == "__main__":
+    test_normalize_question()
+    test_warms_top_questions_only()
+    test_write_invalidates_and_rewarms()
+    print("\n[OK] All answer cache tests passed")
@@ -0,0 +1,72 @@
+"""
+Test MMR diversification and duplicate suppression in retrieval
+"""
+
+import shutil
+import tempfile
+
+import numpy as np
+
+from diversity import dedupe_by_hash, mmr_select
+from vector_store import VectorStore
+
+
+def test_mmr_prefers_novel_candidates():
+    """With diversity, a near-copy of the best match loses to a distinct chunk"""
+    query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    candidates = np.array([
+        [0.9, 0.1, 0.0],     # best match
+        [0.89, 0.11, 0.0],   # near-copy of the best match
+        [0.7, 0.0, 0.7],     # different aspect, still relevant
+    ], dtype=np.float32)
+
+    assert mmr_select(query, candidates, 2, diversity=0.0, dedup_threshold=1.1) == [0, 1]
+    assert mmr_select(query, candidates, 2, diversity=0.5) == [0, 2]
+    print("[OK] MMR picks the distinct chunk over the near-duplicate")
+
+
+def test_dedupe_by_hash_ignores_case_and_whitespace():
+    texts = ["Open daily  from 9am.", "open daily from 9AM.", "Closed on holidays."]
+    assert dedupe_by_hash(texts) == [0, 2]
+    print("[OK] Duplicate chunk texts are dropped")
+
+
+def test_query_similar_diversity_removes_duplicate_uploads():
+    """The same text uploaded twice is returned once when diversity is enabled"""
+    persist_dir = tempfile.mkdtemp()
+    try:
+        store = VectorStore(persist_directory=persist_dir, collection_name="diversity_test")
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=(3, 16)).astype(np.float32)
+        texts = ["Menu: pasta and pizza", "Opening hours: 9 to 5", "Parking behind the building"]
+
+        for document_id in ("content.pdf", "content_2.pdf"):
+            store.add_documents(
+                chunks=[
+                    {"text": t, "chunk_index": i, "document_name": document_id, "document_hash": document_id,
+                     "total_chunks": len(texts), "char_count": len(t)}
+                    for i, t in enumerate(texts)
+                ],
+                embeddings=base.tolist(),
+                document_id=document_id
+            )
+
+        query = base[0] + 0.1 * base[1]
+        plain = store.query_similar(query.tolist(), top_k=3)
+        diverse = store.query_similar(query.tolist(), top_k=3, diversity=0.3)
+
+        assert len({r["text"] for r in plain["results"]}) < 3
+        assert sorted(r["text"] for r in diverse["results"]) == sorted(texts)
+        assert diverse["results"][0]["text"] == texts[0]
+        assert diverse["results"][0]["metadata"]["chunk_index"] == 0
+        assert {r["metadata"]["document_name"] for r in plain["results"]} <= {"content.pdf", "content_2.pdf"}
+        store.close()
+        print("[OK] Diversified query returns each distinct chunk once")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_mmr_prefers_novel_candidates()
+    test_dedupe_by_hash_ignores_case_and_whitespace()
+    test_query_similar_diversity_removes_duplicate_uploads()
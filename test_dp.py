@@ -84,5 +84,63 @@ def test_document_processor():
         traceback.print_exc()
 
 
+def test_qa_extraction():
+    """Q&A documents yield question/answer pairs; prose yields none"""
+    processor = DocumentProcessor()
+    
+    faq = """Restaurant FAQ
+
+1. What are your opening hours?
+
+We are open from 11 AM to 11 PM daily.
+
+Q: Do you have vegan options?
+A: Yes, several dishes are vegan.
+Ask your server for the full list.
+"""
+    pairs = processor.extract_qa_pairs(faq, {"document_name": "faq.docx"})
+    assert [p["question"] for p in pairs] == ["What are your opening hours?", "Do you have vegan options?"]
+    assert pairs[1]["text"] == "Yes, several dishes are vegan. Ask your server for the full list."
+    assert pairs[0]["document_name"] == "faq.docx"
+    
+    prose = "Our chef trained in Naples. Why does it matter?\nBecause the dough is everything."
+    assert processor.extract_qa_pairs(prose) == []
+    print("✓ Q&A pairs extracted")
+
+
+def test_page_and_offset_spans():
+    """Chunks carry the pages they span and their offsets in the cleaned text"""
+    processor = DocumentProcessor(chunk_size=120, chunk_overlap=30)
+    
+    text = (
+        "\n[Page 1]\nWelcome to Trattoria. We serve lunch and dinner every day."
+        "\n[Page 2]\nOur pasta is made fresh each morning. The sauce simmers for hours."
+        " Desserts are baked in house.\n[Page 3]\nBookings are recommended on weekends."
+    )
+    chunks = processor.chunk_text(text)
+    cleaned, _ = processor._clean_pages(text)
+    
+    assert "[Page" not in cleaned
+    for chunk in chunks:
+        assert cleaned[chunk["char_start"]:chunk["char_end"]] == chunk["text"]
+    assert chunks[0]["page_start"] == 1
+    assert chunks[-1]["page_end"] == 3
+    assert all(c["page_start"] <= c["page_end"] for c in chunks)
+    
+    # DOCX text has no markers, so no page fields
+    assert "page_start" not in processor.chunk_text("No pages here. Just text.")[0]
+    
+    # An overlap close to the chunk size can repeat a whole chunk; offsets stay exact
+    overlapping = DocumentProcessor(chunk_size=40, chunk_overlap=30).chunk_text(text)
+    assert len(overlapping) > 3
+    for chunk in overlapping:
+        assert chunk["char_start"] >= 0
+        assert cleaned[chunk["char_start"]:chunk["char_end"]] == chunk["text"]
+    assert overlapping[-1]["page_end"] == 3
+    print("✓ Chunks carry page and offset spans")
+
+
 if __name__ == "__main__":
-    test_document_processor()
\ No newline at end of file
+    test_document_processor()
+    test_qa_extraction()
+    test_page_and_offset_spans()
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Test the embedding pool with spawned workers loading the configured model
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_pool import EmbeddingPool
+from embedding_service import EmbeddingService
+
+
+MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+
+def test_outputs_keep_batch_order_across_workers():
+    from sentence_transformers import SentenceTransformer
+
+    pool = EmbeddingPool(MODEL, workers=2, reserved_cores=0, nice=0, timeout=120)
+    try:
+        # Uneven batches finish out of order on two workers
+        batches = [[f"course {b} item {i}" for i in range(size)] for b, size in enumerate([9, 1, 6, 2, 5, 1])]
+        queued = []
+
+        def between_batches():
+            queued.append(pool._tasks.qsize())
+
+        outputs = pool.encode_batches(batches, between_batches=between_batches)
+
+        # Submitted one batch at a time, never more than one per worker in flight
+        assert len(queued) == 6 and max(queued) < pool.workers
+
+        model = SentenceTransformer(MODEL, device="cpu")
+        for texts, embeddings in zip(batches, outputs):
+            assert embeddings.dtype == np.float32
+            assert np.allclose(embeddings, model.encode(texts, convert_to_numpy=True), atol=1e-5)
+        assert pool.get_stats()["batches_done"] == 6
+        print("[OK] Pool outputs come back in batch order, submitted as workers free up")
+    finally:
+        pool.close()
+
+
+class StubModel:
+    """In-process encoder standing in for the web process model"""
+
+    max_seq_length = 64
+    tokenizer = None
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, convert_to_numpy=True):
+        return np.array([[float(t.split()[0]), 1.0] for t in texts], dtype=np.float32)
+
+
+def _service_with_pool(pool: EmbeddingPool) -> EmbeddingService:
+    # Skip __init__ so only the pool loads a model
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model_name = pool.model_name
+    service.model = StubModel()
+    service.cache_size = 0
+    service._cache = OrderedDict()
+    service._cache_lock = threading.Lock()
+    service._token_budget = 64
+    service.pool = pool
+    service.pool_min_texts = 1
+    service.embedding_dimension = 2
+    return service
+
+
+def test_falls_back_in_process_when_workers_fail_or_time_out():
+    texts = [f"{i} dish" for i in range(10)]
+    for pool in (
+        EmbeddingPool("/nonexistent/embedding-model", workers=1, reserved_cores=0, nice=0, timeout=120),
+        EmbeddingPool(MODEL, workers=1, reserved_cores=0, nice=0, timeout=0.05),
+    ):
+        try:
+            embeddings = _service_with_pool(pool).generate_embeddings_batch(texts, show_progress=False)
+            assert embeddings[:, 0].tolist() == list(range(10))
+            # The failed workers were shut down, not left behind
+            assert not pool.running and not pool._processes
+        finally:
+            pool.close()
+    print("[OK] Failed or slow workers fall back to in-process encoding")
+
+
+if __name__ == "__main__":
+    test_outputs_keep_batch_order_across_workers()
+    test_falls_back_in_process_when_workers_fail_or_time_out()
+    print("\n[OK] All embedding pool tests passed")
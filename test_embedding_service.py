@@ -0,0 +1,90 @@
+"""
+Test length-bucketed batch embedding with a stub model
+"""
+
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_service import EmbeddingService
+
+
+class StubModel:
+    """Encoder whose first column is the number a text starts with"""
+
+    max_seq_length = 64
+    tokenizer = None
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        return np.array([[float(t.split()[0]), float(len(t))] for t in texts], dtype=np.float32)
+
+
+def _service(token_budget: int) -> EmbeddingService:
+    # Skip __init__ so no sentence-transformers model is loaded
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model_name = "stub"
+    service.model = StubModel()
+    service.cache_size = 0
+    service._cache = OrderedDict()
+    service._cache_lock = threading.Lock()
+    service._token_budget = token_budget
+    service.pool = None
+    service.pool_min_texts = 64
+    service.embedding_dimension = 2
+    return service
+
+
+def test_rows_come_back_in_input_order():
+    service = _service(token_budget=64)
+    rng = random.Random(7)
+    texts = [f"{i} " + "word " * rng.randint(0, 60) for i in range(50)]
+
+    embeddings = service.generate_embeddings_batch(texts, show_progress=False)
+
+    assert embeddings.dtype == np.float32 and embeddings.shape == (50, 2)
+    assert embeddings[:, 0].tolist() == list(range(50))
+    assert embeddings[:, 1].tolist() == [len(t) for t in texts]
+    # Bucketing really reordered the texts
+    encoded = [int(t.split()[0]) for batch in service.model.batches for t in batch]
+    assert sorted(encoded) == list(range(50)) and encoded != list(range(50))
+    print("[OK] Bucketed embeddings are scattered back to input order")
+
+
+def test_batches_respect_token_budget_and_max_batch():
+    service = _service(token_budget=64)
+    rng = random.Random(11)
+    lengths = [rng.randint(1, 64) for _ in range(200)]
+
+    batches = service._length_buckets(lengths, max_batch=8)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(200))
+    for batch in batches:
+        assert len(batch) <= 8
+        assert len(batch) * max(lengths[i] for i in batch) <= 64
+    # Short texts share batches, long ones are encoded alone
+    assert max(len(batch) for batch in batches) == 8
+    assert [i for batch in batches if len(batch) == 1 for i in batch]
+    print("[OK] Batches stay under the token budget and max_batch")
+
+
+def test_max_batch_caps_encode_calls():
+    service = _service(token_budget=10000)
+    texts = [f"{i} menu" for i in range(20)]
+
+    service.generate_embeddings_batch(texts, batch_size=6, show_progress=False)
+
+    assert [len(batch) for batch in service.model.batches] == [6, 6, 6, 2]
+    print("[OK] batch_size caps texts per encode call")
+
+
+if __name__ == "__main__":
+    test_rows_come_back_in_input_order()
+    test_batches_respect_token_budget_and_max_batch()
+    test_max_batch_caps_encode_calls()
+    print("\n[OK] All embedding service tests passed")
@@ -0,0 +1,102 @@
+"""
+Test LLM routing: failover, cooldown, latency ordering, probes and streaming
+"""
+
+import time
+
+from llm_client import LLMClient, LLMRouter
+
+
+class FakeBackend(LLMClient):
+    """Backend answering with its own name after a fixed delay"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False, token_delay: float = 0.0):
+        self.name = name
+        self.model = f"{name}-model"
+        self.delay = delay
+        self.fail = fail
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def chat_with_history(self, messages, temperature=0.7, max_tokens=500):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return {"response": self.name, "tokens_used": 1, "model": self.model}
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=500):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        yield self.name
+        time.sleep(self.token_delay)
+        yield " done"
+
+
+def _ask(router: LLMRouter) -> str:
+    return router.chat_with_history([{"role": "user", "content": "Opening hours?"}])["response"]
+
+
+def test_failover_and_cooldown():
+    primary, secondary = FakeBackend("groq", fail=True), FakeBackend("local")
+    router = LLMRouter([primary, secondary], policy="failover", cooldown_seconds=0.1)
+
+    assert _ask(router) == "local"
+    assert primary.calls == 1
+
+    # Cooling down: the failed backend is not tried at all
+    assert _ask(router) == "local"
+    assert primary.calls == 1
+    assert [b["healthy"] for b in router.get_stats()["backends"]] == [False, True]
+
+    # After the cooldown it is tried first again
+    primary.fail = False
+    time.sleep(0.12)
+    assert _ask(router) == "groq"
+    assert primary.calls == 2
+
+    # Everything down: the last error is raised
+    primary.fail = secondary.fail = True
+    try:
+        _ask(router)
+        assert False, "expected the backend error"
+    except ConnectionError:
+        pass
+    print("[OK] Failed backends are skipped for the cooldown")
+
+
+def test_latency_ordering_and_probes():
+    slow, fast = FakeBackend("slow", delay=0.03), FakeBackend("fast")
+    router = LLMRouter([slow, fast], policy="latency", probe_every=3)
+
+    # Unmeasured backends go first, then the fastest; every 3rd call probes
+    # the least recently used one
+    used = [_ask(router) for _ in range(6)]
+    assert used == ["slow", "fast", "slow", "fast", "fast", "slow"]
+
+    latency = {b["name"]: b["latency_ms"] for b in router.get_stats()["backends"]}
+    assert latency["slow"] > latency["fast"]
+    print("[OK] Latency routing prefers the fastest backend and probes the others")
+
+
+def test_stream_fails_over_and_times_first_token():
+    broken = FakeBackend("groq", fail=True)
+    streaming = FakeBackend("local", token_delay=0.05)
+    router = LLMRouter([broken, streaming], policy="failover")
+
+    tokens = list(router.stream_chat([{"role": "user", "content": "Menu?"}]))
+    assert tokens == ["local", " done"]
+
+    # Latency is time to first token, not the whole stream
+    latency_ms = router.get_stats()["backends"][1]["latency_ms"]
+    assert latency_ms < 50
+    print("[OK] Streams fail over before the first token and record time to first token")
+
+
+if __name__ == "__main__":
+    test_failover_and_cooldown()
+    test_latency_ordering_and_probes()
+    test_stream_fails_over_and_times_first_token()
+    print("\n[OK] All LLM client tests passed")
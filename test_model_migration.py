@@ -0,0 +1,116 @@
+"""
+Test embedding model versioning and shadow re-embedding migrations
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from model_migration import SHADOW_SUFFIX, MigrationManager
+from tenant_store import TenantStoreRegistry
+
+
+class FakeEmbedder:
+    """Deterministic embeddings of a fixed dimension, counting the texts it saw"""
+
+    def __init__(self, model_name, dimension, on_batch=None):
+        self.model_name = model_name
+        self.embedding_dimension = dimension
+        self.on_batch = on_batch
+        self.texts = []
+
+    def generate_embedding(self, text):
+        return self.generate_embeddings_batch([text])[0]
+
+    def generate_embeddings_batch(self, texts, show_progress=False, between_batches=None):
+        if self.on_batch is not None:
+            self.on_batch()
+        self.texts.extend(texts)
+        rng = [np.random.default_rng(abs(hash(text)) % (2 ** 32)) for text in texts]
+        return np.array([r.random(self.embedding_dimension) for r in rng], dtype=np.float32)
+
+
+def _chunks(name, texts, **extra):
+    return [
+        dict({"text": text, "document_name": name, "document_hash": name, "chunk_index": i}, **extra)
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_add_records_model_and_rejects_mismatch():
+    tmp = tempfile.mkdtemp()
+    try:
+        store = TenantStoreRegistry(persist_directory=tmp).get(None)
+        old = FakeEmbedder("old-model", 3)
+        store.add_documents(_chunks("a", ["pasta"]), old.generate_embeddings_batch(["pasta"]), "doc_a", model="old-model")
+        assert store.embedding_model == "old-model" and store.dimension == 3
+
+        try:
+            store.add_documents(_chunks("b", ["pizza"]), old.generate_embeddings_batch(["pizza"]), "doc_b", model="new-model")
+            raise AssertionError("adding vectors from another model should fail")
+        except ValueError as e:
+            assert "model mismatch" in str(e)
+
+        # The model survives a restart (snapshot + log replay)
+        store.compact()
+        reloaded = TenantStoreRegistry(persist_directory=tmp).get(None)
+        assert reloaded.embedding_model == "old-model"
+        print("[OK] Collection records its embedding model and dimension")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_migration_switches_to_new_model_and_catches_up():
+    """Re-embedding uses stored text, includes writes made meanwhile and swaps atomically"""
+    tmp = tempfile.mkdtemp()
+    try:
+        registry = TenantStoreRegistry(persist_directory=tmp)
+        old = FakeEmbedder("old-model", 3)
+        live = registry.get(None)
+        texts = ["Open daily from 9am.", "Pasta is made fresh."]
+        live.add_documents(_chunks("menu", texts), old.generate_embeddings_batch(texts), "doc_menu", model="old-model")
+        live.add_documents(_chunks("old", ["Closed on Mondays."]), old.generate_embeddings_batch(["x"]), "doc_old", model="old-model")
+
+        faq = registry.get(None, index="faq")
+        faq.add_documents(
+            _chunks("menu", ["Yes, all sauces are vegan."], question="Are your sauces vegan?"),
+            old.generate_embeddings_batch(["Are your sauces vegan?"]),
+            "doc_menu",
+            model="old-model"
+        )
+
+        def upload_during_migration():
+            # An upload and a delete land on the live collection mid-migration
+            if new.on_batch is None:
+                return
+            new.on_batch = None
+            live.add_documents(_chunks("late", ["Happy hour at 5pm."]), old.generate_embeddings_batch(["y"]), "doc_late", model="old-model")
+            live.delete_document("doc_old")
+
+        new = FakeEmbedder("new-model", 5)
+        new.on_batch = upload_during_migration
+        manager = MigrationManager(registry, lambda name: {"old-model": old, "new-model": new}[name], "new-model")
+
+        assert manager.needs_migration(live)
+        queued = manager.ensure(None)
+        assert {m.collection for m in queued} == {"restaurant_docs", "restaurant_docs.faq"}
+        manager.wait()
+
+        assert live.embedding_model == "new-model" and live.dimension == 5
+        assert sorted(d["document_id"] for d in live.get_all_documents()) == ["doc_late", "doc_menu"]
+        assert live.snapshot()["ids"][:2] == ["doc_menu_chunk_0", "doc_menu_chunk_1"]
+        assert faq.embedding_model == "new-model"
+        assert "Are your sauces vegan?" in new.texts, "FAQ entries re-embed their question"
+        assert not any(SHADOW_SUFFIX in name for name in os.listdir(tmp) if not name.endswith(".lock"))
+        assert all(m["status"] == "switched" for m in manager.get_stats()["migrations"])
+        print("[OK] Migration re-embeds into a shadow index and switches atomically")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    test_add_records_model_and_rejects_mismatch()
+    test_migration_switches_to_new_model_and_catches_up()
+    print("\n[OK] All model migration tests passed")
@@ -0,0 +1,155 @@
+"""
+Test quantized first-pass search: rescoring, recall measurement and tuning
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from quantization import QuantizedIndex, evaluate_recall, exact_top_k, rescored_top_k, tune_rescore_factor
+from vector_store import VectorStore
+
+
+DIMENSION = 16
+
+
+def _clustered(n: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    """Embeddings grouped around a few topics, like chunks of a handful of menus"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, dim))
+    return (centers[rng.integers(0, 8, n)] + rng.normal(0, 0.4, (n, dim))).astype(np.float32)
+
+
+def _add(store: VectorStore, document_id: str, n_chunks: int, rng: np.random.Generator):
+    chunks = [{"text": f"{document_id} chunk {i}", "document_hash": document_id} for i in range(n_chunks)]
+    store.add_documents(chunks, rng.normal(size=(n_chunks, DIMENSION)).astype(np.float32), document_id)
+
+
+def test_rescored_top_k_matches_exact_search():
+    embeddings = _clustered(400)
+    queries = _clustered(10, seed=1)
+    index = QuantizedIndex(embeddings, "int8")
+    truth = exact_top_k(queries, embeddings, 5)
+
+    for query, expected in zip(queries, truth):
+        # Rescoring every row is exact search
+        assert rescored_top_k(index, embeddings, query, 5, rescore_factor=80).tolist() == expected.tolist()
+        assert len(set(rescored_top_k(index, embeddings, query, 5, rescore_factor=4)) & set(expected)) >= 4
+    print("[OK] Rescored top-k matches exact search")
+
+
+def test_recall_grows_with_the_rescore_factor_and_tuning_meets_the_floor():
+    embeddings = _clustered(500)
+    index = QuantizedIndex(embeddings, "binary")
+
+    shallow = evaluate_recall(index, embeddings, k=5, rescore_factor=1)
+    deep = evaluate_recall(index, embeddings, k=5, rescore_factor=32)
+    assert shallow < deep <= 1.0
+    assert evaluate_recall(index, embeddings, k=5, rescore_factor=100) == 1.0
+
+    report = tune_rescore_factor(index, embeddings, recall_floor=0.95, start_factor=1, n_queries=20)
+    assert report["recall_at_k"] >= 0.95 and report["rows"] == 500
+    # The smallest power of two from the start factor that meets the floor
+    if report["rescore_factor"] > 1:
+        below = evaluate_recall(index, embeddings, k=5, rescore_factor=report["rescore_factor"] // 2, n_queries=20)
+        assert below < 0.95
+    print("[OK] Tuning picks the smallest rescore factor meeting the recall floor")
+
+
+def test_binary_codes_are_packed_sign_bits():
+    embeddings = _clustered(100, dim=20)
+    index = QuantizedIndex(embeddings, "binary")
+
+    assert index.codes.dtype == np.uint8 and index.codes.shape == (100, 3)
+    assert index.nbytes < embeddings.nbytes / 8
+    assert np.array_equal(np.unpackbits(index.codes, axis=1)[:, :20], embeddings > index.mean)
+
+    # Negated Hamming distance: a stored vector is its own best match
+    scores = index.approximate_scores(embeddings[7])
+    assert scores[7] == 0 and scores.max() == 0
+    assert 7 in index.candidates(embeddings[7], 1)
+    print("[OK] Binary index packs one sign bit per dimension")
+
+
+def test_extend_and_take_match_a_full_build():
+    embeddings = _clustered(90)
+    for mode in ("int8", "binary"):
+        full = QuantizedIndex(embeddings, mode)
+        # Binary codes depend on the mean, so grow from a subset of the full index
+        grown = full.take(np.arange(60)).extend(embeddings[60:])
+        assert np.array_equal(grown.codes, full.codes)
+        assert np.array_equal(grown.norms, full.norms)
+
+        kept = np.array([0, 5, 42, 89])
+        assert np.array_equal(full.take(kept).approximate_scores(embeddings[3]), full.approximate_scores(embeddings[3])[kept])
+
+    int8 = QuantizedIndex(embeddings[:60], "int8").extend(embeddings[60:])
+    assert np.array_equal(int8.codes, QuantizedIndex(embeddings, "int8").codes)
+    print("[OK] Extended and subset indexes match a full build")
+
+
+def test_writes_update_the_index_without_rewriting_the_float_file():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(3)
+        store = VectorStore(persist_directory=temp_dir, collection_name="delta", shared=False, quantization="int8")
+        _add(store, "menu", 40, rng)
+        written = os.stat(store.embeddings_file)
+
+        _add(store, "wine", 5, rng)
+        store.delete_document("menu")
+        _add(store, "desserts", 3, rng)
+
+        # Only the touched rows were quantized; the float file is untouched until compaction
+        data = store.snapshot()
+        assert os.stat(store.embeddings_file).st_mtime_ns == written.st_mtime_ns
+        assert len(data["quantized"].codes) == store.count() == 8
+        assert np.array_equal(data["quantized"].codes, QuantizedIndex(data["embeddings"], "int8").codes)
+        assert np.allclose(data["inv_norms"], 1 / np.linalg.norm(data["embeddings"], axis=1))
+
+        query = data["embeddings"][6]
+        assert store.query_similar(query, top_k=1)["results"][0]["id"] == data["ids"][6]
+
+        resident = store.memory_usage()
+        store.compact()
+        rebuilt = store.snapshot()
+        assert os.stat(store.embeddings_file).st_ino != written.st_ino
+        assert np.array_equal(np.load(store.embeddings_file), data["embeddings"])
+        assert store.memory_usage() == resident - data["embeddings"].nbytes
+        assert np.array_equal(rebuilt["quantized"].codes, data["quantized"].codes)
+        print("[OK] Writes quantize only their rows; compaction writes the float file")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_rescore_factor_is_retuned_as_the_collection_grows():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(0)
+        store = VectorStore(persist_directory=temp_dir, collection_name="tuned", shared=False, quantization="int8")
+        _add(store, "menu", 10, rng)
+        assert store.get_stats()["tuned_at_rows"] == 10
+
+        # Not yet twice as large: the measurement stands
+        _add(store, "wine", 9, rng)
+        assert store.get_stats()["tuned_at_rows"] == 10
+
+        _add(store, "desserts", 1, rng)
+        stats = store.get_stats()
+        assert stats["tuned_at_rows"] == 20
+        assert stats["recall_at_k"] >= store.recall_floor or stats["rescore_factor"] == 64
+        print("[OK] Rescore factor is re-measured once the collection doubles")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_rescored_top_k_matches_exact_search()
+    test_recall_grows_with_the_rescore_factor_and_tuning_meets_the_floor()
+    test_binary_codes_are_packed_sign_bits()
+    test_extend_and_take_match_a_full_build()
+    test_writes_update_the_index_without_rewriting_the_float_file()
+    test_rescore_factor_is_retuned_as_the_collection_grows()
+    print("\n[OK] All quantization tests passed")
@@ -0,0 +1,90 @@
+"""
+Test the reranker: budget fallback, score cache and top_k trimming
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from reranker import Reranker
+
+
+class StubModel:
+    """Cross-encoder scoring a pair by the length of its text"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.pairs_scored = 0
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(self.delay)
+        self.pairs_scored += len(pairs)
+        return [float(len(text)) for _, text in pairs]
+
+
+def _reranker(model: StubModel, budget_ms: float = 1000, cache_size: int = 16) -> Reranker:
+    # Skip __init__ so no cross-encoder is loaded
+    reranker = Reranker.__new__(Reranker)
+    reranker.model_name = "stub"
+    reranker.budget = budget_ms / 1000.0
+    reranker.cache_size = cache_size
+    reranker.batch_window = 0.001
+    reranker.max_batch = 64
+    reranker._cache = OrderedDict()
+    reranker._cache_lock = threading.Lock()
+    reranker._worker_lock = threading.Lock()
+    reranker._worker_pid = None
+    reranker.model = model
+    return reranker
+
+
+def _results(*texts: str) -> dict:
+    return {"results": [{"text": text} for text in texts], "count": len(texts)}
+
+
+def test_rerank_orders_by_score_and_trims_to_top_k():
+    reranker = _reranker(StubModel())
+    reranked = reranker.rerank("hours?", _results("a", "ccc", "bb", "dddd"), top_k=2)
+
+    assert reranked["count"] == 2
+    assert [r["text"] for r in reranked["results"]] == ["dddd", "ccc"]
+    assert [r["rerank_score"] for r in reranked["results"]] == [4.0, 3.0]
+    print("[OK] Reranking orders by score and keeps top_k")
+
+
+def test_budget_timeout_keeps_vector_order():
+    reranker = _reranker(StubModel(delay=0.2), budget_ms=20)
+    reranked = reranker.rerank("hours?", _results("a", "ccc", "bb"), top_k=2)
+
+    assert [r["text"] for r in reranked["results"]] == ["a", "ccc"]
+    assert all("rerank_score" not in r for r in reranked["results"])
+
+    # The late scores still land in the cache for the next request
+    time.sleep(0.3)
+    assert len(reranker._cache) == 3
+    print("[OK] Budget timeouts keep the vector store order")
+
+
+def test_repeated_pairs_hit_the_cache():
+    model = StubModel()
+    reranker = _reranker(model, cache_size=3)
+
+    reranker.rerank("hours?", _results("a", "bb", "ccc"), top_k=3)
+    assert model.pairs_scored == 3
+    reranker.rerank("hours?", _results("ccc", "a", "bb"), top_k=3)
+    assert model.pairs_scored == 3
+
+    # A new pair evicts the least recently used one
+    reranker.rerank("hours?", _results("a", "dddd"), top_k=2)
+    assert model.pairs_scored == 4
+    assert len(reranker._cache) == 3
+    reranker.rerank("hours?", _results("ccc", "bb"), top_k=2)
+    assert model.pairs_scored == 5
+    print("[OK] Scored pairs are served from the LRU cache")
+
+
+if __name__ == "__main__":
+    test_rerank_orders_by_score_and_trims_to_top_k()
+    test_budget_timeout_keeps_vector_order()
+    test_repeated_pairs_hit_the_cache()
+    print("\n[OK] All reranker tests passed")
@@ -0,0 +1,86 @@
+"""
+Test admission control and query priority in the workload scheduler
+"""
+
+import threading
+import time
+
+from scheduler import BATCH, INTERACTIVE, Overloaded, WorkloadScheduler
+
+
+def test_sheds_queries_beyond_limit_and_queue():
+    """A full queue is rejected immediately with a Retry-After estimate"""
+    scheduler = WorkloadScheduler(max_interactive=1, max_interactive_queued=0)
+
+    with scheduler.admit(INTERACTIVE):
+        try:
+            with scheduler.admit(INTERACTIVE):
+                raise AssertionError("second query should have been shed")
+        except Overloaded as e:
+            assert e.workload == INTERACTIVE
+            assert e.retry_after >= 1
+
+    stats = scheduler.get_stats()[INTERACTIVE]
+    assert stats["admitted"] == 1 and stats["rejected"] == 1 and stats["active"] == 0
+    print("[OK] Excess queries are shed with Retry-After")
+
+
+def test_queued_query_runs_when_slot_frees():
+    scheduler = WorkloadScheduler(max_interactive=1, interactive_queue_timeout=2.0)
+    order = []
+    holding = threading.Event()
+
+    def first():
+        with scheduler.admit(INTERACTIVE):
+            holding.set()
+            time.sleep(0.1)
+            order.append("first")
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    holding.wait()
+    with scheduler.admit(INTERACTIVE):
+        order.append("second")
+    thread.join()
+
+    assert order == ["first", "second"]
+    print("[OK] Queued query waits for a free slot")
+
+
+def test_ingestion_yields_to_queries():
+    """No new ingest starts while queries wait, and running ingest pauses for them"""
+    scheduler = WorkloadScheduler(
+        max_interactive=1, max_ingest=1, ingest_queue_timeout=0.05, max_batch_pause=0.05
+    )
+
+    with scheduler.admit(INTERACTIVE):
+        # Ingestion between batches waits (bounded) while a query is in flight
+        start = time.perf_counter()
+        scheduler.yield_to_interactive()
+        assert time.perf_counter() - start >= 0.04
+
+        # A query is queued behind the running one: ingestion may not start
+        def queued_query():
+            with scheduler.admit(INTERACTIVE):
+                pass
+
+        waiter = threading.Thread(target=queued_query)
+        waiter.start()
+        while scheduler.get_stats()[INTERACTIVE]["queued"] == 0:
+            time.sleep(0.001)
+        try:
+            with scheduler.admit(BATCH):
+                raise AssertionError("ingest should not start while queries are queued")
+        except Overloaded as e:
+            assert e.workload == BATCH
+
+    waiter.join()
+    assert scheduler.get_stats()["batch_pauses"] == 1
+    print("[OK] Ingestion yields to interactive queries")
+
+
+if __name__ == "__main__":
+    test_sheds_queries_beyond_limit_and_queue()
+    test_queued_query_runs_when_slot_frees()
+    test_ingestion_yields_to_queries()
+    print("\n[OK] All scheduler tests passed")
@@ -0,0 +1,99 @@
+"""
+Test conversation sessions: rewriting, rolling summary and eviction
+"""
+
+import threading
+import time
+
+from session_store import SessionStore
+
+
+def test_follow_up_questions_are_rewritten():
+    store = SessionStore()
+    session = store.get("table-1")
+
+    assert store.rewrite_query(session, "Do you have lasagna?") == "Do you have lasagna?"
+    store.record(session, "Do you have lasagna?", "Yes, with beef ragu.")
+
+    rewritten = store.rewrite_query(session, "and is it spicy?")
+    assert rewritten == "Do you have lasagna? and is it spicy?"
+    store.record(session, "and is it spicy?", "No.")
+
+    # A chain of follow-ups stays anchored on the standalone question
+    assert store.rewrite_query(session, "how much is it?") == "Do you have lasagna? how much is it?"
+    print("[OK] Follow-ups are anchored on the last standalone question")
+
+
+def test_short_standalone_questions_change_topic():
+    store = SessionStore()
+    session = store.get("table-3")
+    store.record(session, "Do you have lasagna?", "Yes.")
+
+    # Short is not the same as a follow-up
+    for question in ("Do you have tiramisu?", "What wine pairs with steak?"):
+        assert store.rewrite_query(session, question) == question
+        store.record(session, question, "Yes.")
+    assert store.rewrite_query(session, "is it dry?") == "What wine pairs with steak? is it dry?"
+    print("[OK] Short standalone questions start a new topic")
+
+
+def test_compression_keeps_every_turn():
+    """Overflow queued while a summary is running is folded onto that summary"""
+    release = threading.Event()
+
+    def summarizer(summary, turns):
+        release.wait(1)
+        return ",".join(([summary] if summary else []) + [t["content"] for t in turns])
+
+    store = SessionStore(max_turns=2, summarizer=summarizer, summary_max_chars=1000)
+    session = store.get("table-4")
+    for i in range(4):
+        store.record(session, f"q{i}", f"a{i}")
+    release.set()
+    store._executor.shutdown(wait=True)
+
+    summary, turns = store.history(session)
+    assert summary == "q0,a0,q1,a1,q2,a2"
+    assert [t["content"] for t in turns] == ["q3", "a3"]
+    print("[OK] Concurrent overflow does not lose turns")
+
+
+def test_history_is_bounded_by_rolling_summary():
+    calls = []
+
+    def summarizer(summary, turns):
+        calls.append(len(turns))
+        return (summary + " | " if summary else "") + f"{len(turns)} turns"
+
+    store = SessionStore(max_turns=4, summarizer=summarizer)
+    session = store.get("table-2")
+    for i in range(5):
+        store.record(session, f"question {i}", f"answer {i}")
+    store._executor.shutdown(wait=True)
+
+    summary, turns = store.history(session)
+    assert len(turns) == 4
+    assert turns[0] == {"role": "user", "content": "question 3"}
+    assert sum(calls) == 6 and summary.endswith("turns")
+    print("[OK] Old turns are folded into the summary")
+
+
+def test_ttl_expiry_and_lru_eviction():
+    store = SessionStore(max_sessions=2, ttl_seconds=0.05)
+    store.get("a")
+    store.get("b")
+    store.get("c")
+    assert store.get_stats()["evicted"] == 1
+
+    time.sleep(0.06)
+    stats = store.get_stats()
+    assert stats["active_sessions"] == 0 and stats["expired"] == 2
+    print("[OK] Sessions expire and are evicted LRU")
+
+
+if __name__ == "__main__":
+    test_follow_up_questions_are_rewritten()
+    test_short_standalone_questions_change_topic()
+    test_compression_keeps_every_turn()
+    test_history_is_bounded_by_rolling_summary()
+    test_ttl_expiry_and_lru_eviction()
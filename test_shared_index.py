@@ -0,0 +1,74 @@
+"""
+Test shared mode writes: two stores on one shared index stand in for two workers
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from vector_store import VectorStore
+
+
+def _add(store: VectorStore, document_id: str, n_chunks: int = 3):
+    chunks = [{"text": f"{document_id} chunk {i}", "document_hash": document_id} for i in range(n_chunks)]
+    store.add_documents(chunks, np.random.rand(n_chunks, 8).astype(np.float32), document_id)
+
+
+def test_writes_reload_only_after_another_worker_wrote():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        workers = [VectorStore(persist_directory=temp_dir, collection_name="shared", shared=True) for _ in range(2)]
+        reloads = [0, 0]
+        for n, store in enumerate(workers):
+            def counting_read(read=store._read_persisted, n=n):
+                reloads[n] += 1
+                return read()
+            store._read_persisted = counting_read
+
+        first, second = workers
+        _add(first, "menu")
+        _add(first, "wine")
+        _add(second, "desserts")
+        first.delete_document("wine")
+
+        # Consecutive writes by one worker build on its attached generation
+        assert reloads == [1, 1]
+        assert first.count() == second.count() == 6
+        assert first.version == second.version == 4
+
+        reloaded = VectorStore(persist_directory=temp_dir, collection_name="shared", shared=False)
+        assert sorted({m["document_hash"] for m in reloaded.snapshot()["metadatas"]}) == ["desserts", "menu"]
+        assert second.query_similar(np.random.rand(8), top_k=2)["count"] == 2
+        print("[OK] Shared writes reload only after another worker wrote")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_republishing_keeps_the_live_generation():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        worker = VectorStore(persist_directory=temp_dir, collection_name="shared", shared=True)
+        _add(worker, "menu")
+        live_file = os.path.join(worker.shared_index.root, f"gen-{worker.version}", "embeddings.npy")
+        inode = os.stat(live_file).st_ino
+
+        # A compaction touches the snapshot, so the next worker sees stale storage
+        # with the same sequence number and republishes it
+        worker.compact()
+        assert worker.storage.modified_since(worker.shared_index.last_published_ns(), worker.version)
+        late = VectorStore(persist_directory=temp_dir, collection_name="shared", shared=True)
+
+        assert os.stat(live_file).st_ino == inode
+        assert late.version == worker.version and late.count() == 3
+        assert not worker.storage.modified_since(worker.shared_index.last_published_ns(), worker.version)
+        print("[OK] Republishing a generation does not rewrite its files")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_writes_reload_only_after_another_worker_wrote()
+    test_republishing_keeps_the_live_generation()
+    print("\n[OK] All shared index tests passed")
@@ -0,0 +1,52 @@
+"""
+Test the similarity kernels against a straightforward reference
+"""
+
+import numpy as np
+
+from similarity import cosine, cosine_one_to_many, cosine_pairwise, inverse_norms, normalize_rows, top_k
+
+
+def _reference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    return (a @ b.T) / np.outer(np.linalg.norm(a, axis=1), np.linalg.norm(b, axis=1))
+
+
+def test_kernels_match_reference():
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((50, 16)).astype(np.float32)
+    query = rng.standard_normal(16).astype(np.float32)
+    expected = _reference(query[None], matrix)[0]
+
+    assert np.allclose(cosine_one_to_many(query, matrix), expected, atol=1e-5)
+    assert np.allclose(cosine_one_to_many(query, matrix, inverse_norms(matrix)), expected, atol=1e-5)
+    rows = np.array([3, 7, 40])
+    assert np.allclose(cosine_one_to_many(query, matrix, inverse_norms(matrix), rows), expected[rows], atol=1e-5)
+    assert np.allclose(cosine_one_to_many(query, matrix, rows=rows), expected[rows], atol=1e-5)
+
+    assert np.allclose(cosine_pairwise(matrix[:5], matrix), _reference(matrix[:5], matrix), atol=1e-5)
+    assert np.allclose(np.diag(cosine_pairwise(matrix)), 1.0, atol=1e-5)
+    assert abs(cosine(matrix[0], matrix[1]) - _reference(matrix[:1], matrix[1:2])[0, 0]) < 1e-5
+    assert cosine_one_to_many(query, matrix).dtype == np.float32
+
+    # Zero vectors score 0 instead of NaN
+    with_zero = np.vstack([matrix[:2], np.zeros((1, 16), dtype=np.float32)])
+    assert cosine_one_to_many(query, with_zero)[2] == 0.0
+    assert not normalize_rows(with_zero)[2].any()
+    print("[OK] Kernels match the reference cosine similarity")
+
+
+def test_top_k():
+    scores = np.array([0.1, 0.9, 0.5, 0.9, 0.3], dtype=np.float32)
+    assert top_k(scores, 3).tolist() == [1, 3, 2]
+    assert top_k(scores, 10).tolist() == [1, 3, 2, 4, 0]
+    assert top_k(scores, 0).tolist() == []
+    assert top_k(np.zeros(0, dtype=np.float32), 5).tolist() == []
+    print("[OK] Top-k is ordered best first with ties by position")
+
+
+if __name__ == "__main__":
+    test_kernels_match_reference()
+    test_top_k()
+    print("\n[OK] All similarity tests passed")
@@ -0,0 +1,164 @@
+"""
+Test the SQL storage adapter (SQLite stand-in for PostgreSQL/pgvector)
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from import_storage import import_collection, read_chroma, read_pickle
+from storage import SQLBackend
+from tenant_store import TenantStoreRegistry
+from vector_store import VectorStore
+
+
+DIMENSION = 8
+
+
+def _add(store: VectorStore, document_id: str, n_chunks: int = 3, model: str = "test-model"):
+    chunks = [
+        {"text": f"{document_id} chunk {i}\twith\nescapes \\", "document_hash": document_id, "chunk_index": i}
+        for i in range(n_chunks)
+    ]
+    store.add_documents(chunks, np.random.rand(n_chunks, DIMENSION).astype(np.float32), document_id, model=model)
+
+
+def test_sql_round_trip():
+    """Adds, deletes and replaces are persisted per transaction and reload identically"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        backend = SQLBackend(f"sqlite:///{os.path.join(temp_dir, 'rag.sqlite3')}")
+        store = VectorStore(persist_directory=temp_dir, collection_name="sql_test", storage=backend)
+        _add(store, "doc_a")
+        _add(store, "doc_b", n_chunks=2)
+        _add(store, "doc_c")
+        store.delete_document("doc_b")
+
+        # No pickle snapshot or log: the tables are the only copy
+        assert store.storage_file is None and not os.path.exists(os.path.join(temp_dir, "sql_test.pkl"))
+
+        reloaded = VectorStore(persist_directory=temp_dir, collection_name="sql_test", storage=backend)
+        assert reloaded.snapshot()["ids"] == store.snapshot()["ids"]
+        assert reloaded.snapshot()["documents"] == store.snapshot()["documents"]
+        assert reloaded.snapshot()["metadatas"] == store.snapshot()["metadatas"]
+        assert np.array_equal(reloaded.snapshot()["embeddings"], store.snapshot()["embeddings"])
+        assert reloaded.embedding_model == "test-model" and reloaded._seq == store._seq
+
+        # Appends after a delete keep the stored order
+        _add(reloaded, "doc_d", n_chunks=1)
+        ids = VectorStore(persist_directory=temp_dir, collection_name="sql_test", storage=backend).snapshot()["ids"]
+        assert [i.split("_chunk")[0] for i in ids] == ["doc_a"] * 3 + ["doc_c"] * 3 + ["doc_d"]
+
+        shadow = VectorStore(persist_directory=temp_dir, collection_name="sql_test.shadow", storage=backend)
+        _add(shadow, "doc_a", model="new-model")
+        reloaded.replace_with(shadow)
+        shadow.drop_files()
+        final = VectorStore(persist_directory=temp_dir, collection_name="sql_test", storage=backend)
+        assert final.count() == 3 and final.embedding_model == "new-model"
+        assert backend.collections() == ["sql_test"]
+        print("[OK] SQL storage round trip")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_registry_lists_sql_tenants():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        backend = SQLBackend(f"sqlite:///{os.path.join(temp_dir, 'rag.sqlite3')}")
+        registry = TenantStoreRegistry(persist_directory=temp_dir, storage=backend)
+        assert registry.get("bistro", create=False) is None
+
+        _add(registry.get("bistro"), "menu")
+        _add(registry.get("cafe", index="faq"), "faq")
+        assert registry.known_tenants() == ["bistro", "cafe"]
+        assert registry.evict("bistro")
+
+        # Listing is answered in SQL without loading the shard
+        loads = registry.loads
+        documents, total_chunks = registry.list_documents("bistro")
+        assert [d["document_id"] for d in documents] == ["menu"] and total_chunks == 3
+        assert registry.loads == loads and "restaurant_docs__bistro" not in registry.get_stats()["resident_collections"]
+
+        adapter = backend.open("restaurant_docs__bistro")
+        assert adapter.document_exists("menu") and not adapter.document_exists("other")
+        assert adapter.count({"chunk_index": 1}) == 1 and adapter.list_documents({"document_name": "x"}) == []
+        assert registry.get("bistro", create=False).count() == 3
+        assert registry.get("bistro", create=False).document_exists("menu")
+        print("[OK] Registry finds and lists tenants in SQL storage")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def _write_chroma(path: str):
+    """Minimal ChromaDB 0.5 layout: one collection, a deleted and a re-added chunk"""
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE collections (id TEXT PRIMARY KEY, name TEXT, topic TEXT, dimension INTEGER, database_id TEXT);
+        CREATE TABLE segments (id TEXT PRIMARY KEY, type TEXT, scope TEXT, topic TEXT, collection TEXT);
+        CREATE TABLE embeddings (id INTEGER PRIMARY KEY, segment_id TEXT, embedding_id TEXT, seq_id BLOB);
+        CREATE TABLE embedding_metadata (id INTEGER, key TEXT, string_value TEXT, int_value INTEGER,
+                                         float_value REAL, bool_value INTEGER);
+        CREATE TABLE embeddings_queue (seq_id INTEGER PRIMARY KEY, operation INTEGER, topic TEXT, id TEXT,
+                                       vector BLOB, encoding TEXT, metadata TEXT);
+        INSERT INTO collections VALUES ('c1', 'restaurant_docs', 'persistent://default/default/c1', 4, 'db');
+        INSERT INTO segments VALUES ('s1', 'urn:chroma:segment/metadata/sqlite', 'METADATA', NULL, 'c1');
+        INSERT INTO embeddings VALUES (1, 's1', 'doc_a_chunk_0', x'01'), (2, 's1', 'doc_a_chunk_1', x'02');
+    """)
+    for row_id, text in ((1, "Open daily"), (2, "Fresh pasta")):
+        connection.executemany("INSERT INTO embedding_metadata VALUES (?, ?, ?, ?, ?, ?)", [
+            (row_id, "chroma:document", text, None, None, None),
+            (row_id, "document_id", "doc_a", None, None, None),
+            (row_id, "chunk_index", None, row_id - 1, None, None),
+        ])
+    queue = [
+        (0, "doc_a_chunk_0", np.full(4, 9, dtype=np.float32)),
+        (3, "doc_a_chunk_0", None),
+        (0, "doc_a_chunk_0", np.full(4, 1, dtype=np.float32)),
+        (0, "doc_a_chunk_1", np.full(4, 2, dtype=np.float32)),
+    ]
+    for operation, chunk_id, vector in queue:
+        connection.execute(
+            "INSERT INTO embeddings_queue (operation, topic, id, vector, encoding) VALUES (?, ?, ?, ?, ?)",
+            (operation, "persistent://default/default/c1", chunk_id,
+             None if vector is None else vector.tobytes(), None if vector is None else "FLOAT32")
+        )
+    connection.commit()
+    connection.close()
+
+
+def test_import_from_chroma_and_pickle():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        chroma_file = os.path.join(temp_dir, "chroma.sqlite3")
+        _write_chroma(chroma_file)
+        backend = SQLBackend(f"sqlite:///{os.path.join(temp_dir, 'rag.sqlite3')}")
+
+        (name, data), = read_chroma(chroma_file)
+        assert import_collection(backend, name, data, model="legacy-model") == 2
+        store = VectorStore(persist_directory=temp_dir, collection_name=name, storage=backend)
+        assert store.snapshot()["documents"] == ["Open daily", "Fresh pasta"]
+        assert np.array_equal(store.snapshot()["embeddings"][:, 0], [1, 2])
+        assert store.snapshot()["metadatas"][1] == {"document_id": "doc_a", "chunk_index": 1}
+        assert store.embedding_model == "legacy-model"
+
+        # Existing collections are only replaced on request
+        assert import_collection(backend, name, data) is None
+
+        pickle_dir = os.path.join(temp_dir, "pickle")
+        _add(VectorStore(persist_directory=pickle_dir, collection_name="restaurant_docs__bistro"), "menu")
+        (name, data), = read_pickle(pickle_dir)
+        assert import_collection(backend, name, data) == 3
+        assert backend.collections() == ["restaurant_docs", "restaurant_docs__bistro"]
+        print("[OK] Chroma and pickle data import into SQL storage")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    test_sql_round_trip()
+    test_registry_lists_sql_tenants()
+    test_import_from_chroma_and_pickle()
+    print("\n[OK] All storage tests passed")
@@ -0,0 +1,64 @@
+"""
+Test per-restaurant shards: eviction with in-flight references and read-only lookups
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tenant_store import TenantStoreRegistry
+
+
+DIMENSION = 8
+
+
+def _add(store, document_id: str, n_chunks: int = 2):
+    chunks = [{"text": f"{document_id} chunk {i}", "document_hash": document_id, "chunk_index": i}
+              for i in range(n_chunks)]
+    store.add_documents(chunks, np.random.rand(n_chunks, DIMENSION).astype(np.float32), document_id)
+
+
+def test_evicted_store_stays_writable_and_unique():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        registry = TenantStoreRegistry(persist_directory=temp_dir, max_resident=1, idle_seconds=0)
+        bistro = registry.get("bistro")
+        _add(bistro, "menu")
+
+        # Loading another tenant evicts bistro while a request still holds it
+        _add(registry.get("cafe"), "menu")
+        assert "restaurant_docs__bistro" not in registry.get_stats()["resident_collections"]
+        _add(bistro, "wine_list")
+
+        # The next lookup reuses the live store instead of opening a second writer
+        assert registry.get("bistro") is bistro
+        assert bistro.count() == 4
+        print("[OK] Evicted shards stay writable and are not opened twice")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_lookups_do_not_create_tenants():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        registry = TenantStoreRegistry(persist_directory=temp_dir)
+        assert registry.get("nobody", create=False) is None
+        assert registry.list_documents("nobody") == ([], 0)
+        assert registry.known_tenants() == []
+        assert not [name for name in os.listdir(temp_dir) if "nobody" in name]
+
+        _add(registry.get("bistro"), "menu")
+        registry.evict("bistro")
+        documents, total_chunks = registry.list_documents("bistro")
+        assert [d["document_id"] for d in documents] == ["menu"] and total_chunks == 2
+        print("[OK] Read-only lookups do not create collections")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    test_evicted_store_stays_writable_and_unique()
+    test_lookups_do_not_create_tenants()
+    print("\n[OK] All tenant store tests passed")
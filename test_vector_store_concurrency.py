@@ -0,0 +1,136 @@
+"""
+Concurrency stress test for VectorStore
+Hammers reads and writes in parallel and checks that readers never crash
+or observe misaligned id/text/metadata rows
+"""
+
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from vector_store import VectorStore
+
+
+DIMENSION = 32
+
+
+def _make_document(doc_num: int, n_chunks: int):
+    """Build chunks whose text encodes their own chunk id"""
+    document_id = f"doc_{doc_num}"
+    chunks = [
+        {
+            "text": f"{document_id}_chunk_{i}",
+            "document_name": f"{document_id}.pdf",
+            "document_hash": f"hash_{doc_num}",
+            "chunk_index": i,
+            "total_chunks": n_chunks
+        }
+        for i in range(n_chunks)
+    ]
+    embeddings = np.random.rand(n_chunks, DIMENSION).astype(np.float32).tolist()
+    return document_id, chunks, embeddings
+
+
+def test_concurrent_reads_and_writes(duration: float = 3.0, readers: int = 8, writers: int = 2, text_store: str = "memory"):
+    """Run readers and writers in parallel and validate every result"""
+
+    print("=" * 60)
+    print("VECTOR STORE CONCURRENCY STRESS TEST")
+    print("=" * 60)
+
+    temp_dir = tempfile.mkdtemp()
+    store = VectorStore(persist_directory=temp_dir, collection_name="stress", text_store=text_store)
+
+    errors = []
+    stats = {"queries": 0, "writes": 0}
+    stats_lock = threading.Lock()
+    stop = threading.Event()
+    next_doc = iter(range(1_000_000))
+    next_doc_lock = threading.Lock()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                query = np.random.rand(DIMENSION).tolist()
+                results = store.query_similar(query, top_k=5)
+
+                for r in results["results"]:
+                    if r["text"] != r["id"]:
+                        raise AssertionError(f"Misaligned row: id={r['id']} text={r['text']}")
+                    if not r["id"].startswith(r["metadata"]["document_id"] + "_chunk_"):
+                        raise AssertionError(f"Misaligned metadata for {r['id']}")
+
+                snapshot = store.snapshot()
+                rows = {
+                    len(snapshot["ids"]),
+                    len(snapshot["documents"]),
+                    len(snapshot["metadatas"]),
+                    snapshot["embeddings"].shape[0]
+                }
+                if len(rows) != 1:
+                    raise AssertionError(f"Snapshot row counts differ: {rows}")
+
+                store.get_all_documents()
+                with stats_lock:
+                    stats["queries"] += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+    def writer():
+        live = []
+        while not stop.is_set():
+            try:
+                if live and random.random() < 0.4:
+                    store.delete_document(live.pop(random.randrange(len(live))))
+                else:
+                    with next_doc_lock:
+                        doc_num = next(next_doc)
+                    document_id, chunks, embeddings = _make_document(doc_num, random.randint(1, 20))
+                    store.add_documents(chunks, embeddings, document_id)
+                    live.append(document_id)
+                with stats_lock:
+                    stats["writes"] += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+
+    try:
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        print(f"\n✓ Queries executed: {stats['queries']}")
+        print(f"✓ Writes executed: {stats['writes']}")
+
+        assert not errors, f"Concurrent access failed: {errors[0]!r}"
+
+        # Reloading from disk must give the same consistent state
+        reloaded = VectorStore(persist_directory=temp_dir, collection_name="stress", text_store=text_store)
+        assert reloaded.snapshot()["ids"] == store.snapshot()["ids"]
+        assert list(reloaded.snapshot()["documents"]) == list(store.snapshot()["documents"])
+
+        print("\n✓ Concurrency stress test passed!")
+    finally:
+        stop.set()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_concurrent_reads_and_writes_disk_texts():
+    """Same checks with chunk texts memory-mapped from disk"""
+    test_concurrent_reads_and_writes(duration=2.0, text_store="disk")
+
+
+if __name__ == "__main__":
+    test_concurrent_reads_and_writes()
+    test_concurrent_reads_and_writes_disk_texts()
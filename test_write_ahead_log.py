@@ -0,0 +1,122 @@
+"""
+Crash-recovery tests for the VectorStore write-ahead log
+Simulates crashes at different points and checks that startup recovery
+replays the log without losing or duplicating chunks
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from vector_store import VectorStore
+
+
+DIMENSION = 16
+
+
+def _add(store: VectorStore, document_id: str, n_chunks: int = 3):
+    chunks = [{"text": f"{document_id} chunk {i}", "document_hash": document_id} for i in range(n_chunks)]
+    embeddings = np.random.rand(n_chunks, DIMENSION).astype(np.float32).tolist()
+    store.add_documents(chunks, embeddings, document_id)
+
+
+def _open(temp_dir: str) -> VectorStore:
+    return VectorStore(persist_directory=temp_dir, collection_name="wal_test")
+
+
+def test_replay_after_crash():
+    """Writes that only reached the log survive a restart"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = _open(temp_dir)
+        _add(store, "doc_a")
+        _add(store, "doc_b")
+        store.delete_document("doc_a")
+        store.wal.sync()
+
+        # No close() or compaction: simulate the process dying here
+        assert not os.path.exists(store.storage_file)
+
+        recovered = _open(temp_dir)
+        assert recovered.snapshot()["ids"] == store.snapshot()["ids"]
+        assert np.array_equal(recovered.snapshot()["embeddings"], store.snapshot()["embeddings"])
+
+        # Recovery compacts the log into an atomically written snapshot
+        assert os.path.exists(recovered.storage_file)
+        assert recovered.wal.size() == 0
+        print("✓ Log replay after crash")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_torn_tail_is_discarded():
+    """A half-written last record is dropped, earlier records are kept"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = _open(temp_dir)
+        _add(store, "doc_a")
+        store.wal.sync()
+
+        with open(store.wal_file, "ab") as f:
+            f.write(b"\x10\x00\x00\x00garbage")
+
+        recovered = _open(temp_dir)
+        assert recovered.count() == 3
+        print("✓ Torn log tail discarded")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_crash_between_snapshot_and_truncate():
+    """Records already folded into the snapshot are not applied twice"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = _open(temp_dir)
+        _add(store, "doc_a")
+        _add(store, "doc_b")
+        store.wal.sync()
+
+        with open(store.wal_file, "rb") as f:
+            log_bytes = f.read()
+
+        # Snapshot written, then the crash hits before the log is emptied
+        store.compact()
+        with open(store.wal_file, "wb") as f:
+            f.write(log_bytes)
+
+        recovered = _open(temp_dir)
+        assert recovered.count() == 6
+        print("✓ No duplicate replay after compaction crash")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_corrupt_snapshot_is_preserved():
+    """An unreadable snapshot is moved aside instead of silently overwritten"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = _open(temp_dir)
+        store.close()
+
+        with open(store.storage_file, "wb") as f:
+            f.write(b"not a pickle")
+
+        recovered = _open(temp_dir)
+        assert recovered.count() == 0
+        assert any(name.startswith("wal_test.pkl.corrupt-") for name in os.listdir(temp_dir))
+        print("✓ Corrupt snapshot preserved for recovery")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("WRITE-AHEAD LOG RECOVERY TEST")
+    print("=" * 60)
+    test_replay_after_crash()
+    test_torn_tail_is_discarded()
+    test_crash_between_snapshot_and_truncate()
+    test_corrupt_snapshot_is_preserved()
+    print("\n✓ All write-ahead log tests passed!")
@@ -3,26 +3,167 @@ Vector Store Module
 Simple in-memory vector store with pickle persistence (ChromaDB-free alternative)
 """
 
+import mmap
 import os
-import pickle
-from typing import List, Dict, Optional
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Optional, Tuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from dotenv import load_dotenv
 
+from storage import create_storage_backend
+from shared_index import SharedIndex, TextArena, load_texts, write_texts
+from quantization import QUANTIZATION_MODES, QuantizedIndex, tune_rescore_factor
+from diversity import DIVERSITY_CANDIDATE_FACTOR, dedupe_by_hash, mmr_select
+from similarity import cosine_one_to_many, inverse_norms, top_k as top_k_positions
+
 load_dotenv()
 
+# Chunk fields stored in metadata only when present (the question of a FAQ entry,
+# the pages and cleaned-text offsets a chunk spans)
+OPTIONAL_METADATA_KEYS = ("question", "page_start", "page_end", "char_start", "char_end")
+
+# Where chunk texts live: "memory" (Python strings) or "disk" (memory-mapped,
+# decoded only for the rows a query returns)
+TEXT_STORE_MODES = ("memory", "disk")
+
+
+def _freeze(matrix: np.ndarray) -> np.ndarray:
+    """Mark an embedding matrix read-only so published snapshots are never mutated"""
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _empty_data() -> Dict:
+    """Return an empty storage snapshot"""
+    return {
+        "ids": [],
+        "documents": [],
+        "embeddings": _freeze(np.zeros((0, 0), dtype=np.float32)),
+        "metadatas": [],
+        "model": None
+    }
+
+
+def _is_file_backed(array: np.ndarray) -> bool:
+    """True if the array's memory is a file mapping rather than the heap"""
+    while array is not None:
+        if isinstance(array, mmap.mmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def _kept_rows(data: Dict, document_id: str) -> List[int]:
+    """Rows of a snapshot that survive deleting a document"""
+    return [
+        i for i, meta in enumerate(data["metadatas"])
+        if meta.get("document_id") != document_id
+    ]
+
+
+def _apply_record(data: Dict, record: Dict) -> Dict:
+    """
+    Apply a mutation record to a snapshot and return the new snapshot
+
+    Used both for live writes and for replaying the write-ahead log, so
+    recovery goes through exactly the same code path as normal operation.
+    """
+    op = record["op"]
+
+    if op == "add":
+        new_embeddings = record["embeddings"]
+        model = data.get("model")
+        if len(data["ids"]) > 0:
+            if model and record.get("model") and record["model"] != model:
+                raise ValueError(
+                    f"Embedding model mismatch: collection uses {model}, got {record['model']}"
+                )
+            dimension = data["embeddings"].shape[1]
+            if new_embeddings.shape[1] != dimension:
+                raise ValueError(
+                    f"Embedding dimension mismatch: store has {dimension}, "
+                    f"got {new_embeddings.shape[1]}"
+                )
+            matrix = np.vstack([data["embeddings"], new_embeddings])
+        else:
+            # An empty collection takes whatever model its first add uses
+            model = None
+            matrix = new_embeddings.copy()
+
+        return {
+            "ids": data["ids"] + record["ids"],
+            "documents": list(data["documents"]) + record["documents"],
+            "embeddings": _freeze(matrix),
+            "metadatas": data["metadatas"] + record["metadatas"],
+            "model": model or record.get("model")
+        }
+
+    if op == "delete":
+        keep = _kept_rows(data, record["document_id"])
+        return {
+            "ids": [data["ids"][i] for i in keep],
+            "documents": [data["documents"][i] for i in keep],
+            "embeddings": _freeze(data["embeddings"][keep]),
+            "metadatas": [data["metadatas"][i] for i in keep],
+            "model": data.get("model")
+        }
+
+    if op == "reset":
+        return _empty_data()
+
+    if op == "replace":
+        # Whole collection swapped in at once (e.g. after re-embedding with a new model)
+        return VectorStore._to_snapshot(record)
+
+    raise ValueError(f"Unknown write-ahead log operation: {op}")
 
-class VectorStore:
-    """Manage vector storage and retrieval using in-memory storage with pickle persistence"""
 
-    def __init__(self, persist_directory: str = None, collection_name: str = None):
+class VectorStore:
+    """
+    Manage vector storage and retrieval using in-memory storage with pickle persistence
+
+    Persistence (see ``storage``): by default every mutation is appended to a
+    checksummed write-ahead log (O(delta) per write). The log is periodically
+    compacted into a pickle snapshot that is replaced atomically, and
+    replayed on startup. With a SQL storage backend each mutation is one
+    transaction against the chunk tables instead.
+
+    Shared mode (multi-worker deployments): the store is published as
+    memory-mapped generations (see ``shared_index``). Every process attaches
+    read-only to the live generation instead of holding a private copy, and
+    re-attaches when another process publishes a new one after a write.
+
+    Thread safety: ``self.data`` is an immutable snapshot. Writers build a new
+    snapshot under ``_write_lock`` and publish it with a single attribute
+    assignment (copy-on-write), so readers never take a lock, never wait on a
+    slow write and never observe a half-applied update.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = None,
+        collection_name: str = None,
+        shared: bool = None,
+        quantization: str = None,
+        text_store: str = None,
+        storage=None
+    ):
         """
         Initialize simple vector store
 
         Args:
             persist_directory: Path to persist data
             collection_name: Name of the collection
+            shared: Attach to a memory-mapped index shared between processes
+                    (defaults to VECTOR_STORE_SHARED env variable)
+            quantization: "none", "int8" or "binary" first-pass index
+                          (defaults to VECTOR_QUANTIZATION env variable)
+            text_store: "memory" or "disk" for chunk texts
+                        (defaults to VECTOR_TEXT_STORE env variable)
+            storage: Storage backend shared by collections (defaults to one
+                     built from the VECTOR_STORAGE_URL env variable)
         """
         self.persist_directory = persist_directory or os.getenv(
             "CHROMA_PERSIST_DIR",
@@ -36,106 +177,475 @@ class VectorStore:
         # Ensure directory exists
         os.makedirs(self.persist_directory, exist_ok=True)
 
-        # Storage file path
-        self.storage_file = os.path.join(
+        # Persistence adapter (pickle + write-ahead log, or SQL tables)
+        self.backend = storage or create_storage_backend(self.persist_directory)
+        self.storage = self.backend.open(self.collection_name)
+
+        # Local file paths (search-side caches live here with any backend)
+        self.embeddings_file = os.path.join(
+            self.persist_directory,
+            f"{self.collection_name}.f32.npy"
+        )
+        self.texts_file = os.path.join(
+            self.persist_directory,
+            f"{self.collection_name}.texts.bin"
+        )
+        self.text_offsets_file = os.path.join(
             self.persist_directory,
-            f"{self.collection_name}.pkl"
+            f"{self.collection_name}.texts.offsets.npy"
         )
 
-        # In-memory storage
-        self.data = {
-            "ids": [],
-            "documents": [],
-            "embeddings": [],
-            "metadatas": []
-        }
+        self.text_store = (text_store or os.getenv("VECTOR_TEXT_STORE", "memory")).lower()
+        if self.text_store not in TEXT_STORE_MODES:
+            raise ValueError(f"Unsupported text store: {self.text_store}")
+
+        # Quantized search settings
+        self.quantization = (quantization or os.getenv("VECTOR_QUANTIZATION", "none")).lower()
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization mode: {self.quantization}")
+        self.rescore_factor = int(os.getenv("QUANTIZATION_RESCORE_FACTOR", 4))
+        self.recall_floor = float(os.getenv("QUANTIZATION_RECALL_FLOOR", 0.95))
+        # Re-measure recall once the collection is this many times larger than when tuned
+        self.retune_growth = float(os.getenv("QUANTIZATION_RETUNE_GROWTH", 2.0))
+        self.tune_queries = int(os.getenv("QUANTIZATION_TUNE_QUERIES", 50))
+        self._start_rescore_factor = self.rescore_factor
+        self.quantization_report = None
+        # Writes applied to the search index since it was last built from scratch
+        self._index_writes = 0
+        self._memory_usage_cache = None
+
+        # Compact the log into the snapshot after this many records
+        self.compact_every = int(os.getenv("WAL_COMPACT_EVERY", 100))
+
+        # Serializes writers; readers work on whatever snapshot is current
+        self._write_lock = threading.Lock()
+
+        # In-memory storage (replaced wholesale on every write, never mutated)
+        self.data = _empty_data()
+
+        # Sequence number of the last applied mutation
+        self._seq = 0
+
+        if shared is None:
+            shared = os.getenv("VECTOR_STORE_SHARED", "false").lower() == "true"
+
+        self.shared_index = None
+        self._attached_generation = None
+        if shared:
+            try:
+                self.shared_index = SharedIndex(self.persist_directory, self.collection_name)
+            except RuntimeError as e:
+                print(f"[WARN] {e}; falling back to a private in-memory store")
 
         # Load existing data if available
-        self._load()
+        if self.shared_index is not None:
+            self._load_shared()
+        else:
+            self._load()
+            if self.storage.pending_records:
+                with self._write_lock:
+                    self._compact_locked()
 
         print(f"[OK] Vector store initialized: {self.collection_name}")
         print(f"[OK] Storage location: {self.persist_directory}")
         print(f"[OK] Current document count: {self.count()}")
 
+    @property
+    def storage_file(self) -> Optional[str]:
+        """Pickle snapshot path (pickle storage only)"""
+        return getattr(self.storage, "storage_file", None)
+
+    @property
+    def wal_file(self) -> Optional[str]:
+        """Write-ahead log path (pickle storage only)"""
+        return getattr(self.storage, "wal_file", None)
+
+    @property
+    def wal(self):
+        """Write-ahead log (pickle storage only)"""
+        return getattr(self.storage, "wal", None)
+
     def _load(self):
-        """Load data from pickle file"""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'rb') as f:
-                    self.data = pickle.load(f)
-                print(f"[OK] Loaded {len(self.data['ids'])} chunks from storage")
-            except Exception as e:
-                print(f"[WARN] Could not load existing data: {e}")
-                self.data = {
-                    "ids": [],
-                    "documents": [],
-                    "embeddings": [],
-                    "metadatas": []
-                }
+        """Load the base snapshot and replay logged mutations on top of it"""
+        data, self._seq = self._read_persisted()
+        self.data = self._build_search_index(data)
+
+    def _read_persisted(self) -> Tuple[Dict, int]:
+        """
+        Read the persisted state from storage
+
+        Returns:
+            Tuple of (snapshot, sequence number of the last applied mutation)
+        """
+        data = _empty_data()
+        stored, seq = self.storage.read_snapshot()
+        if stored is not None:
+            data = self._to_snapshot(stored)
+            print(f"[OK] Loaded {len(data['ids'])} chunks from storage")
+
+        replayed = 0
+        for record in self.storage.replay():
+            # Records already folded into the snapshot are skipped
+            if record["seq"] <= seq:
+                continue
+            data = _apply_record(data, record)
+            seq = record["seq"]
+            replayed += 1
+
+        if replayed:
+            print(f"[OK] Replayed {replayed} write-ahead log records")
+
+        return data, seq
+
+    def _load_shared(self):
+        """Attach to the shared index, building it first if it is missing or stale"""
+        with self.shared_index.writer_lock():
+            generation = self.shared_index.current_generation()
+            stale = self.storage.modified_since(self.shared_index.last_published_ns(), generation)
+
+            # Only one process (the first to get the lock) pays for loading
+            if generation is None or stale:
+                self._load()
+                if self.storage.pending_records:
+                    with self._write_lock:
+                        self._compact_locked()
+                self.shared_index.publish(self.data, self._seq)
+                print(f"[OK] Published shared index generation {self._seq}")
+
+            self._attach_shared()
+
+    def _attach_shared(self):
+        """Point this process at the live shared generation"""
+        generation = self.shared_index.current_generation()
+        self.data = self._build_search_index(self.shared_index.attach(generation))
+        self._seq = generation
+        self._attached_generation = generation
+
+    def _build_search_index(self, data: Dict) -> Dict:
+        """
+        Add the row norms and the quantized first-pass index to a snapshot
+
+        Float vectors are moved out of the heap into a memory-mapped file,
+        so only the quantized codes stay resident. With the disk text store,
+        chunk texts are moved out of the heap the same way.
+        """
+        data = self._store_texts(data)
+        self._index_writes = 0
+
+        # Queries then cost one matrix-vector product, with no normalized copy
+        if len(data["ids"]):
+            data = dict(data, inv_norms=inverse_norms(data["embeddings"]))
+
+        if self.quantization == "none" or len(data["ids"]) == 0:
+            return data
+
+        embeddings = data["embeddings"]
+        if not _is_file_backed(embeddings):
+            embeddings = self._spill_embeddings(embeddings)
+
+        index = QuantizedIndex(embeddings, self.quantization)
+        self._tune_rescore_factor(index, embeddings)
 
-    def _save(self):
-        """Save data to pickle file"""
-        try:
-            with open(self.storage_file, 'wb') as f:
-                pickle.dump(self.data, f)
-        except Exception as e:
-            print(f"[WARN] Could not save data: {e}")
+        return dict(data, embeddings=embeddings, quantized=index)
+
+    def _update_search_index(self, record: Dict, new_data: Dict) -> Dict:
+        """
+        Carry the current snapshot's search index over to a write's snapshot
+
+        An add normalizes and quantizes only the rows it appends; a delete
+        drops rows from the norms and codes. New float rows stay on the heap
+        until the next compaction writes the float file and rebuilds the
+        index. Other writes (reset, replace) rebuild it right away.
+        """
+        old = self.data
+        if record["op"] not in ("add", "delete") or "inv_norms" not in old or len(new_data["ids"]) == 0:
+            return self._build_search_index(new_data)
+
+        if record["op"] == "add":
+            rows = record["embeddings"]
+            inv_norms = np.concatenate([old["inv_norms"], inverse_norms(rows)])
+            index = old["quantized"].extend(rows) if "quantized" in old else None
+        else:
+            keep = _kept_rows(old, record["document_id"])
+            inv_norms = old["inv_norms"][keep]
+            index = old["quantized"].take(keep) if "quantized" in old else None
+
+        data = dict(self._store_texts(new_data), inv_norms=inv_norms)
+        if index is not None:
+            data["quantized"] = index
+            self._index_writes += 1
+            self._tune_rescore_factor(index, data["embeddings"])
+        return data
+
+    def _store_texts(self, data: Dict) -> Dict:
+        """With the disk text store, move chunk texts out of the heap"""
+        if self.text_store == "disk" and not isinstance(data["documents"], TextArena) and len(data["ids"]):
+            data = dict(data, documents=self._spill_texts(data["documents"]))
+        return data
+
+    def _tune_rescore_factor(self, index: QuantizedIndex, embeddings: np.ndarray):
+        """
+        Measure recall and pick the rescore depth from it
+
+        Runs on the first index built, then again whenever the collection
+        has grown by retune_growth since the last measurement (a factor
+        tuned on a handful of rows says little about a large collection).
+        """
+        report = self.quantization_report
+        if report is not None and len(embeddings) < report["rows"] * self.retune_growth:
+            return
+
+        self.quantization_report = tune_rescore_factor(
+            index,
+            embeddings,
+            recall_floor=self.recall_floor,
+            start_factor=self._start_rescore_factor,
+            n_queries=self.tune_queries
+        )
+        self.rescore_factor = self.quantization_report["rescore_factor"]
+        print(
+            f"[OK] {self.quantization} index: {index.nbytes / 1024:.0f} KB "
+            f"(float32: {embeddings.nbytes / 1024:.0f} KB), "
+            f"recall@{self.quantization_report['k']} "
+            f"{self.quantization_report['recall_at_k']:.3f} "
+            f"with rescore factor {self.rescore_factor} "
+            f"(measured on {self.quantization_report['rows']} rows)"
+        )
+
+    def _spill_embeddings(self, embeddings: np.ndarray) -> np.ndarray:
+        """Write float vectors to disk and return a read-only memory map of them"""
+        tmp_file = f"{self.embeddings_file}.tmp.npy"
+        np.save(tmp_file, np.asarray(embeddings, dtype=np.float32))
+        os.replace(tmp_file, self.embeddings_file)
+        return np.load(self.embeddings_file, mmap_mode="r")
+
+    def _spill_texts(self, texts: List[str]) -> TextArena:
+        """Write chunk texts to disk and return a lazily decoding view of them"""
+        tmp_texts = f"{self.texts_file}.tmp"
+        tmp_offsets = f"{self.text_offsets_file}.tmp.npy"
+        write_texts(texts, tmp_texts, tmp_offsets)
+        os.replace(tmp_offsets, self.text_offsets_file)
+        os.replace(tmp_texts, self.texts_file)
+        return load_texts(self.texts_file, self.text_offsets_file)
+
+    @contextmanager
+    def _writing(self):
+        """
+        Hold the write lock(s) for a mutation
+
+        In shared mode the cross-process lock is taken too. The attached
+        generation is the base of the mutation unless another worker wrote
+        since (then the persisted state is reloaded); after the mutation a
+        new generation is published and re-attached, which builds its
+        search index.
+        """
+        with self._write_lock:
+            if self.shared_index is None:
+                yield
+                return
+
+            with self.shared_index.writer_lock():
+                generation = self.shared_index.current_generation()
+                if (generation is None or generation != self._attached_generation
+                        or self.storage.modified_since(self.shared_index.last_published_ns(), generation)):
+                    self.data, self._seq = self._read_persisted()
+                start_seq = self._seq
+                try:
+                    yield
+                    if self._seq != start_seq:
+                        self.shared_index.publish(self.data, self._seq)
+                finally:
+                    self._attach_shared()
+
+    @staticmethod
+    def _to_snapshot(data: Dict) -> Dict:
+        """Convert loaded data (embeddings may be stored as lists) into a snapshot"""
+        embeddings = np.asarray(data.get("embeddings", []), dtype=np.float32)
+        if embeddings.ndim != 2:
+            embeddings = embeddings.reshape(len(data.get("ids", [])), -1)
+
+        return {
+            "ids": list(data.get("ids", [])),
+            "documents": list(data.get("documents", [])),
+            "embeddings": _freeze(embeddings),
+            "metadatas": list(data.get("metadatas", [])),
+            "model": data.get("model")
+        }
+
+    def _commit(self, record: Dict, new_data: Dict):
+        """Persist a mutation, then publish its snapshot (caller holds the write lock)"""
+        self.storage.append(record, new_data)
+        self._seq = record["seq"]
+        # In shared mode the index is built when the published generation is attached
+        self.data = new_data if self.shared_index is not None else self._update_search_index(record, new_data)
+
+        if self.storage.pending_records >= self.compact_every or self._index_writes >= self.compact_every:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """
+        Fold logged mutations into a new base snapshot (caller holds the write lock)
+
+        An index updated in place since its last build is rebuilt here: the
+        float file is rewritten and the codes requantized from scratch.
+        """
+        self.storage.checkpoint(self.data, self._seq)
+        if self._index_writes:
+            self.data = self._build_search_index(self.data)
+
+    def compact(self):
+        """Fold the write-ahead log into a fresh snapshot (no-op for SQL storage)"""
+        with self._write_lock:
+            self._compact_locked()
+
+    def close(self):
+        """Flush pending log records and release the log file"""
+        self.storage.close()
+
+    def drop_files(self):
+        """Close the store and delete all of its data (e.g. a finished shadow index)"""
+        self.storage.drop()
+        for path in (self.embeddings_file, self.texts_file, self.text_offsets_file):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(
+            os.path.join(self.persist_directory, f"{self.collection_name}.shared"),
+            ignore_errors=True
+        )
+
+    def memory_usage(self) -> int:
+        """
+        Approximate resident memory of the current snapshot in bytes
+
+        Memory-mapped data is not counted since it lives in the page cache.
+        """
+        data = self.snapshot()
+        cached = self._memory_usage_cache
+        if cached is not None and cached[0] is data:
+            return cached[1]
+
+        total = 0
+
+        if not _is_file_backed(data["embeddings"]):
+            total += data["embeddings"].nbytes
+        if "quantized" in data:
+            total += data["quantized"].nbytes
+        if "inv_norms" in data:
+            total += data["inv_norms"].nbytes
+        if isinstance(data["documents"], list):
+            total += sum(len(text) for text in data["documents"])
+
+        self._memory_usage_cache = (data, total)
+        return total
 
     def count(self) -> int:
         """Return number of chunks in store"""
-        return len(self.data["ids"])
+        return len(self.snapshot()["ids"])
+
+    def snapshot(self) -> Dict:
+        """
+        Return the current consistent, read-only view of the store
+
+        Rows of ids/documents/embeddings/metadatas are always aligned.
+        In shared mode this re-attaches first if another process published
+        a newer generation (a single stat() when nothing changed).
+        """
+        if self.shared_index is not None:
+            generation = self.shared_index.current_generation()
+            if generation != self._attached_generation:
+                self.data = self._build_search_index(self.shared_index.attach(generation))
+                self._attached_generation = generation
+        return self.data
+
+    @property
+    def version(self) -> int:
+        """Sequence number of the snapshot readers see (changes with every write, in any process)"""
+        self.snapshot()
+        return self._attached_generation if self.shared_index is not None else self._seq
+
+    @property
+    def embedding_model(self) -> Optional[str]:
+        """Model the stored embeddings were made with (None for collections from before it was recorded)"""
+        return self.snapshot().get("model")
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Embedding dimension of the collection (None while it is empty)"""
+        data = self.snapshot()
+        return data["embeddings"].shape[1] if len(data["ids"]) else None
 
     def add_documents(
         self,
         chunks: List[Dict],
-        embeddings: List[List[float]],
-        document_id: str
+        embeddings: np.ndarray,
+        document_id: str,
+        model: str = None
     ) -> int:
         """
         Add document chunks with embeddings to vector store
 
         Args:
             chunks: List of chunk dictionaries with metadata
-            embeddings: List of embedding vectors
+            embeddings: Embedding matrix (n, dim); lists of vectors are accepted too
             document_id: Unique identifier for the document
+            model: Embedding model name, recorded on the collection's first add
 
         Returns:
             Number of chunks added
+
+        Raises:
+            ValueError: If the model or dimension differs from the collection's
         """
         if len(chunks) != len(embeddings):
             raise ValueError("Number of chunks must match number of embeddings")
 
-        for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        if not chunks:
+            return 0
+
+        new_embeddings = np.asarray(embeddings, dtype=np.float32)
+        if new_embeddings.ndim != 2:
+            raise ValueError("Embeddings must be a list of equal-length vectors")
+
+        new_ids = []
+        new_metadatas = []
+        for idx, chunk in enumerate(chunks):
             # Create unique ID
-            chunk_id = f"{document_id}_chunk_{idx}"
+            new_ids.append(f"{document_id}_chunk_{idx}")
 
             # Prepare metadata
-            metadata = {
+            new_metadatas.append({
                 "document_id": document_id,
                 "document_name": chunk.get("document_name", "unknown"),
                 "document_hash": chunk.get("document_hash", ""),
                 "chunk_index": chunk.get("chunk_index", idx),
                 "total_chunks": chunk.get("total_chunks", len(chunks)),
                 "char_count": chunk.get("char_count", len(chunk["text"]))
+            })
+            for key in OPTIONAL_METADATA_KEYS:
+                if key in chunk:
+                    new_metadatas[-1][key] = chunk[key]
+
+        with self._writing():
+            record = {
+                "op": "add",
+                "seq": self._seq + 1,
+                "ids": new_ids,
+                "documents": [chunk["text"] for chunk in chunks],
+                "embeddings": new_embeddings,
+                "metadatas": new_metadatas,
+                "model": model
             }
-
-            # Add to storage
-            self.data["ids"].append(chunk_id)
-            self.data["documents"].append(chunk["text"])
-            self.data["embeddings"].append(embedding)
-            self.data["metadatas"].append(metadata)
-
-        # Persist to disk
-        self._save()
+            self._commit(record, _apply_record(self.data, record))
 
         print(f"[OK] Added {len(chunks)} chunks to vector store")
         return len(chunks)
 
     def query_similar(
         self,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         top_k: int = 5,
-        filter_dict: Dict = None
+        filter_dict: Dict = None,
+        diversity: float = 0.0
     ) -> Dict:
         """
         Query similar documents using embedding
@@ -144,47 +654,74 @@ class VectorStore:
             query_embedding: Query vector embedding
             top_k: Number of results to return
             filter_dict: Optional metadata filters
+            diversity: 0.0 ranks by similarity only; above 0 drops duplicate
+                chunks and re-ranks a larger candidate pool with MMR
 
         Returns:
             Dictionary with results and metadata
         """
-        if len(self.data["embeddings"]) == 0:
+        # Work on a single snapshot for the whole query
+        data = self.snapshot()
+
+        if len(data["ids"]) == 0:
             return {"results": [], "count": 0}
 
         # Convert to numpy arrays
-        query_vec = np.array(query_embedding).reshape(1, -1)
-        embeddings_matrix = np.array(self.data["embeddings"])
-
-        # Calculate cosine similarities
-        similarities = cosine_similarity(query_vec, embeddings_matrix)[0]
+        query_vec = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        embeddings_matrix = data["embeddings"]
+        if len(query_vec) != embeddings_matrix.shape[1]:
+            raise ValueError(
+                f"Query embedding has dimension {len(query_vec)}, collection "
+                f"'{self.collection_name}' has {embeddings_matrix.shape[1]} "
+                f"(model: {data.get('model') or 'unknown'})"
+            )
 
         # Apply filters if provided
-        valid_indices = list(range(len(similarities)))
+        rows = None
         if filter_dict:
-            valid_indices = [
-                i for i in valid_indices
-                if all(
-                    self.data["metadatas"][i].get(k) == v
-                    for k, v in filter_dict.items()
-                )
-            ]
-
-        # Get top k indices
-        if len(valid_indices) == 0:
-            return {"results": [], "count": 0}
-
-        valid_similarities = [(i, similarities[i]) for i in valid_indices]
-        valid_similarities.sort(key=lambda x: x[1], reverse=True)
-        top_indices = [i for i, _ in valid_similarities[:top_k]]
+            rows = np.array([
+                i for i, meta in enumerate(data["metadatas"])
+                if all(meta.get(k) == v for k, v in filter_dict.items())
+            ], dtype=np.int64)
+            if len(rows) == 0:
+                return {"results": [], "count": 0}
+
+        # Diversified queries re-rank a larger pool of the best matches
+        pool_size = top_k * DIVERSITY_CANDIDATE_FACTOR if diversity > 0 else top_k
+
+        if "quantized" in data:
+            # Quantized first pass, then exact rescoring of the candidates only
+            rows = np.sort(data["quantized"].candidates(
+                query_vec,
+                pool_size * self.rescore_factor,
+                rows
+            ))
+
+        # Snapshots being written in shared mode have no norms yet
+        scores = cosine_one_to_many(query_vec, embeddings_matrix, data.get("inv_norms"), rows)
+        best = top_k_positions(scores, pool_size)
+        top = list(zip((best if rows is None else rows[best]).tolist(), scores[best].tolist()))
+
+        if diversity > 0:
+            # Exact duplicates first (overlapping uploads), then MMR over the rest
+            top = [top[p] for p in dedupe_by_hash([data["documents"][i] for i, _ in top])]
+            picks = mmr_select(
+                query_vec,
+                embeddings_matrix[[i for i, _ in top]],
+                top_k,
+                diversity,
+                relevance=np.array([score for _, score in top], dtype=np.float32)
+            )
+            top = [top[p] for p in picks]
 
         # Format results
         formatted_results = []
-        for i in top_indices:
+        for i, similarity in top:
             result = {
-                "id": self.data["ids"][i],
-                "text": self.data["documents"][i],
-                "metadata": self.data["metadatas"][i],
-                "similarity": float(similarities[i])
+                "id": data["ids"][i],
+                "text": data["documents"][i],
+                "metadata": data["metadatas"][i],
+                "similarity": float(similarity)
             }
             formatted_results.append(result)
 
@@ -203,28 +740,19 @@ class VectorStore:
         Returns:
             Number of chunks deleted
         """
-        # Find indices to delete
-        indices_to_delete = [
-            i for i, meta in enumerate(self.data["metadatas"])
-            if meta.get("document_id") == document_id
-        ]
-
-        if not indices_to_delete:
-            print(f"[WARN] No chunks found for document: {document_id}")
-            return 0
+        with self._writing():
+            record = {"op": "delete", "seq": self._seq + 1, "document_id": document_id}
+            new_data = _apply_record(self.data, record)
+            deleted = len(self.data["ids"]) - len(new_data["ids"])
 
-        # Delete in reverse order to maintain indices
-        for i in sorted(indices_to_delete, reverse=True):
-            del self.data["ids"][i]
-            del self.data["documents"][i]
-            del self.data["embeddings"][i]
-            del self.data["metadatas"][i]
+            if not deleted:
+                print(f"[WARN] No chunks found for document: {document_id}")
+                return 0
 
-        # Persist changes
-        self._save()
+            self._commit(record, new_data)
 
-        print(f"[OK] Deleted {len(indices_to_delete)} chunks for document: {document_id}")
-        return len(indices_to_delete)
+        print(f"[OK] Deleted {deleted} chunks for document: {document_id}")
+        return deleted
 
     def document_exists(self, document_hash: str) -> bool:
         """
@@ -236,7 +764,12 @@ class VectorStore:
         Returns:
             True if document exists
         """
-        for meta in self.data["metadatas"]:
+        # SQL storage answers from an index instead of scanning every chunk
+        stored = self.storage.document_exists(document_hash)
+        if stored is not None:
+            return stored
+
+        for meta in self.snapshot()["metadatas"]:
             if meta.get("document_hash") == document_hash:
                 return True
         return False
@@ -249,7 +782,7 @@ class VectorStore:
             List of document information
         """
         documents = {}
-        for metadata in self.data["metadatas"]:
+        for metadata in self.snapshot()["metadatas"]:
             doc_id = metadata.get("document_id")
             if doc_id and doc_id not in documents:
                 documents[doc_id] = {
@@ -271,24 +804,72 @@ class VectorStore:
         total_chunks = self.count()
         documents = self.get_all_documents()
 
-        return {
+        stats = {
             "total_chunks": total_chunks,
             "total_documents": len(documents),
             "collection_name": self.collection_name,
-            "persist_directory": self.persist_directory
+            "persist_directory": self.persist_directory,
+            "storage": self.storage.kind,
+            "quantization": self.quantization,
+            "text_store": self.text_store,
+            "embedding_model": self.embedding_model,
+            "dimension": self.dimension
         }
 
+        data = self.snapshot()
+        if "quantized" in data:
+            stats["index_bytes"] = data["quantized"].nbytes
+            stats["float_bytes_on_disk"] = int(data["embeddings"].nbytes)
+            stats["rescore_factor"] = self.rescore_factor
+            stats["recall_at_k"] = self.quantization_report["recall_at_k"]
+            stats["tuned_at_rows"] = self.quantization_report["rows"]
+
+        return stats
+
     def reset_collection(self):
         """Reset/clear the entire collection (use with caution!)"""
-        self.data = {
-            "ids": [],
-            "documents": [],
-            "embeddings": [],
-            "metadatas": []
-        }
-        self._save()
+        with self._writing():
+            record = {"op": "reset", "seq": self._seq + 1}
+            self._commit(record, _empty_data())
+            self._compact_locked()
         print(f"[OK] Collection '{self.collection_name}' reset")
 
+    def replace_with(self, source: "VectorStore", sync: Callable[[Dict], None] = None) -> int:
+        """
+        Atomically replace this collection with the contents of another store
+
+        Used to switch traffic to a re-embedded shadow index. Readers see
+        either the old or the new collection, never a mix.
+
+        Args:
+            source: Store whose current snapshot becomes this collection
+            sync: Called with this store's snapshot while its writes are
+                  blocked, so the caller can bring source up to date first
+
+        Returns:
+            Number of chunks in the collection after the swap
+        """
+        with self._writing():
+            if sync is not None:
+                sync(self.data)
+
+            data = source.snapshot()
+            record = {
+                "op": "replace",
+                "seq": self._seq + 1,
+                "ids": list(data["ids"]),
+                "documents": list(data["documents"]),
+                "embeddings": np.asarray(data["embeddings"], dtype=np.float32),
+                "metadatas": list(data["metadatas"]),
+                "model": data.get("model")
+            }
+            self._commit(record, _apply_record(self.data, record))
+            # The record holds the whole collection; fold it into the snapshot right away
+            self._compact_locked()
+
+        print(f"[OK] Collection '{self.collection_name}' replaced ({len(record['ids'])} chunks, model {record['model']})")
+        return len(record["ids"])
+
 
 # Testing
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+"""
+Write-Ahead Log Module
+Append-only, checksummed mutation log used for crash-safe VectorStore persistence
+"""
+
+import atexit
+import os
+import pickle
+import struct
+import threading
+import weakref
+import zlib
+from typing import Dict, Iterator
+
+# Each record is framed as: payload length (uint32) + CRC32 of payload (uint32) + payload
+_RECORD_HEADER = struct.Struct("<II")
+
+# Logs still open at interpreter exit get their pending records synced
+_open_logs = weakref.WeakSet()
+
+
+@atexit.register
+def _sync_open_logs():
+    for log in list(_open_logs):
+        try:
+            log.sync()
+        except Exception:
+            pass
+
+
+class WriteAheadLog:
+    """
+    Append-only log of mutation records with batched fsync
+
+    Records are flushed to the OS on every append and fsync'ed once
+    ``sync_every`` records are pending or ``sync_interval`` seconds have
+    passed, whichever comes first. A crash can only lose the unsynced tail;
+    a torn or corrupt tail is detected by its checksum and dropped on replay.
+    """
+
+    def __init__(self, path: str, sync_every: int = None, sync_interval: float = None):
+        """
+        Open (or create) a write-ahead log
+
+        Args:
+            path: Path of the log file
+            sync_every: fsync after this many pending records (1 = fsync every write)
+            sync_interval: Maximum seconds a record may stay unsynced
+        """
+        self.path = path
+        self.sync_every = max(1, sync_every or int(os.getenv("WAL_SYNC_EVERY", 8)))
+        self.sync_interval = sync_interval if sync_interval is not None else float(
+            os.getenv("WAL_SYNC_INTERVAL", 1.0)
+        )
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer = None
+        self._file = open(self.path, "ab")
+        self.record_count = 0
+
+        _open_logs.add(self)
+
+    def append(self, record: Dict):
+        """
+        Append a record to the log
+
+        Args:
+            record: Picklable mutation record
+        """
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            self._file.write(frame)
+            self._file.flush()
+            self._pending += 1
+            self.record_count += 1
+
+            if self._pending >= self.sync_every:
+                self._sync_locked()
+            elif self._timer is None and self.sync_interval > 0:
+                self._timer = threading.Timer(self.sync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self):
+        """fsync any pending records to disk"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending and not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def replay(self) -> Iterator[Dict]:
+        """
+        Yield every intact record in the log, in order
+
+        Reading stops at the first truncated or corrupt record; the bad
+        tail is cut off so new records are never appended after garbage.
+        """
+        valid_bytes = 0
+        count = 0
+
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+
+                length, checksum = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+
+                try:
+                    record = pickle.loads(payload)
+                except Exception:
+                    break
+
+                valid_bytes = f.tell()
+                count += 1
+                yield record
+
+        with self._lock:
+            if os.path.getsize(self.path) > valid_bytes:
+                print(f"[WARN] Discarding corrupt tail of write-ahead log: {self.path}")
+                self._file.truncate(valid_bytes)
+                os.fsync(self._file.fileno())
+            self.record_count = count
+
+    def truncate(self):
+        """Empty the log (after its records were compacted into a snapshot)"""
+        with self._lock:
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            self.record_count = 0
+
+    def size(self) -> int:
+        """Return log size in bytes"""
+        return os.path.getsize(self.path)
+
+    def close(self):
+        """Sync pending records and close the log"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync_locked()
+            self._file.close()
+        _open_logs.discard(self)
+
+
+def atomic_write_pickle(path: str, obj) -> None:
+    """
+    Atomically replace ``path`` with a pickle of ``obj``
+
+    The pickle is written to a temporary file, fsync'ed and renamed over
+    the target, so readers see either the old or the new file, never a
+    partial one.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Make the rename itself durable
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)